@@ -0,0 +1,133 @@
+"""Checkpoints de execuções longas de `main.run`.
+
+Um checkpoint tem duas partes, ambas gravadas de forma atômica (arquivo
+temporário + `os.replace`):
+
+- `path` (`.npz` com `state`): JSON com a posição no vídeo, vida,
+  `prev_game_state`, últimas bboxes, estado do `FrameDataCalculator` (só
+  janelas abertas, lookaheads pendentes e as chaves de deduplicação
+  recentes), do `EventCoalescer`, do `RoundTracker`, eventos ainda não
+  finalizados, offset do stream NDJSON e `chunks` (quantos chunks valem)
+- chunks `<base>-<k>.npz`: só o que mudou desde o checkpoint anterior, ou seja,
+  as linhas novas da timeline (`tl_<coluna>`), os eventos finalizados de
+  cada análise (`events`: `{nome da config: [eventos]}`) e os resultados de
+  frame-data finalizados (`frame_data`: `{nome: {campo: [itens]}}`, campos de
+  `analysis.frame_data.CLOSED_FIELDS`)
+
+Cada checkpoint grava o chunk novo antes do `state` que o referencia; uma
+interrupção entre os dois deixa um chunk órfão, ignorado (e sobrescrito) na
+retomada. Assim o custo de cada checkpoint é proporcional ao intervalo, não
+ao tamanho da execução.
+"""
+
+import glob
+import json
+import os
+from dataclasses import fields
+
+import numpy as np
+
+from models.timeline import TimelineArrays
+
+CHECKPOINT_VERSION = 3
+
+
+def _chunk_path(path, index):
+    base, ext = os.path.splitext(path)
+    return f"{base}-{index:05d}{ext or '.npz'}"
+
+
+def _atomic_savez(path, **arrays):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def finalized_events(events, start, coalescer):
+    """Índice do primeiro evento de `events[start:]` que ainda pode mudar (span aberto em `coalescer`).
+
+    Os eventos antes dele estão finalizados e podem ir para um chunk.
+    """
+
+    done = start
+    while done < len(events) and not coalescer.is_open(events[done]):
+        done += 1
+    return done
+
+
+def save_checkpoint(path, state, chunk, timeline=None, events=None, frame_data=None):
+    """Grava o chunk `chunk` (linhas novas da timeline, eventos e frame-data finalizados) e depois `state`.
+
+    `timeline`: `TimelineArrays` só com as linhas desde o checkpoint anterior
+    (None = execução sem timeline); `events`: `{nome: [dicts]}` com os
+    eventos finalizados desde o checkpoint anterior; `frame_data`:
+    `{nome: {campo: [itens]}}`, idem para os resultados de frame-data.
+    `state` (dict JSON-serializável) passa a referenciar os chunks `0..chunk`.
+    """
+
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+
+    arrays = {
+        "events": np.asarray(json.dumps(events or {}, separators=(",", ":"))),
+        "frame_data": np.asarray(json.dumps(frame_data or {}, separators=(",", ":"))),
+    }
+    if timeline is not None:
+        arrays.update({f"tl_{f.name}": getattr(timeline, f.name) for f in fields(timeline)})
+    _atomic_savez(_chunk_path(path, chunk), **arrays)
+
+    raw = json.dumps({"version": CHECKPOINT_VERSION, **state, "chunks": chunk + 1}, separators=(",", ":"))
+    _atomic_savez(path, state=np.asarray(raw))
+
+
+def load_checkpoint(path):
+    """Retorna `(state, timeline, events, frame_data)` juntando os chunks, ou None se não existe.
+
+    `timeline` é None se a execução não gravava timeline; `events` é
+    `{nome: [dicts]}` com os eventos finalizados, na ordem de emissão;
+    `frame_data` é `{nome: {campo: [itens]}}`, na ordem de fechamento.
+    """
+
+    if not os.path.exists(path):
+        return None
+
+    with np.load(path, allow_pickle=False) as data:
+        state = json.loads(str(data["state"]))
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"{path}: unsupported checkpoint version {state.get('version')}")
+
+    events, frame_data = {}, {}
+    columns = {f.name: [] for f in fields(TimelineArrays)}
+    has_timeline = False
+    for index in range(state["chunks"]):
+        with np.load(_chunk_path(path, index), allow_pickle=False) as data:
+            for name, items in json.loads(str(data["events"])).items():
+                events.setdefault(name, []).extend(items)
+            for name, closed in json.loads(str(data["frame_data"])).items():
+                for field, items in closed.items():
+                    frame_data.setdefault(name, {}).setdefault(field, []).extend(items)
+            if "tl_frame_id" in data.files:
+                has_timeline = True
+                for name, parts in columns.items():
+                    parts.append(data[f"tl_{name}"])
+
+    timeline = None
+    if has_timeline:
+        timeline = TimelineArrays(**{name: np.concatenate(parts) for name, parts in columns.items()})
+    return state, timeline, events, frame_data
+
+
+def remove_checkpoint(path):
+    """Remove o checkpoint e todos os seus chunks (inclusive órfãos)."""
+
+    if not path:
+        return
+    base, ext = os.path.splitext(path)
+    for chunk in glob.glob(f"{glob.escape(base)}-[0-9]*{ext or '.npz'}"):
+        os.remove(chunk)
+    if os.path.exists(path):
+        os.remove(path)
@@ -1,57 +1,319 @@
+"""Detecção de eventos discretos a partir de transições entre frames.
+
+Os eventos são declarados como dados em `EVENT_RULES`: cada `EventRule`
+descreve, do ponto de vista de um jogador ("sujeito", que vira o `attacker`
+do evento), condições sobre o estado atual/anterior dele, o estado do oponente
+e a variação de vida do oponente. Toda regra é avaliada para P1 e para P2.
+
+As regras são compiladas (`compile_rules`) em predicados que usam apenas
+comparações e `&`, então o mesmo avaliador roda sobre escalares (par de
+`FrameData` em `detect_events`) ou sobre colunas inteiras de um
+`TimelineArrays` (`detect_events_arrays`) em uma passada vetorizada. O
+streaming de `main.run` usa `detect_events`; `detect_events_arrays` serve o
+recálculo offline de uma timeline gravada (`analysis.reports.results_from_timeline`).
+
+Regras marcadas como `continuous` (ex.: `block`) descrevem condições que
+duram vários frames. Elas viram um único `Event` com `start_frame`/`end_frame`
+em vez de um evento por frame: `detect_events_arrays` agrupa as sequências
+diretamente e, no modo streaming, `EventCoalescer` agrupa a saída de
+`detect_events` no momento da emissão.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
 from models.structures import Event
+from models.timeline import state_code
+
+
+@dataclass(frozen=True)
+class EventRule:
+    """
+    Regra declarativa de evento (simétrica entre jogadores).
+
+    Campos de condição (None/False == sem condição):
+    - `state` / `not_state`: estado atual do sujeito igual a / diferente de
+    - `prev_state` / `not_prev_state`: estado anterior do sujeito igual a / diferente de
+    - `opp_state`: estado atual do oponente
+    - `opp_life_drop`: vida do oponente diminuiu em relação ao frame anterior
+    - `with_defender`: se o oponente é registrado como `defender` do evento
+    - `continuous`: condição que dura vários frames; frames consecutivos viram um span
+    """
+    type: str
+    state: Optional[str] = None
+    not_state: Optional[str] = None
+    prev_state: Optional[str] = None
+    not_prev_state: Optional[str] = None
+    opp_state: Optional[str] = None
+    opp_life_drop: bool = False
+    with_defender: bool = True
+    continuous: bool = False
+
+
+EVENT_RULES = (
+    # Início de ataque
+    EventRule("attack_start", state="attack_active", not_prev_state="attack_active", with_defender=False),
+    # Ataque bloqueado (oponente em block)
+    EventRule("block", opp_state="block", continuous=True),
+    # Jump start / land
+    EventRule("jump_start", state="jump", not_prev_state="jump", with_defender=False),
+    EventRule("jump_land", prev_state="jump", not_state="jump", with_defender=False),
+    # Hit: vida do oponente diminuiu
+    EventRule("hit", opp_life_drop=True),
+    # Drive impact: hit com o atacante em `drive` no frame anterior
+    EventRule("drive_impact", opp_life_drop=True, prev_state="drive"),
+)
+
+PLAYERS = (("p1", "p2"), ("p2", "p1"))
+
+
+class _View:
+    """Colunas (ou escalares) vistas a partir de um sujeito."""
+
+    __slots__ = ("state", "prev_state", "opp_state", "opp_life", "opp_prev_life")
+
+    def __init__(self, state, prev_state, opp_state, opp_life, opp_prev_life):
+        self.state = state
+        self.prev_state = prev_state
+        self.opp_state = opp_state
+        self.opp_life = opp_life
+        self.opp_prev_life = opp_prev_life
+
+
+def _compile_rule(rule: EventRule):
+    """Converte uma `EventRule` em um predicado `f(view) -> bool | ndarray[bool]`."""
+
+    terms = []
+    if rule.state is not None:
+        code = state_code(rule.state)
+        terms.append(lambda v, c=code: v.state == c)
+    if rule.not_state is not None:
+        code = state_code(rule.not_state)
+        terms.append(lambda v, c=code: v.state != c)
+    if rule.prev_state is not None:
+        code = state_code(rule.prev_state)
+        terms.append(lambda v, c=code: v.prev_state == c)
+    if rule.not_prev_state is not None:
+        code = state_code(rule.not_prev_state)
+        terms.append(lambda v, c=code: v.prev_state != c)
+    if rule.opp_state is not None:
+        code = state_code(rule.opp_state)
+        terms.append(lambda v, c=code: v.opp_state == c)
+    if rule.opp_life_drop:
+        terms.append(lambda v: v.opp_life < v.opp_prev_life)
+
+    def predicate(view):
+        mask = True
+        for term in terms:
+            mask = mask & term(view)
+        return mask
+
+    return predicate
+
+
+def compile_rules(rules=EVENT_RULES):
+    """Compila a tabela de regras em uma lista `(rule, predicate)`."""
+
+    return [(rule, _compile_rule(rule)) for rule in rules]
+
+
+_COMPILED = compile_rules(EVENT_RULES)
+
 
+def _compiled_for(rules):
+    return _COMPILED if rules is EVENT_RULES else compile_rules(rules)
 
-def detect_events(current, previous):
+
+def _make_event(rule, frame_id, subject, opponent, end_frame=None):
+    return Event(
+        rule.type,
+        frame_id,
+        attacker=subject.upper(),
+        defender=opponent.upper() if rule.with_defender else None,
+        end_frame=end_frame,
+    )
+
+
+def detect_events(current, previous, rules=EVENT_RULES):
     """Detecta eventos discretos comparando `current` com `previous`.
 
-    Eventos extraídos:
+    Eventos extraídos (ver `EVENT_RULES`, avaliadas para ambos os jogadores):
     - `attack_start`: quando um jogador passa a estar em `attack_active`.
-    - `block`: quando o defensor está em estado `block`.
-    - `hit`: quando a vida de um jogador diminui entre frames (detectado para ambos).
-    - `jump_start` / `jump_land`: mudanças de estado de salto (detectadas independentemente de hit).
-    - `drive_impact`: heurística para detectar impacto causado por 'drive' (se houve perda de vida
-      e o atacante estava em estado `drive`).
+    - `block`: quando o oponente está em estado `block`.
+    - `hit`: quando a vida do oponente diminui entre frames.
+    - `jump_start` / `jump_land`: mudanças de estado de salto.
+    - `drive_impact`: perda de vida do oponente com o atacante em `drive` no frame anterior.
 
-    Retorna uma lista de instâncias `Event` (possivelmente vazia).
+    Retorna uma lista de instâncias `Event` (possivelmente vazia), ordenada por
+    regra e depois por jogador (P1 antes de P2).
     """
 
+    if not previous:
+        return []
+
+    states = {
+        "p1": (state_code(current.p1_state), state_code(previous.p1_state)),
+        "p2": (state_code(current.p2_state), state_code(previous.p2_state)),
+    }
+    lives = {"p1": (current.life_p1, previous.life_p1), "p2": (current.life_p2, previous.life_p2)}
+    views = [
+        (subject, opp, _View(states[subject][0], states[subject][1], states[opp][0], lives[opp][0], lives[opp][1]))
+        for subject, opp in PLAYERS
+    ]
+
     events = []
+    for rule, predicate in _compiled_for(rules):
+        for subject, opp, view in views:
+            if predicate(view):
+                events.append(_make_event(rule, current.frame_id, subject, opp))
+    return events
 
-    if not previous:
-        return events
 
-    # Início de ataque (P1)
-    if previous.p1_state != "attack_active" and current.p1_state == "attack_active":
-        events.append(Event("attack_start", current.frame_id, attacker="P1"))
+def detect_events_arrays(arrays, rules=EVENT_RULES) -> List[Event]:
+    """Avalia a tabela de regras sobre um `TimelineArrays` inteiro em uma passada.
+
+    Cada par de linhas consecutivas `(i-1, i)` é tratado como `(previous, current)`;
+    o evento recebe o `frame_id` da linha `i`. Também serve para uma janela de
+    streaming: passe o último frame já visto seguido dos novos.
+    Regras contínuas geram um evento por sequência de frames (span). A saída é
+    igual a passar `detect_events` frame a frame por um `EventCoalescer`.
+    """
 
-    # Ataque bloqueado (detecção simples quando p2 está em block)
-    if current.p2_state == "block":
-        events.append(Event("block", current.frame_id, attacker="P1", defender="P2"))
+    if len(arrays) < 2:
+        return []
 
-    # Jump start / land (p1)
-    if previous.p1_state != "jump" and current.p1_state == "jump":
-        events.append(Event("jump_start", current.frame_id, attacker="P1"))
+    fids = arrays.frame_id[1:]
+    views = []
+    for subject, opp in PLAYERS:
+        state = arrays.column(subject, "state")
+        opp_state = arrays.column(opp, "state")
+        opp_life = arrays.column(opp, "life").astype(np.int16)
+        views.append((subject, opp, _View(state[1:], state[:-1], opp_state[1:], opp_life[1:], opp_life[:-1])))
 
-    if previous.p1_state == "jump" and current.p1_state != "jump":
-        events.append(Event("jump_land", current.frame_id, attacker="P1"))
+    rows, ends, rule_idx, player_idx = [], [], [], []
+    n = len(fids)
+    for r, (rule, predicate) in enumerate(_compiled_for(rules)):
+        for p, (_, _, view) in enumerate(views):
+            mask = np.broadcast_to(predicate(view), (n,))
+            if rule.continuous:
+                # uma linha por sequência de True: início e fim do span
+                edges = np.diff(mask.astype(np.int8), prepend=0, append=0)
+                hit = np.flatnonzero(edges == 1)
+                end = np.flatnonzero(edges == -1) - 1
+            else:
+                hit = np.flatnonzero(mask)
+                end = hit
+            if len(hit):
+                rows.append(hit)
+                ends.append(end)
+                rule_idx.append(np.full(len(hit), r))
+                player_idx.append(np.full(len(hit), p))
 
-    # Jump start / land (p2)
-    if previous.p2_state != "jump" and current.p2_state == "jump":
-        events.append(Event("jump_start", current.frame_id, attacker="P2"))
+    if not rows:
+        return []
 
-    if previous.p2_state == "jump" and current.p2_state != "jump":
-        events.append(Event("jump_land", current.frame_id, attacker="P2"))
+    rows = np.concatenate(rows)
+    ends = np.concatenate(ends)
+    rule_idx = np.concatenate(rule_idx)
+    player_idx = np.concatenate(player_idx)
+    order = np.lexsort((player_idx, rule_idx, rows))
 
-    # Hit P2 (P1 atacando)
-    if current.life_p2 < previous.life_p2:
-        events.append(Event("hit", current.frame_id, attacker="P1", defender="P2"))
-        if previous.p1_state == "drive":
-            events.append(Event("drive_impact", current.frame_id, attacker="P1", defender="P2"))
+    compiled = _compiled_for(rules)
+    return [
+        _make_event(compiled[r][0], start, *PLAYERS[p], end_frame=end)
+        for start, end, r, p in zip(
+            fids[rows[order]].tolist(), fids[ends[order]].tolist(), rule_idx[order].tolist(), player_idx[order].tolist()
+        )
+    ]
 
-    # Hit P1 (P2 atacando)
-    if current.life_p1 < previous.life_p1:
-        events.append(Event("hit", current.frame_id, attacker="P2", defender="P1"))
-        if previous.p2_state == "drive":
-            events.append(Event("drive_impact", current.frame_id, attacker="P2", defender="P1"))
 
-    return events
+class EventCoalescer:
+    """Agrupa eventos de regras contínuas em spans no momento da emissão.
+
+    Uso:
+      coalescer = EventCoalescer()
+      for ...:
+          new_events = coalescer.push(frame_id, detect_events(cur, prev))
+      coalescer.flush()
+
+    `push` retorna apenas eventos novos: os pontuais e os spans que abriram
+    neste frame. Um span aberto é o próprio `Event` já retornado; seu
+    `end_frame` é estendido enquanto a condição continuar nos frames seguintes.
+    Spans encerrados ficam disponíveis em `pop_closed()`.
+    """
+
+    def __init__(self, rules=EVENT_RULES):
+        self.continuous = {r.type for r in rules if r.continuous}
+        self._open = {}
+        self._closed = []
+
+    def push(self, frame_id, events):
+        new_events = []
+        seen = set()
+        for e in events:
+            if e.type not in self.continuous:
+                new_events.append(e)
+                continue
+            key = (e.type, e.attacker, e.defender)
+            seen.add(key)
+            span = self._open.get(key)
+            if span is not None and span.end_frame == frame_id - 1:
+                span.end_frame = frame_id
+                continue
+            if span is not None:
+                self._closed.append(span)
+            self._open[key] = e
+            new_events.append(e)
+
+        for key in [k for k in self._open if k not in seen]:
+            self._closed.append(self._open.pop(key))
+        return new_events
+
+    def is_open(self, event):
+        """Se `event` é um span ainda aberto (o `end_frame` ainda pode crescer)."""
+
+        return self._open.get((event.type, event.attacker, event.defender)) is event
+
+    def pop_closed(self):
+        """Retorna (e esquece) os spans encerrados desde a última chamada."""
+
+        closed, self._closed = self._closed, []
+        return closed
+
+    def flush(self):
+        """Encerra todos os spans abertos e retorna os ainda não consumidos."""
+
+        self._closed.extend(self._open.values())
+        self._open = {}
+        return self.pop_closed()
+
+    def state_dict(self):
+        """Spans abertos e fechados ainda não consumidos, serializáveis em JSON."""
+
+        return {
+            "open": [dict(e.__dict__) for e in self._open.values()],
+            "closed": [dict(e.__dict__) for e in self._closed],
+        }
+
+    @classmethod
+    def from_state(cls, state, rules=EVENT_RULES, known=()):
+        """Reconstrói o coalescer a partir de `state_dict()`.
+
+        `known`: eventos já emitidos (ex.: restaurados do mesmo checkpoint). Um
+        span aberto que esteja entre eles reutiliza o mesmo objeto, para que a
+        extensão de `end_frame` continue refletindo na lista do chamador.
+        """
+
+        by_key = {(e.type, e.attacker, e.defender, e.start_frame): e for e in known}
+        coalescer = cls(rules)
+        for data in state["open"]:
+            e = by_key.get((data["type"], data["attacker"], data["defender"], data["start_frame"]))
+            if e is None:
+                e = Event(**data)
+            else:
+                e.end_frame = data["end_frame"]
+            coalescer._open[(e.type, e.attacker, e.defender)] = e
+        coalescer._closed = [Event(**data) for data in state["closed"]]
+        return coalescer
@@ -0,0 +1,190 @@
+"""Estágio de análise por frame: `VisionRecord` -> `FrameData`, eventos e frame-data.
+
+`FrameAnalysis` aplica uma `AnalysisConfig` (thresholds de estado e de
+efeitos) às saídas brutas do estágio de visão e mantém o estado incremental da
+análise: vida, `game_state` anterior, `EventCoalescer`, `FrameDataCalculator`
+e `RoundTracker`. Várias instâncias podem consumir os mesmos registros (ver
+`analysis.shadow`): o custo de cada config extra é só a lógica de thresholds,
+eventos e frame-data.
+"""
+
+from dataclasses import dataclass, field
+
+from config import DAMAGE_PER_HIT
+from models.structures import FrameData
+from analysis.events import EventCoalescer, detect_events
+from analysis.frame_data import FrameDataCalculator
+from analysis.insights import generate_insights
+from analysis.rounds import RoundTracker
+from analysis.results_stream import frame_record
+from vision.effects_detection import effects_from_mads
+from vision.game_state import classify_game_state
+from vision.state_detection import StateDetectorConfig, can_act, classify_state
+
+# Threshold de hitspark padrão (aplicado na análise, não altera o cache de visão)
+EFFECTS_MEAN_DIFF_THRESH = 10.0
+
+
+@dataclass
+class AnalysisConfig:
+    """
+    Thresholds aplicados na análise (não alteram o cache de visão).
+
+    - `name`: identificador da config nos resultados (ex.: nome da sombra)
+    - `state`: `StateDetectorConfig` usada por `classify_state`
+    - `effects_mean_diff_thresh`: threshold de hitspark de `effects_from_mads`
+    """
+
+    name: str = "primary"
+    state: StateDetectorConfig = field(default_factory=StateDetectorConfig)
+    effects_mean_diff_thresh: float = EFFECTS_MEAN_DIFF_THRESH
+
+    def to_dict(self):
+        return {"name": self.name, "state": dict(self.state.__dict__), "effects_mean_diff_thresh": self.effects_mean_diff_thresh}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            name=d.get("name", "primary"),
+            state=StateDetectorConfig(**d.get("state", {})),
+            effects_mean_diff_thresh=d.get("effects_mean_diff_thresh", cls.effects_mean_diff_thresh),
+        )
+
+
+def frame_from_record(rec):
+    rec = dict(rec)
+    for key in ("p1_bbox", "p2_bbox"):
+        if rec[key] is not None:
+            rec[key] = tuple(rec[key])
+    return FrameData(**rec)
+
+
+class FrameAnalysis:
+    """
+    Análise incremental de uma sequência de `VisionRecord`s.
+
+    Uso:
+      analysis = FrameAnalysis(config, fps)
+      for rec in records:
+          data, frame_events, closed = analysis.step(rec)
+          analysis.closed_spans  # spans contínuos encerrados neste frame
+      closed_spans, closed = analysis.flush()
+      analysis.result()  # {"rounds", "frame_data", "insights"}
+    """
+
+    def __init__(self, config: AnalysisConfig = None, fps=60.0):
+        self.config = config or AnalysisConfig()
+        self.fps = fps
+        self.prev = None
+        self.life_p1 = 100
+        self.life_p2 = 100
+        self.prev_game_state = None
+        self.coalescer = EventCoalescer()
+        self.calculator = FrameDataCalculator()
+        self.rounds = RoundTracker()
+        self.closed_spans = []
+        self._round_spans = None
+
+    def step(self, rec):
+        """Processa um registro; retorna `(FrameData, eventos do frame, janelas fechadas)`."""
+
+        frame_id = rec.frame_id
+
+        # Classifica o estado de cada jogador a partir das estatísticas da ROI
+        p1_state = classify_state(rec.p1_features, self.config.state)
+        p2_state = classify_state(rec.p2_features, self.config.state)
+
+        # Efeitos entre frames (hitsparks)
+        effects = effects_from_mads(rec.effect_mads, self.config.effects_mean_diff_thresh)
+
+        # Atualiza vida/ações com base em efeitos
+        p1_action = None
+        p2_action = None
+        for eff in effects:
+            if eff.get("type") == "hitspark":
+                target = eff.get("target")
+                if target == "p2":
+                    self.life_p2 = max(0, self.life_p2 - DAMAGE_PER_HIT)
+                    p2_action = "hit"
+                    # marca atacante como em ataque ativo (melhora janelas)
+                    p1_state = "attack_active"
+                    p1_action = "attack"
+                elif target == "p1":
+                    self.life_p1 = max(0, self.life_p1 - DAMAGE_PER_HIT)
+                    p1_action = "hit"
+                    p2_state = "attack_active"
+                    p2_action = "attack"
+
+        # Cria o FrameData
+        data = FrameData(
+            frame_id=frame_id,
+            timestamp=frame_id / self.fps,
+            p1_state=p1_state,
+            p2_state=p2_state,
+            p1_can_act=can_act(p1_state),
+            p2_can_act=can_act(p2_state),
+            p1_bbox=rec.p1_bbox,
+            p2_bbox=rec.p2_bbox,
+            life_p1=self.life_p1,
+            life_p2=self.life_p2,
+            p1_action=p1_action,
+            p2_action=p2_action,
+        )
+
+        # Detect game-wide state (FIGHT / KO / REPLAY)
+        gs = classify_game_state(rec.game_signals, data, self.prev_game_state)
+        data.game_state = gs
+        self.prev_game_state = gs
+        self.rounds.push(frame_id, gs)
+
+        # Detecta eventos com base no frame anterior e alimenta o frame-data
+        frame_events = self.coalescer.push(frame_id, detect_events(data, self.prev))
+        # os spans já foram emitidos (e estendidos) via `frame_events`: o coalescer não os guarda
+        self.closed_spans = self.coalescer.pop_closed()
+        closed = self.calculator.push(data, frame_events)
+        self.prev = data
+        return data, frame_events, closed
+
+    def flush(self):
+        """Fecha spans, lookaheads e o round pendentes; retorna `(spans fechados, janelas fechadas)`."""
+
+        closed_spans = self.coalescer.flush()
+        closed = self.calculator.flush()
+        self._round_spans = self.rounds.flush()
+        return closed_spans, closed
+
+    def result(self):
+        """Rounds, frame-data consolidado e insights (após `flush`)."""
+
+        frame_data = self.calculator.result()
+        return {"rounds": self._round_spans, "frame_data": frame_data, "insights": generate_insights(frame_data)}
+
+    def state_dict(self, first_closed=None):
+        """Estado serializável; `first_closed` como em `FrameDataCalculator.state_dict`."""
+
+        return {
+            "prev": frame_record(self.prev) if self.prev is not None else None,
+            "life_p1": self.life_p1,
+            "life_p2": self.life_p2,
+            "prev_game_state": self.prev_game_state,
+            "coalescer": self.coalescer.state_dict(),
+            "calculator": self.calculator.state_dict(first_closed),
+            "rounds": self.rounds.state_dict(),
+        }
+
+    @classmethod
+    def from_state(cls, state, config=None, fps=60.0, known_events=(), saved_closed=None):
+        """Reconstrói a análise; `known_events` re-liga os spans abertos aos eventos já emitidos.
+
+        `saved_closed`: resultados de frame-data fechados que ficaram fora de
+        `state` (ver `FrameDataCalculator.from_state`).
+        """
+
+        analysis = cls(config, fps)
+        analysis.prev = frame_from_record(state["prev"]) if state["prev"] is not None else None
+        analysis.life_p1, analysis.life_p2 = state["life_p1"], state["life_p2"]
+        analysis.prev_game_state = state["prev_game_state"]
+        analysis.coalescer = EventCoalescer.from_state(state["coalescer"], known=known_events)
+        analysis.calculator = FrameDataCalculator.from_state(state["calculator"], saved_closed)
+        analysis.rounds = RoundTracker.from_state(state["rounds"])
+        return analysis
@@ -1,193 +1,637 @@
-def calculate_frame_data(timeline, events=None):
-    """
-    Analisa a timeline (lista de `FrameData`) e eventos para extrair métricas de frame data.
+"""Cálculo de frame data (vantagem on-block, whiffs e pulos puníveis).
 
-    Produz:
-    - `windows`: janelas de ataque detectadas (inicio, fim, vantagem on-block ou marcações de whiff)
-    - `summary`: agregações úteis para gerar insights (contagens de plus/minus, pulos puníveis, drive impacts,
-        e whiff_punishes)
+O cálculo é feito de forma incremental por `FrameDataCalculator`: cada frame é
+empurrado com `push(frame, events)` e janelas, whiffs e pulos puníveis são
+emitidos assim que se fecham. O calculador guarda apenas o que ainda está
+aberto (janelas em andamento e sondas de lookahead limitadas), então a memória
+não cresce com a duração do vídeo.
 
-    A função percorre a timeline construindo janelas a partir de estados `attack_active`, mas também
-    deriva janelas a partir de eventos discretos (ex.: `hit`, `block`) quando disponíveis.
-    """
+`calculate_frame_data(timeline, events)` continua disponível e produz o mesmo
+dicionário de antes, empurrando a timeline inteira pelo calculador.
+`calculate_frame_data_arrays(arrays, events)` produz o mesmo resultado sobre um
+`TimelineArrays` colunar, com aritmética de spans (`analysis.spans`) em numpy;
+é o caminho offline (`analysis.reports.results_from_timeline`), que recalcula
+o frame-data de uma timeline gravada sem passar frame a frame.
+"""
 
-    if events is None:
-        events = []
+from collections import defaultdict
 
-    windows = []
+import numpy as np
 
-    # Suporta rastrear ataques para ambos os jogadores
-    current = {"p1": None, "p2": None}
+from analysis.spans import StateSpanIndex
 
-    for frame in timeline:
-        # Verifica início de ataque para P1
-        if frame.p1_state == "attack_active" and current["p1"] is None:
-            current["p1"] = {"start": frame.frame_id, "attacker_free": None, "defender_free": None}
 
-        # Verifica início de ataque para P2
-        if frame.p2_state == "attack_active" and current["p2"] is None:
-            current["p2"] = {"start": frame.frame_id, "attacker_free": None, "defender_free": None}
+# Quantos frames à frente uma janela derivada de evento é procurada
+EVENT_LOOKAHEAD = 60
+# Frames sem contato (após o atacante recuperar) para considerar whiff
+WHIFF_MIN_FRAMES = 30
+# Frames (a partir do fim do whiff / do pouso) em que o oponente pode punir
+WHIFF_PUNISH_FRAMES = 4
+JUMP_PUNISH_FRAMES = 3
 
-        # Atualiza janelas abertas
-        for attacker, attack in list(current.items()):
-            if attack is None:
-                continue
+# Vantagem heurística quando nenhuma janela real é encontrada para o evento
+EVENT_HEURISTIC_ADV = {"hit": 10, "block": 2, "drive_impact": 0}
+EVENT_WINDOW_TYPES = ("hit", "block", "attack_start", "drive_impact")
 
-            # Define quem é atacante/defensor
-            if attacker == "p1":
-                atk_can_act = frame.p1_can_act
-                def_can_act = frame.p2_can_act
-            else:
-                atk_can_act = frame.p2_can_act
-                def_can_act = frame.p1_can_act
+WHIFF_ADV = -999
+
+# listas de resultados fechados de `FrameDataCalculator` (ver `finalized`)
+CLOSED_FIELDS = ("state_windows", "event_windows", "punishable_jumps", "drive_impacts")
+
+
+def _opponent(player):
+    return "p2" if player == "p1" else "p1"
+
+
+def _normalize_player(label):
+    if label in ("P1", "p1"):
+        return "p1"
+    if label in ("P2", "p2"):
+        return "p2"
+    return None
+
+
+class FrameDataCalculator:
+    """Calculador incremental de frame data.
+
+    Uso:
+      calc = FrameDataCalculator()
+      for frame, frame_events in stream:
+          for kind, record in calc.push(frame, frame_events):
+              ...  # 'window', 'punishable_jump' ou 'drive_impact'
+      calc.flush()
+      result = calc.result()  # mesmo formato de `calculate_frame_data`
+
+    Os eventos devem ser empurrados junto com o frame em que ocorrem (ou antes
+    dele); a sonda de cada evento consome apenas frames futuros. Todo o estado
+    interno é composto por dicts/listas simples. As chaves de deduplicação
+    mais antigas que o lookahead são descartadas periodicamente.
+    """
 
-            if atk_can_act and attack["attacker_free"] is None:
-                attack["attacker_free"] = frame.frame_id
+    def __init__(self, event_lookahead=EVENT_LOOKAHEAD):
+        self.event_lookahead = event_lookahead
+        self.frames_seen = 0
+        self.last_frame_id = None
+
+        # janelas de ataque abertas por atacante
+        self._open = {"p1": None, "p2": None}
+        # início de pulo em andamento por jogador
+        self._jump_start = {"p1": None, "p2": None}
+        # whiffs / pulos aguardando o lookahead de punição
+        self._pending_whiffs = []
+        self._pending_jumps = []
+        # sondas de eventos procurando o primeiro frame livre de cada jogador
+        self._probes = []
+        self._event_seq = 0
+
+        # chaves (atacante, início) já usadas, para deduplicação O(1)
+        self._state_keys = set()
+        self._event_keys = set()
+        # janelas de evento suprimidas por uma janela de estado ainda aberta
+        self._suppressed = {}
+
+        # resultados fechados
+        self.state_windows = []
+        self.event_windows = []  # pares [seq, janela] para manter a ordem dos eventos
+        self.punishable_jumps = []
+        self.drive_impacts = []
+
+    # ------------------------------------------------------------------ entrada
+    def push(self, frame, events=None):
+        """Processa um `FrameData` (e os eventos do mesmo frame).
+
+        Retorna a lista de registros fechados neste passo como tuplas
+        `(kind, record)`.
+        """
+
+        emitted = []
+        fid = frame.frame_id
+
+        self._update_windows(frame, emitted)
+        self._update_jumps(frame, emitted)
+        self.push_events(events or (), _emitted=emitted)
+        self._update_pending(frame, emitted)
+        self._update_probes(frame, emitted)
+
+        self.frames_seen += 1
+        self.last_frame_id = fid
+        if self.frames_seen % self.event_lookahead == 0:
+            self._state_keys, self._event_keys, self._suppressed = self._live_keys()
+        return emitted
+
+    def push_events(self, events, _emitted=None):
+        """Registra eventos sem avançar a timeline (ex.: eventos fora dela)."""
+
+        emitted = _emitted if _emitted is not None else []
+        for e in events:
+            if e.type == "drive_impact":
+                rec = {"frame_id": e.frame_id, "attacker": e.attacker, "defender": e.defender}
+                self.drive_impacts.append(rec)
+                emitted.append(("drive_impact", rec))
+
+            if e.type not in EVENT_WINDOW_TYPES:
+                continue
+            attacker = _normalize_player(e.attacker)
+            if attacker is None:
+                continue
 
-            if def_can_act and attack["defender_free"] is None:
-                attack["defender_free"] = frame.frame_id
+            self._probes.append({
+                "seq": self._event_seq,
+                "type": e.type,
+                "attacker": attacker,
+                "start": e.frame_id,
+                "attacker_free": None,
+                "defender_free": None,
+            })
+            self._event_seq += 1
+        return emitted
+
+    def flush(self):
+        """Fecha o stream: finaliza lookaheads truncados e descarta janelas abertas.
+
+        Janelas de ataque e pulos ainda abertos no fim são descartados (como na
+        versão que percorria a timeline inteira); sondas de evento sem resultado
+        recebem a vantagem heurística do tipo do evento.
+        """
+
+        emitted = []
+        for item in self._pending_whiffs:
+            emitted.append(("window", item["window"]))
+        self._pending_whiffs = []
+
+        for item in self._pending_jumps:
+            self.punishable_jumps.append(item["record"])
+            emitted.append(("punishable_jump", item["record"]))
+        self._pending_jumps = []
+
+        for probe in self._probes:
+            self._close_probe(probe, EVENT_HEURISTIC_ADV.get(probe["type"], 0), emitted)
+        self._probes = []
+
+        # janelas de estado abertas nunca são emitidas: libera as de evento suprimidas
+        for attacker, attack in self._open.items():
+            if attack is None:
+                continue
+            key = (attacker, attack["start"])
+            self._state_keys.discard(key)
+            suppressed = self._suppressed.pop(key, None)
+            if suppressed is not None:
+                self._event_keys.add(key)
+                self.event_windows.append(suppressed)
+                emitted.append(("window", suppressed[1]))
+        self._open = {"p1": None, "p2": None}
+        self._jump_start = {"p1": None, "p2": None}
+        return emitted
+
+    # ------------------------------------------------------------ janelas de estado
+    def _update_windows(self, frame, emitted):
+        fid = frame.frame_id
+        for attacker in ("p1", "p2"):
+            if getattr(frame, f"{attacker}_state") == "attack_active" and self._open[attacker] is None:
+                self._open[attacker] = {"start": fid, "attacker_free": None, "defender_free": None}
+                self._state_keys.add((attacker, fid))
+
+        for attacker in ("p1", "p2"):
+            attack = self._open[attacker]
+            if attack is None:
+                continue
+            defender = _opponent(attacker)
+
+            if getattr(frame, f"{attacker}_can_act") and attack["attacker_free"] is None:
+                attack["attacker_free"] = fid
+            if getattr(frame, f"{defender}_can_act") and attack["defender_free"] is None:
+                attack["defender_free"] = fid
 
             # Ambos recuperaram controle -> calcula vantagem
             if attack["attacker_free"] is not None and attack["defender_free"] is not None:
                 adv = attack["attacker_free"] - attack["defender_free"]
-                windows.append({"attacker": attacker, "start": attack["start"], "end": frame.frame_id, "on_block_adv": adv})
-                current[attacker] = None
+                window = {"attacker": attacker, "start": attack["start"], "end": fid, "on_block_adv": adv}
+                self._close_state_window(attacker, window)
+                emitted.append(("window", window))
 
             # Fallback: ataque terminou sem contato (whiff)
-            elif attack["attacker_free"] is not None and frame.frame_id - attack["start"] > 30:
-                # Whiff fallback: mark as whiff and record end frame
-                end_frame = frame.frame_id
-                # check if opponent can act within short window after end
-                opp = "p2" if attacker == "p1" else "p1"
-                opp_can_punish = False
-                for off in range(0, 4):
-                    idx = end_frame + off
-                    if idx < 0 or idx >= len(timeline):
-                        continue
-                    if getattr(timeline[idx], f"{opp}_can_act"):
-                        opp_can_punish = True
-                        break
-
-                windows.append({"attacker": attacker, "start": attack["start"], "end": end_frame, "on_block_adv": -999, "whiff": True, "punishable": opp_can_punish})
-                current[attacker] = None
-
-    # (aggregation moved down after event-derived windows)
-
-    # Detecta pulos puníveis: procura sequências de 'jump' por jogador
-    punishable_jumps = []
-    for player in ("p1", "p2"):
-        in_jump = False
-        jump_start = None
-        for frame in timeline:
+            elif attack["attacker_free"] is not None and fid - attack["start"] > WHIFF_MIN_FRAMES:
+                window = {
+                    "attacker": attacker,
+                    "start": attack["start"],
+                    "end": fid,
+                    "on_block_adv": WHIFF_ADV,
+                    "whiff": True,
+                    "punishable": False,
+                }
+                self._close_state_window(attacker, window)
+                # o oponente pode punir no fim do whiff ou nos frames seguintes
+                self._pending_whiffs.append({"window": window, "opp": defender, "until": fid + WHIFF_PUNISH_FRAMES - 1})
+
+    def _close_state_window(self, attacker, window):
+        self.state_windows.append(window)
+        self._open[attacker] = None
+        self._suppressed.pop((attacker, window["start"]), None)
+
+    # --------------------------------------------------------------------- pulos
+    def _update_jumps(self, frame, emitted):
+        fid = frame.frame_id
+        for player in ("p1", "p2"):
             state = getattr(frame, f"{player}_state")
-            opp = "p2" if player == "p1" else "p1"
-
-            if not in_jump and state == "jump":
-                in_jump = True
-                jump_start = frame.frame_id
-
-            if in_jump and state != "jump":
-                landing_frame = frame.frame_id
-                # verifica se o oponente pode punir no landing ou nos próximos 2 frames (janela reduzida)
-                landing_index = landing_frame
-                opp_can_punish = False
-                # busca frame por id (timeline index == frame_id assumido sequencial)
-                for offset in range(0, 3):
-                    idx = landing_index + offset
-                    if idx < 0 or idx >= len(timeline):
-                        continue
-                    opp_can = getattr(timeline[idx], f"{opp}_can_act")
-                    if opp_can:
-                        opp_can_punish = True
-                        break
-
-                punishable_jumps.append({
-                    "player": player,
-                    "start": jump_start,
-                    "land": landing_frame,
-                    "punishable": opp_can_punish,
-                })
-
-                in_jump = False
-                jump_start = None
-
-    # Drive impacts a partir da lista de eventos
-    drive_impacts = [e for e in (events or []) if e.type == "drive_impact"]
-
-    # Também derive janelas a partir de eventos discretos (hit, block, attack_start)
-    for e in (events or []):
-        if e.type not in ("hit", "block", "attack_start", "drive_impact"):
-            continue
-
-        attacker = None
-        defender = None
-        if e.attacker == "P1" or e.attacker == "p1":
-            attacker = "p1"
-            defender = "p2"
-        elif e.attacker == "P2" or e.attacker == "p2":
-            attacker = "p2"
-            defender = "p1"
-        else:
-            continue
-
-        start = e.frame_id
-        attacker_free = None
-        defender_free = None
-
-        # procura, até 60 frames à frente, o primeiro frame em que cada um pode agir
-        for fid in range(start, min(start + 60, len(timeline))):
-            f = timeline[fid]
-            if attacker == "p1":
-                if attacker_free is None and f.p1_can_act:
-                    attacker_free = f.frame_id
-                if defender_free is None and f.p2_can_act:
-                    defender_free = f.frame_id
+            if self._jump_start[player] is None and state == "jump":
+                self._jump_start[player] = fid
+            elif self._jump_start[player] is not None and state != "jump":
+                record = {"player": player, "start": self._jump_start[player], "land": fid, "punishable": False}
+                self._pending_jumps.append({"record": record, "opp": _opponent(player), "until": fid + JUMP_PUNISH_FRAMES - 1})
+                self._jump_start[player] = None
+
+    # ------------------------------------------------------------- lookaheads
+    def _update_pending(self, frame, emitted):
+        fid = frame.frame_id
+
+        still = []
+        for item in self._pending_whiffs:
+            if getattr(frame, f"{item['opp']}_can_act"):
+                item["window"]["punishable"] = True
+            if item["window"]["punishable"] or fid >= item["until"]:
+                emitted.append(("window", item["window"]))
             else:
-                if attacker_free is None and f.p2_can_act:
-                    attacker_free = f.frame_id
-                if defender_free is None and f.p1_can_act:
-                    defender_free = f.frame_id
-
-            if attacker_free is not None and defender_free is not None:
-                adv = attacker_free - defender_free
-                # evita duplicatas (mesmo start e attacker)
-                if not any(w["start"] == start and w["attacker"] == attacker for w in windows):
-                    windows.append({"attacker": attacker, "start": start, "on_block_adv": adv})
-                break
-        else:
-            # se não encontrou janelas reais, use heurística por tipo de evento
-            if e.type == "hit":
-                heur_adv = 10
-            elif e.type == "block":
-                heur_adv = 2
-            elif e.type == "drive_impact":
-                heur_adv = 0
+                still.append(item)
+        self._pending_whiffs = still
+
+        still = []
+        for item in self._pending_jumps:
+            if getattr(frame, f"{item['opp']}_can_act"):
+                item["record"]["punishable"] = True
+            if item["record"]["punishable"] or fid >= item["until"]:
+                self.punishable_jumps.append(item["record"])
+                emitted.append(("punishable_jump", item["record"]))
             else:
-                heur_adv = 0
-
-            if not any(w["start"] == start and w["attacker"] == attacker for w in windows):
-                windows.append({"attacker": attacker, "start": start, "on_block_adv": heur_adv})
-
+                still.append(item)
+        self._pending_jumps = still
+
+    def _update_probes(self, frame, emitted):
+        fid = frame.frame_id
+        still = []
+        for probe in self._probes:
+            if fid < probe["start"]:
+                still.append(probe)
+                continue
 
-    # Agregações (incluindo janelas derivadas de eventos)
-    valid_advs = [w["on_block_adv"] for w in windows if w["on_block_adv"] != -999]
+            attacker = probe["attacker"]
+            if probe["attacker_free"] is None and getattr(frame, f"{attacker}_can_act"):
+                probe["attacker_free"] = fid
+            if probe["defender_free"] is None and getattr(frame, f"{_opponent(attacker)}_can_act"):
+                probe["defender_free"] = fid
+
+            if probe["attacker_free"] is not None and probe["defender_free"] is not None:
+                self._close_probe(probe, probe["attacker_free"] - probe["defender_free"], emitted)
+            elif fid >= probe["start"] + self.event_lookahead - 1:
+                # nenhuma janela real dentro do lookahead: heurística por tipo de evento
+                self._close_probe(probe, EVENT_HEURISTIC_ADV.get(probe["type"], 0), emitted)
+            else:
+                still.append(probe)
+        self._probes = still
+
+    def _close_probe(self, probe, adv, emitted):
+        key = (probe["attacker"], probe["start"])
+        if key in self._event_keys:
+            return
+        window = {"attacker": probe["attacker"], "start": probe["start"], "on_block_adv": adv}
+        if key in self._state_keys:
+            # mesma janela já coberta pelo estado; se a janela de estado ficar
+            # aberta até o fim do stream, esta é liberada em `flush()`
+            if self._open[probe["attacker"]] is not None and self._open[probe["attacker"]]["start"] == probe["start"]:
+                self._suppressed.setdefault(key, [probe["seq"], window])
+            return
+        self._event_keys.add(key)
+        self.event_windows.append([probe["seq"], window])
+        emitted.append(("window", window))
+
+    def _live_keys(self):
+        """Chaves de deduplicação que uma sonda ainda pode consultar.
+
+        Sondas fecham até `event_lookahead` frames após o início, então só
+        importam chaves com início depois de `last_frame_id - event_lookahead`
+        e as das janelas de estado abertas.
+        """
+
+        if self.last_frame_id is None:
+            return set(self._state_keys), set(self._event_keys), dict(self._suppressed)
+        horizon = self.last_frame_id - self.event_lookahead
+        open_keys = {(attacker, attack["start"]) for attacker, attack in self._open.items() if attack is not None}
+        return (
+            {k for k in self._state_keys if k[1] > horizon or k in open_keys},
+            {k for k in self._event_keys if k[1] > horizon},
+            {k: v for k, v in self._suppressed.items() if k[1] > horizon or k in open_keys},
+        )
+
+    # ------------------------------------------------------------------- saída
+    def merge(self, other):
+        """Incorpora os resultados fechados de outro calculador (ex.: outro chunk).
+
+        Janelas de evento repetidas (mesmo atacante e início) são descartadas.
+        Retorna `self`.
+        """
+
+        self.state_windows.extend(other.state_windows)
+        self._state_keys.update((w["attacker"], w["start"]) for w in other.state_windows)
+
+        offset = self._event_seq
+        for seq, window in other.event_windows:
+            key = (window["attacker"], window["start"])
+            if key in self._event_keys or key in self._state_keys:
+                continue
+            self._event_keys.add(key)
+            self.event_windows.append([offset + seq, window])
+        self._event_seq += other._event_seq
+
+        self.punishable_jumps.extend(other.punishable_jumps)
+        self.drive_impacts.extend(other.drive_impacts)
+        self.frames_seen += other.frames_seen
+        return self
+
+    # ------------------------------------------------------------ checkpoint
+    def finalized(self):
+        """Quantos itens do início de cada lista de `CLOSED_FIELDS` não mudam mais.
+
+        Só whiffs aguardando o lookahead de punição ainda mudam (`punishable`):
+        a contagem de `state_windows` para na primeira delas.
+        """
+
+        done = {name: len(getattr(self, name)) for name in CLOSED_FIELDS}
+        pending = {id(item["window"]) for item in self._pending_whiffs}
+        i = len(self.state_windows)
+        while pending:
+            i -= 1
+            pending.discard(id(self.state_windows[i]))
+        done["state_windows"] = i
+        return done
+
+    def state_dict(self, first_closed=None):
+        """Estado serializável em JSON: abertos, pendentes e fechados a partir de `first_closed`.
+
+        `first_closed` (`{campo: índice}`, ver `finalized`): os itens de
+        `CLOSED_FIELDS` antes do índice ficam com o chamador (ex.: chunks do
+        checkpoint) e voltam em `from_state(..., saved_closed)`. Os valores
+        referenciam as estruturas internas: serialize antes de continuar
+        empurrando frames.
+        """
+
+        first = {name: (first_closed or {}).get(name, 0) for name in CLOSED_FIELDS}
+        state_keys, event_keys, suppressed = self._live_keys()
+        # whiffs pendentes apontam para janelas já em `state_windows` (mesmo dict)
+        index = {id(w): i for i, w in enumerate(self.state_windows[first["state_windows"]:])}
+        return {
+            "event_lookahead": self.event_lookahead,
+            "frames_seen": self.frames_seen,
+            "last_frame_id": self.last_frame_id,
+            "open": self._open,
+            "jump_start": self._jump_start,
+            "pending_whiffs": [
+                {"window_index": index[id(item["window"])], "opp": item["opp"], "until": item["until"]}
+                for item in self._pending_whiffs
+            ],
+            "pending_jumps": self._pending_jumps,
+            "probes": self._probes,
+            "event_seq": self._event_seq,
+            "state_keys": sorted(state_keys),
+            "event_keys": sorted(event_keys),
+            "suppressed": [[attacker, start, value] for (attacker, start), value in suppressed.items()],
+            **{name: getattr(self, name)[first[name]:] for name in CLOSED_FIELDS},
+        }
+
+    @classmethod
+    def from_state(cls, state, saved_closed=None):
+        """Reconstrói um calculador a partir de `state_dict()` (já desserializado).
+
+        `saved_closed`: `{campo: [itens]}` anteriores aos de `state` (os que
+        ficaram de fora por `first_closed`).
+        """
+
+        saved = saved_closed or {}
+        calc = cls(state["event_lookahead"])
+        calc.frames_seen = state["frames_seen"]
+        calc.last_frame_id = state["last_frame_id"]
+        calc._open = dict(state["open"])
+        calc._jump_start = dict(state["jump_start"])
+        for name in CLOSED_FIELDS:
+            setattr(calc, name, list(saved.get(name, [])) + state[name])
+        offset = len(saved.get("state_windows", []))
+        calc._pending_whiffs = [
+            {"window": calc.state_windows[offset + item["window_index"]], "opp": item["opp"], "until": item["until"]}
+            for item in state["pending_whiffs"]
+        ]
+        calc._pending_jumps = list(state["pending_jumps"])
+        calc._probes = list(state["probes"])
+        calc._event_seq = state["event_seq"]
+        calc._state_keys = {tuple(k) for k in state["state_keys"]}
+        calc._event_keys = {tuple(k) for k in state["event_keys"]}
+        calc._suppressed = {(attacker, start): value for attacker, start, value in state["suppressed"]}
+        return calc
+
+    def windows(self):
+        """Janelas fechadas: janelas de estado seguidas das derivadas de eventos."""
+
+        event_windows = [w for _, w in sorted(self.event_windows, key=lambda item: item[0])]
+        return self.state_windows + event_windows
+
+    def result(self):
+        """Retorna `{"windows": [...], "summary": {...}}` com o que já fechou."""
+
+        windows = self.windows()
+        # pulos agrupados por jogador (p1 antes de p2), preservando a ordem de pouso
+        jumps = sorted(self.punishable_jumps, key=lambda j: j["player"])
+        return {"windows": windows, "summary": summarize_frame_data(windows, jumps, self.drive_impacts)}
+
+
+def summarize_frame_data(windows, punishable_jumps, drive_impacts):
+    """Agrega janelas, pulos e drive impacts no `summary` usado pelos insights."""
+
+    valid_advs = [w["on_block_adv"] for w in windows if w["on_block_adv"] != WHIFF_ADV]
     plus_on_block = sum(1 for a in valid_advs if a > 0)
     minus_on_block = sum(1 for a in valid_advs if a < 0)
     avg_on_block = sum(valid_advs) / len(valid_advs) if valid_advs else 0
 
-    summary = {
+    return {
         "plus_on_block": plus_on_block,
         "minus_on_block": minus_on_block,
         "avg_on_block": avg_on_block,
         "punishable_jumps": punishable_jumps,
-        "drive_impacts": [
-            {"frame_id": d.frame_id, "attacker": d.attacker, "defender": d.defender} for d in drive_impacts
-        ],
+        "drive_impacts": [dict(d) for d in drive_impacts],
         "whiff_punishes": [
             {"attacker": w.get("attacker"), "start": w.get("start"), "end": w.get("end"), "punishable": w.get("punishable", False)}
             for w in windows if w.get("whiff")
         ],
     }
 
-    return {"windows": windows, "summary": summary}
 
+def calculate_frame_data(timeline, events=None):
+    """
+    Analisa a timeline (lista de `FrameData`) e eventos para extrair métricas de frame data.
+
+    Produz:
+    - `windows`: janelas de ataque detectadas (inicio, fim, vantagem on-block ou marcações de whiff)
+    - `summary`: agregações úteis para gerar insights (contagens de plus/minus, pulos puníveis, drive impacts,
+        e whiff_punishes)
+
+    Conveniência sobre `FrameDataCalculator`: cada evento é empurrado junto com o
+    frame de mesmo `frame_id`; eventos sem frame correspondente são registrados
+    no fim e recebem a vantagem heurística do seu tipo.
+    """
+
+    by_frame = defaultdict(list)
+    for e in (events or []):
+        by_frame[e.frame_id].append(e)
+
+    calc = FrameDataCalculator()
+    for frame in timeline:
+        calc.push(frame, by_frame.pop(frame.frame_id, None))
+
+    leftover = [e for fid in sorted(by_frame) for e in by_frame[fid]]
+    if leftover:
+        calc.push_events(sorted(leftover, key=lambda e: e.frame_id))
+    calc.flush()
+    return calc.result()
+
+
+def _expand_spans(starts, ends):
+    """Todos os frames cobertos pelos spans `[start, end]` (ordenados)."""
+
+    lengths = ends - starts + 1
+    if not len(lengths):
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+    return np.arange(int(lengths.sum()), dtype=np.int64) + offsets
+
+
+def _acts_within(spans, player, frames, n_frames):
+    """Se `player` pode agir em algum frame de `[f, f + n_frames)` para cada `f`."""
+
+    nxt = spans.next_actionable_many(player, frames)
+    return (nxt >= 0) & (nxt < frames + n_frames)
+
+
+def _follow_chain(nxt, m):
+    """Nós visitados a partir de 0 seguindo `nxt` (estritamente crescente) até `m`.
+
+    Usa pointer doubling: a cada rodada as posições já conhecidas avançam
+    2^r passos de uma vez, então o custo é O(log(comprimento)) operações numpy.
+    """
+
+    if m == 0:
+        return np.zeros(0, dtype=np.int64)
+    path = np.zeros(1, dtype=np.int64)
+    jump = nxt
+    while path[-1] < m:
+        path = np.concatenate((path, jump[path]))
+        jump = jump[jump]
+    path = np.unique(path)
+    return path[path < m]
+
+
+def calculate_frame_data_arrays(arrays, events=None):
+    """
+    Versão vetorizada de `calculate_frame_data` sobre um `TimelineArrays`.
+
+    Em vez de percorrer frame a frame, monta um `StateSpanIndex` e resolve tudo
+    com aritmética de spans: "primeiro frame em que o jogador pode agir" é uma
+    busca binária sobre os spans livres, os pulos são os spans de `jump` e os
+    lookaheads de punição comparam esse próximo frame livre com o limite da
+    janela. Retorna o mesmo dicionário `{"windows": ..., "summary": ...}`.
+    """
+
+    spans = StateSpanIndex.from_arrays(arrays)
+    last = spans.last_frame
+    never = last + 1  # sentinela: "não acontece dentro da timeline"
+
+    def next_free(player, frames):
+        nxt = spans.next_actionable_many(player, frames)
+        return np.where(nxt < 0, never, nxt)
+
+    # --- janelas a partir de estados attack_active
+    # Resolve, para todo frame attack_active, onde uma janela aberta nele fecharia;
+    # a próxima abertura é o primeiro attack_active após o fim. A cadeia de
+    # janelas a partir da primeira abertura é obtida por pointer doubling.
+    closed = []  # (frame de fechamento, ordem do atacante, janela)
+    whiff_ends = []
+    for order, attacker in enumerate(("p1", "p2")):
+        defender = _opponent(attacker)
+        starts = _expand_spans(*spans.state_spans(attacker, "attack_active"))
+        m = len(starts)
+        if not m:
+            continue
+        af = next_free(attacker, starts)
+        df = next_free(defender, starts)
+        normal = np.where((af < never) & (df < never), np.maximum(af, df), never)
+        whiff = np.where(af < never, np.maximum(af, starts + WHIFF_MIN_FRAMES + 1), never)
+        whiff = np.minimum(whiff, never)
+        is_normal = (normal < never) & (normal <= whiff)
+        end = np.where(is_normal, normal, whiff)
+        # janela que nunca fecha encerra a cadeia (sentinela m)
+        nxt = np.append(np.where(end < never, np.searchsorted(starts, end + 1), m), m)
+
+        chain = _follow_chain(nxt, m)
+        chain = chain[end[chain] < never]
+        for s_fid, e_fid, is_n, adv in zip(
+            starts[chain].tolist(), end[chain].tolist(), is_normal[chain].tolist(), (af[chain] - df[chain]).tolist(),
+        ):
+            if is_n:
+                window = {"attacker": attacker, "start": s_fid, "end": e_fid, "on_block_adv": adv}
+            else:
+                window = {"attacker": attacker, "start": s_fid, "end": e_fid,
+                          "on_block_adv": WHIFF_ADV, "whiff": True, "punishable": False}
+                whiff_ends.append((window, defender))
+            closed.append((e_fid, order, window))
+
+    closed.sort(key=lambda item: (item[0], item[1]))
+    state_windows = [w for _, _, w in closed]
+
+    for defender in ("p1", "p2"):
+        items = [w for w, d in whiff_ends if d == defender]
+        if not items:
+            continue
+        ends = np.array([w["end"] for w in items], dtype=np.int64)
+        for w, p in zip(items, _acts_within(spans, defender, ends, WHIFF_PUNISH_FRAMES)):
+            w["punishable"] = bool(p)
+
+    # --- pulos: spans de jump; o pouso é o frame seguinte ao span
+    punishable_jumps = []
+    for player in ("p1", "p2"):
+        j_starts, j_ends = spans.state_spans(player, "jump")
+        lands = j_ends + 1
+        keep = lands <= last  # pulo em andamento no fim é descartado
+        j_starts, lands = j_starts[keep], lands[keep]
+        punish = _acts_within(spans, _opponent(player), lands, JUMP_PUNISH_FRAMES)
+        for s, l, p in zip(j_starts.tolist(), lands.tolist(), punish.tolist()):
+            punishable_jumps.append({"player": player, "start": s, "land": l, "punishable": p})
+
+    # --- janelas derivadas de eventos
+    events = list(events or [])
+    drive_impacts = [{"frame_id": e.frame_id, "attacker": e.attacker, "defender": e.defender}
+                     for e in events if e.type == "drive_impact"]
+
+    probes = [(e, _normalize_player(e.attacker)) for e in events if e.type in EVENT_WINDOW_TYPES]
+    probes = [(e, a) for e, a in probes if a is not None]
+    advs = [None] * len(probes)
+    for attacker in ("p1", "p2"):
+        sel = [i for i, (_, a) in enumerate(probes) if a == attacker]
+        if not sel:
+            continue
+        starts = np.array([probes[i][0].frame_id for i in sel], dtype=np.int64)
+        af = next_free(attacker, starts)
+        df = next_free(_opponent(attacker), starts)
+        limit = starts + EVENT_LOOKAHEAD
+        found = (af < limit) & (df < limit) & (af < never) & (df < never)
+        for j, i in enumerate(sel):
+            if found[j]:
+                advs[i] = int(af[j] - df[j])
+            else:
+                advs[i] = EVENT_HEURISTIC_ADV.get(probes[i][0].type, 0)
+
+    keys = {(w["attacker"], w["start"]) for w in state_windows}
+    event_windows = []
+    for (e, attacker), adv in zip(probes, advs):
+        key = (attacker, e.frame_id)
+        if key in keys:
+            continue
+        keys.add(key)
+        event_windows.append({"attacker": attacker, "start": e.frame_id, "on_block_adv": adv})
+
+    windows = state_windows + event_windows
+    return {"windows": windows, "summary": summarize_frame_data(windows, punishable_jumps, drive_impacts)}
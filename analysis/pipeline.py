@@ -0,0 +1,226 @@
+"""Execução do pipeline como um grafo linear de estágios com filas limitadas.
+
+Cada estágio é uma função `item -> item` com estado próprio (ex.: o frame
+anterior do estágio de visão). Com `threaded=True` a fonte e cada estágio rodam
+numa thread dedicada, ligados por `queue.Queue(maxsize)`; o consumidor (a
+iteração sobre `Pipeline.run()`) é o último estágio e roda na thread de quem
+chamou. As chamadas do OpenCV liberam o GIL, então decodificação, rastreamento
+e medições de frames diferentes se sobrepõem.
+
+Como cada estágio tem uma única thread e as filas são FIFO, os itens chegam a
+cada estágio na ordem da fonte (crescente em `frame_id`); com `order_key`, o
+consumidor verifica essa ordem.
+
+Por estágio, `Pipeline.stats()` reporta itens, tempo ocupado, tempo esperando
+entrada (fila vazia) e saída (fila cheia), profundidade média/máxima da fila de
+entrada e a utilização (ocupado / tempo total). O estágio com maior utilização
+é o gargalo; filas cheias antes dele e vazias depois confirmam.
+
+Com `threaded=False` os estágios rodam em sequência na thread de quem chamou
+(mesmos resultados, mesmas estatísticas de tempo ocupado).
+
+Uso:
+  pipeline = Pipeline(frames, [("vision", vision), ("analysis", analysis)])
+  for out in pipeline.run():
+      ...
+  pipeline.stats()
+"""
+
+import queue
+import threading
+import time
+
+QUEUE_SIZE = 32
+# intervalo (s) em que threads bloqueadas verificam se o pipeline foi encerrado
+_POLL = 0.1
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, stage, exc):
+        self.stage = stage
+        self.exc = exc
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.wait_in = 0.0
+        self.wait_out = 0.0
+        self._depth_sum = 0
+        self.max_depth = 0
+
+    def sample_depth(self, depth):
+        self._depth_sum += depth
+        self.max_depth = max(self.max_depth, depth)
+
+    def report(self, wall):
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "busy_seconds": self.busy,
+            "wait_in_seconds": self.wait_in,
+            "wait_out_seconds": self.wait_out,
+            "queue_depth_avg": self._depth_sum / self.items if self.items else 0.0,
+            "queue_depth_max": self.max_depth,
+            "utilization": self.busy / wall if wall > 0 else 0.0,
+        }
+
+
+class Pipeline:
+    """Fonte iterável + estágios `(nome, função)`; o último consumidor é o chamador de `run()`."""
+
+    def __init__(self, source, stages, maxsize=QUEUE_SIZE, threaded=True, source_name="decode", order_key=None):
+        self.source = source
+        self.stages = list(stages)
+        self.maxsize = maxsize
+        self.threaded = threaded
+        self.order_key = order_key
+        self._stats = [StageStats(source_name)] + [StageStats(name) for name, _ in self.stages] + [StageStats("output")]
+        self._stop = threading.Event()
+        self._wall = 0.0
+
+    # ------------------------------------------------------------- threads
+    def _put(self, q, item, stats):
+        t0 = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL)
+                break
+            except queue.Full:
+                continue
+        stats.wait_out += time.perf_counter() - t0
+
+    def _get(self, q, stats):
+        t0 = time.perf_counter()
+        stats.sample_depth(q.qsize())
+        while True:
+            try:
+                item = q.get(timeout=_POLL)
+                break
+            except queue.Empty:
+                if self._stop.is_set():
+                    item = _END
+                    break
+        stats.wait_in += time.perf_counter() - t0
+        return item
+
+    def _source_loop(self, out_q, stats):
+        try:
+            it = iter(self.source)
+            while not self._stop.is_set():
+                t0 = time.perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    break
+                finally:
+                    stats.busy += time.perf_counter() - t0
+                stats.items += 1
+                self._put(out_q, item, stats)
+        except BaseException as exc:
+            self._put(out_q, _Failure(stats.name, exc), stats)
+            return
+        self._put(out_q, _END, stats)
+
+    def _stage_loop(self, fn, in_q, out_q, stats):
+        while True:
+            item = self._get(in_q, stats)
+            if item is _END or isinstance(item, _Failure):
+                self._put(out_q, item, stats)
+                return
+            t0 = time.perf_counter()
+            try:
+                result = fn(item)
+            except BaseException as exc:
+                self._put(out_q, _Failure(stats.name, exc), stats)
+                return
+            finally:
+                stats.busy += time.perf_counter() - t0
+            stats.items += 1
+            self._put(out_q, result, stats)
+
+    # --------------------------------------------------------------- execução
+    def run(self):
+        """Itera sobre as saídas do último estágio, em ordem."""
+
+        t0 = time.perf_counter()
+        try:
+            if self.threaded:
+                yield from self._run_threaded()
+            else:
+                yield from self._run_inline()
+        finally:
+            self._wall = time.perf_counter() - t0
+
+    def _check_order(self, item, last):
+        if self.order_key is None:
+            return None
+        key = self.order_key(item)
+        if last is not None and key <= last:
+            raise RuntimeError(f"pipeline output out of order: {key} after {last}")
+        return key
+
+    def _run_inline(self):
+        src, out = self._stats[0], self._stats[-1]
+        it = iter(self.source)
+        last = None
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                break
+            finally:
+                src.busy += time.perf_counter() - t0
+            src.items += 1
+            for (_, fn), stats in zip(self.stages, self._stats[1:-1]):
+                t0 = time.perf_counter()
+                item = fn(item)
+                stats.busy += time.perf_counter() - t0
+                stats.items += 1
+            last = self._check_order(item, last)
+            t0 = time.perf_counter()
+            yield item
+            out.busy += time.perf_counter() - t0
+            out.items += 1
+
+    def _run_threaded(self):
+        queues = [queue.Queue(self.maxsize) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._source_loop, args=(queues[0], self._stats[0]),
+                                    name=f"pipeline-{self._stats[0].name}", daemon=True)]
+        for k, (name, fn) in enumerate(self.stages):
+            threads.append(threading.Thread(target=self._stage_loop, args=(fn, queues[k], queues[k + 1], self._stats[k + 1]),
+                                            name=f"pipeline-{name}", daemon=True))
+        for t in threads:
+            t.start()
+
+        out = self._stats[-1]
+        last = None
+        try:
+            while True:
+                item = self._get(queues[-1], out)
+                if item is _END:
+                    break
+                if isinstance(item, _Failure):
+                    raise item.exc
+                last = self._check_order(item, last)
+                t0 = time.perf_counter()
+                yield item
+                out.busy += time.perf_counter() - t0
+                out.items += 1
+        finally:
+            # consumidor terminou (ou desistiu/falhou): libera as threads bloqueadas
+            self._stop.set()
+            for t in threads:
+                t.join()
+
+    def stats(self):
+        """Estatísticas por estágio (fonte, estágios, consumidor) e o gargalo."""
+
+        stages = [s.report(self._wall) for s in self._stats]
+        bottleneck = max(stages, key=lambda s: s["utilization"])["stage"] if stages else None
+        return {"threaded": self.threaded, "wall_seconds": self._wall, "bottleneck": bottleneck, "stages": stages}
@@ -0,0 +1,397 @@
+"""Relatórios de pós-processamento sobre resultados em memória.
+
+Estas funções recebem o dicionário produzido por `main.run` (o mesmo conteúdo
+de `output/results.json`) e devolvem estruturas Python simples, sem reler
+arquivos intermediários nem reabrir o vídeo: o fps vem de `results["metadata"]`.
+
+- `punish_report(results)`: oportunidades (whiffs e pulos puníveis) com tempos
+- `segment_summary(report, segment_seconds)`: contagens por segmento de tempo
+- `segment_rollups(reports, granularities)`: várias granularidades (segundos,
+  round, partida) numa única passada, para uma ou várias partidas
+- `plot_segment_summary(summary, path)`: gráfico PNG (requer matplotlib)
+- `build_reports(results, out_dir)`: gera todos os artefatos de uma vez
+- `results_from_timeline(timeline)`: frame-data, rounds e insights recalculados
+  da timeline binária (`analysis.timeline_file`), sem vídeo nem visão
+- `load_run_results(results_path, timeline_path)`: `results.json`, ou o
+  recálculo pela timeline quando ele não existe ou é mais antigo que ela
+
+As ferramentas em `tools/` são wrappers finos sobre este módulo.
+"""
+
+import csv
+import json
+import os
+
+import numpy as np
+
+from analysis.events import detect_events_arrays
+from analysis.frame_data import calculate_frame_data_arrays
+from analysis.insights import generate_insights
+from analysis.rounds import RoundTracker
+from analysis.timeline_file import TimelineFile
+from models.timeline import GAME_STATE_NAMES
+
+DEFAULT_FPS = 60.0
+SEGMENT_SECONDS = 60
+ROLLUP_GRANULARITIES = (10, 60, "round", "match")
+
+PUNISH_FIELDS = ["type", "player", "start_frame", "end_frame", "punishable", "start_time", "end_time"]
+ROLLUP_METRICS = ("total_opportunities", "whiffs", "whiff_punishable", "punishable_jumps")
+SEGMENT_FIELDS = ["segment_index", "start_time", "end_time", "total_opportunities", "whiffs", "whiff_punishable", "punishable_jumps"]
+
+
+def results_fps(results, default=None):
+    """fps registrado na execução (`results["metadata"]["fps"]`), ou `default`."""
+
+    fps = (results.get("metadata") or {}).get("fps")
+    return fps if fps and fps > 0 else default
+
+
+def seconds_from_frame(frame_id, fps):
+    return frame_id / fps if fps and fps > 0 and frame_id is not None else None
+
+
+def punish_report(results, fps=None):
+    """Extrai `whiff_punishes` e `punishable_jumps` de `frame_data.summary` em linhas."""
+
+    if fps is None:
+        fps = results_fps(results)
+
+    summary = results.get("frame_data", {}).get("summary", {})
+    whiffs = summary.get("whiff_punishes", [])
+    jumps = summary.get("punishable_jumps", [])
+
+    rows = []
+    for w in whiffs:
+        start = w.get("start")
+        end = w.get("end")
+        rows.append({
+            "type": "whiff_punish",
+            "player": w.get("attacker"),
+            "start_frame": start,
+            "end_frame": end,
+            "punishable": bool(w.get("punishable")),
+            "start_time": seconds_from_frame(start, fps),
+            "end_time": seconds_from_frame(end, fps),
+        })
+
+    for j in jumps:
+        rows.append({
+            "type": "punishable_jump",
+            "player": j.get("player"),
+            "start_frame": j.get("start"),
+            "end_frame": j.get("land"),
+            "punishable": bool(j.get("punishable")),
+            "start_time": seconds_from_frame(j.get("start"), fps),
+            "end_time": seconds_from_frame(j.get("land"), fps),
+        })
+
+    rounds = [
+        {**r, "start_time": seconds_from_frame(r["start_frame"], fps), "end_time": seconds_from_frame(r["end_frame"], fps)}
+        for r in results.get("rounds", [])
+    ]
+
+    return {
+        "match": (results.get("metadata") or {}).get("source"),
+        "counts": {"whiffs": len(whiffs), "punishable_jumps": len([j for j in jumps if j.get("punishable")])},
+        "rows": rows,
+        "rounds": rounds,
+    }
+
+
+def _opportunity_table(reports):
+    """Linhas com tempo de todos os reports como colunas numpy, ordenadas por (partida, tempo)."""
+
+    match, times, whiff, jump, punishable = [], [], [], [], []
+    for m, report in enumerate(reports):
+        for r in report.get("rows", []):
+            if r.get("start_time") is None:
+                continue
+            match.append(m)
+            times.append(r["start_time"])
+            whiff.append(r.get("type") == "whiff_punish")
+            jump.append(r.get("type") == "punishable_jump")
+            punishable.append(bool(r.get("punishable")))
+
+    match = np.asarray(match, dtype=np.int64)
+    times = np.asarray(times, dtype=np.float64)
+    order = np.lexsort((times, match))
+    whiff = np.asarray(whiff, dtype=bool)[order]
+    jump = np.asarray(jump, dtype=bool)[order]
+    punishable = np.asarray(punishable, dtype=bool)[order]
+    metrics = {
+        "total_opportunities": np.ones(len(order), dtype=bool),
+        "whiffs": whiff,
+        "whiff_punishable": whiff & punishable,
+        "punishable_jumps": jump & punishable,
+    }
+    # limites de cada partida nas linhas ordenadas
+    bounds = np.searchsorted(match[order], np.arange(len(reports) + 1), side="left")
+    return times[order], bounds, metrics
+
+
+def _time_bins(times, bounds, seconds):
+    """Segmentos fixos de `seconds`: bin por linha e, por partida, lista de (início, fim)."""
+
+    bins = np.floor(times / seconds).astype(np.int64)
+    spans = []
+    for m in range(len(bounds) - 1):
+        lo, hi = bounds[m], bounds[m + 1]
+        n = int(bins[hi - 1]) + 1 if hi > lo else 0
+        spans.append([(k * seconds, (k + 1) * seconds) for k in range(n)])
+    return bins, spans
+
+
+def _round_bins(times, bounds, reports):
+    """Bin = round que contém a linha (-1 fora de qualquer round)."""
+
+    bins = np.full(len(times), -1, dtype=np.int64)
+    spans = []
+    for m, report in enumerate(reports):
+        lo, hi = bounds[m], bounds[m + 1]
+        rounds = [r for r in report.get("rounds", []) if r.get("start_time") is not None]
+        if not rounds:
+            # sem rounds registrados: a partida inteira conta como um round
+            end = float(times[hi - 1]) if hi > lo else 0.0
+            rounds = [{"start_time": 0.0, "end_time": end}]
+        starts = np.asarray([r["start_time"] for r in rounds], dtype=np.float64)
+        ends = np.asarray([r["end_time"] for r in rounds], dtype=np.float64)
+        k = np.searchsorted(starts, times[lo:hi], side="right") - 1
+        inside = (k >= 0) & (times[lo:hi] <= ends[np.maximum(k, 0)])
+        bins[lo:hi] = np.where(inside, k, -1)
+        spans.append([(r["start_time"], r["end_time"]) for r in rounds])
+    return bins, spans
+
+
+def _match_bins(times, bounds):
+    spans = []
+    for m in range(len(bounds) - 1):
+        lo, hi = bounds[m], bounds[m + 1]
+        spans.append([(0.0, float(times[hi - 1]) if hi > lo else 0.0)])
+    return np.zeros(len(times), dtype=np.int64), spans
+
+
+def _rollup(bins, spans, bounds, metrics, names):
+    """Conta as métricas por (partida, bin) com um único `bincount` por métrica."""
+
+    sizes = np.asarray([len(s) for s in spans], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+    match = np.repeat(np.arange(len(spans)), np.diff(bounds))
+    valid = bins >= 0
+    flat = (offsets[match] + bins)[valid]
+    counts = {
+        name: np.bincount(flat, weights=values[valid], minlength=int(offsets[-1])).astype(np.int64)
+        for name, values in metrics.items()
+    }
+
+    segments = []
+    for m, match_spans in enumerate(spans):
+        for k, (start_t, end_t) in enumerate(match_spans):
+            seg = {"match": names[m], "segment_index": k, "start_time": start_t, "end_time": end_t}
+            for name in ROLLUP_METRICS:
+                seg[name] = int(counts[name][offsets[m] + k])
+            segments.append(seg)
+    return segments
+
+
+def _report_name(report, i):
+    return report.get("match") or f"match_{i}"
+
+
+def segment_rollups(reports, granularities=ROLLUP_GRANULARITIES):
+    """Contagens de oportunidades em várias granularidades de uma vez.
+
+    - reports: um `punish_report` ou lista deles (uma partida cada)
+    - granularities: segundos (int/float), `"round"` e/ou `"match"`
+
+    As linhas são ordenadas uma única vez por (partida, tempo); cada
+    granularidade vira um vetor de bins e um `bincount` por métrica, então o
+    custo é O(linhas log linhas + segmentos), não O(segmentos × linhas).
+
+    Retorna `{"matches": [...], "rollups": {"10s": [...], "round": [...], ...}}`,
+    em que cada segmento tem `match`, `segment_index`, `start_time`,
+    `end_time` e as contagens de `ROLLUP_METRICS`.
+    """
+
+    if isinstance(reports, dict):
+        reports = [reports]
+    names = [_report_name(r, i) for i, r in enumerate(reports)]
+    times, bounds, metrics = _opportunity_table(reports)
+
+    rollups = {}
+    for g in granularities:
+        if g == "round":
+            key, (bins, spans) = "round", _round_bins(times, bounds, reports)
+        elif g == "match":
+            key, (bins, spans) = "match", _match_bins(times, bounds)
+        else:
+            key, (bins, spans) = f"{g}s", _time_bins(times, bounds, g)
+        rollups[key] = _rollup(bins, spans, bounds, metrics, names)
+
+    return {"matches": names, "rollups": rollups}
+
+
+def segment_summary(report, segment_seconds=SEGMENT_SECONDS):
+    """Agrupa as linhas de `punish_report` em segmentos de `segment_seconds`.
+
+    Retorna None quando nenhuma linha tem `start_time`.
+    """
+
+    rollup = segment_rollups([report], (segment_seconds,))["rollups"][f"{segment_seconds}s"]
+    if not rollup:
+        return None
+
+    segments = [{k: v for k, v in seg.items() if k != "match"} for seg in rollup]
+    return {"segment_seconds": segment_seconds, "segments": segments}
+
+
+def write_punish_report(report, csv_path, json_path):
+    with open(csv_path, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=PUNISH_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for r in report["rows"]:
+            writer.writerow(r)
+
+    with open(json_path, "w", encoding="utf-8") as jf:
+        json.dump(report, jf, indent=2)
+
+
+def write_segment_summary(summary, json_path, csv_path):
+    # escreve resumo por segmento em JSON
+    with open(json_path, "w", encoding="utf-8") as jf:
+        json.dump(summary, jf, indent=2)
+
+    with open(csv_path, "w", newline="", encoding="utf-8") as cf:
+        writer = csv.DictWriter(cf, fieldnames=SEGMENT_FIELDS)
+        writer.writeheader()
+        for seg in summary["segments"]:
+            writer.writerow(seg)
+
+
+def plot_segment_summary(summary, png_path):
+    """Plota contagens por segmento. Labels em Português (pt-BR)."""
+
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    segments = summary.get("segments", [])
+    idx = [s["segment_index"] for s in segments]
+    totals = [s["total_opportunities"] for s in segments]
+    whiffs = [s["whiffs"] for s in segments]
+    whiff_pun = [s["whiff_punishable"] for s in segments]
+
+    plt.figure(figsize=(10, 4))
+    plt.plot(idx, totals, marker='o', label='oportunidades totais')
+    plt.plot(idx, whiffs, marker='o', label='whiffs')
+    plt.plot(idx, whiff_pun, marker='o', label='whiffs puníveis')
+    plt.xlabel('Segmento (índice)')
+    plt.ylabel('Contagem')
+    plt.title('Oportunidades de punição por segmento')
+    plt.legend(title='Legenda')
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(png_path)
+    plt.close()
+
+
+def write_segment_rollups(rollups, json_path):
+    with open(json_path, "w", encoding="utf-8") as jf:
+        json.dump(rollups, jf, indent=2)
+
+
+def build_reports(results, out_dir="output", segment_seconds=SEGMENT_SECONDS, plot=True,
+                  granularities=ROLLUP_GRANULARITIES):
+    """Gera punish report, resumos por segmento/round/partida e gráfico a partir de `results`.
+
+    Retorna um dicionário `{artefato: caminho}` com o que foi escrito.
+    """
+
+    os.makedirs(out_dir, exist_ok=True)
+    written = {}
+
+    report = punish_report(results)
+    paths = (os.path.join(out_dir, "punish_report.csv"), os.path.join(out_dir, "punish_report.json"))
+    write_punish_report(report, *paths)
+    written["punish_report_csv"], written["punish_report_json"] = paths
+
+    path = os.path.join(out_dir, "segment_rollups.json")
+    write_segment_rollups(segment_rollups([report], granularities), path)
+    written["segment_rollups_json"] = path
+
+    summary = segment_summary(report, segment_seconds)
+    if summary is None:
+        return written
+
+    paths = (os.path.join(out_dir, "segment_summary.json"), os.path.join(out_dir, "segment_summary.csv"))
+    write_segment_summary(summary, *paths)
+    written["segment_summary_json"], written["segment_summary_csv"] = paths
+
+    if plot and summary["segments"]:
+        try:
+            png = os.path.join(out_dir, "segment_summary.png")
+            plot_segment_summary(summary, png)
+            written["segment_summary_png"] = png
+        except ImportError:
+            pass
+
+    return written
+
+
+def _timeline_rounds(arrays):
+    """Rounds de `RoundTracker` empurrando só as linhas em que `game_state` muda (e a última)."""
+
+    codes = arrays.game_state
+    rows = np.flatnonzero(np.diff(codes, prepend=-1)) if len(codes) else np.zeros(0, dtype=np.int64)
+    if len(codes) and rows[-1] != len(codes) - 1:
+        rows = np.append(rows, len(codes) - 1)
+    tracker = RoundTracker()
+    for fid, code in zip(arrays.frame_id[rows].tolist(), codes[rows].tolist()):
+        tracker.push(fid, GAME_STATE_NAMES[code])
+    return tracker.flush()
+
+
+def results_from_timeline(timeline):
+    """Resultados recalculados de um `TimelineFile`, no formato de `results.json`.
+
+    Os eventos são re-detectados das colunas com a tabela de regras atual
+    (`detect_events_arrays`), como o frame-data (`calculate_frame_data_arrays`):
+    um `results.json` desatualizado em geral vem de uma versão anterior da
+    análise, e a tabela de eventos gravada seguiria as regras daquela versão.
+    `metadata` é a da execução que gravou a timeline. Não há `stream` nem
+    `pipeline`.
+    """
+
+    arrays = timeline.arrays
+    events = detect_events_arrays(arrays)
+    frame_data = calculate_frame_data_arrays(arrays, events)
+    return {
+        "metadata": dict(timeline.metadata),
+        "rounds": _timeline_rounds(arrays),
+        "frame_data": frame_data,
+        "insights": generate_insights(frame_data),
+        "events": [e.__dict__ for e in events],
+        "recomputed_from": timeline.path,
+    }
+
+
+def load_run_results(results_path, timeline_path=None):
+    """`results.json` da execução, ou `results_from_timeline` se ele faltar ou for mais antigo que a timeline.
+
+    Retorna None se nenhum dos dois puder ser lido.
+    """
+
+    has_timeline = timeline_path is not None and os.path.exists(timeline_path)
+    if os.path.exists(results_path) and not (has_timeline and os.path.getmtime(results_path) < os.path.getmtime(timeline_path)):
+        try:
+            with open(results_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    if not has_timeline:
+        return None
+    try:
+        return results_from_timeline(TimelineFile(timeline_path))
+    except (OSError, ValueError):
+        return None
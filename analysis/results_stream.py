@@ -0,0 +1,121 @@
+"""Escrita incremental de resultados em NDJSON (um objeto JSON por linha).
+
+Em vez de acumular tudo e gravar um único JSON no fim da execução, o pipeline
+pode anexar cada registro assim que ele fica pronto: frames, eventos, janelas,
+pulos puníveis e drive impacts. O arquivo é descarregado periodicamente (por
+quantidade de registros ou por tempo), então outros processos podem
+acompanhá-lo com `tail -f`. A última linha é um documento `summary` pequeno.
+
+Cada linha tem a chave `kind` indicando o tipo do registro:
+`frame`, `event`, `window`, `punishable_jump`, `drive_impact` ou `summary`.
+"""
+
+import json
+import os
+import time
+
+
+def frame_record(fd):
+    """Converte um `FrameData` em dicionário serializável."""
+
+    rec = dict(fd.__dict__)
+    rec["p1_bbox"] = list(fd.p1_bbox) if fd.p1_bbox is not None else None
+    rec["p2_bbox"] = list(fd.p2_bbox) if fd.p2_bbox is not None else None
+    return rec
+
+
+class NDJSONResultsWriter:
+    """Escritor NDJSON com flush periódico.
+
+    `resume_offset` (de `tell()`) reabre um arquivo existente, truncado nesse
+    offset, e continua anexando a partir dele.
+
+    Uso:
+      with NDJSONResultsWriter("output/results.ndjson") as out:
+          out.write_frame(fd)
+          out.write_event(e)
+          out.write("window", window)
+          out.write_summary({...})
+    """
+
+    def __init__(self, path, flush_every=500, flush_seconds=1.0, resume_offset=None):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.records = 0
+
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        if resume_offset is not None and os.path.exists(path):
+            # retomada: descarta o que foi escrito depois do checkpoint
+            self._f = open(path, "r+", encoding="utf-8")
+            self._f.seek(resume_offset)
+            self._f.truncate()
+        else:
+            self._f = open(path, "w", encoding="utf-8")
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def write(self, kind, record):
+        """Anexa um registro `{"kind": kind, **record}`."""
+
+        line = json.dumps({"kind": kind, **record}, separators=(",", ":"))
+        self._f.write(line)
+        self._f.write("\n")
+        self.records += 1
+        self._pending += 1
+        if self._pending >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def write_frame(self, fd):
+        self.write("frame", frame_record(fd))
+
+    def write_event(self, event):
+        self.write("event", dict(event.__dict__))
+
+    def write_summary(self, summary):
+        """Escreve o documento final e descarrega o arquivo."""
+
+        self.write("summary", summary)
+        self.flush()
+
+    def flush(self):
+        self._f.flush()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def tell(self):
+        """Descarrega e retorna o offset atual (para checkpoints)."""
+
+        self.flush()
+        return self._f.tell()
+
+    def close(self):
+        if not self._f.closed:
+            self.flush()
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_ndjson(path, kinds=None):
+    """Itera os registros de um arquivo NDJSON (opcionalmente filtrando por `kind`).
+
+    Linhas incompletas no fim (arquivo ainda sendo escrito) são ignoradas.
+    """
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            if kinds is None or rec.get("kind") in kinds:
+                yield rec
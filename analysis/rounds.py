@@ -0,0 +1,61 @@
+"""Delimitação de rounds a partir das transições de `game_state`.
+
+Um round começa no início de um overlay `FIGHT` (ou no primeiro frame, se o
+vídeo começa com o round em andamento) e termina no primeiro frame de `KO`.
+Frames entre um KO e o próximo `FIGHT` (replay, tela de vitória) não pertencem
+a nenhum round.
+"""
+
+
+class RoundTracker:
+    """Acumula rounds frame a frame.
+
+    Uso:
+      rounds = RoundTracker()
+      rounds.push(frame_id, game_state)
+      ...
+      rounds.flush()  # fecha o round aberto no último frame
+      rounds.rounds   # [{"index", "start_frame", "end_frame"}, ...]
+    """
+
+    def __init__(self):
+        self.rounds = []
+        self._open = None
+        self._prev = None
+        self._last_frame = None
+
+    def push(self, frame_id, game_state):
+        if self._last_frame is None and game_state not in ("KO", "REPLAY"):
+            # vídeo começou no meio de um round
+            self._open = frame_id
+
+        if game_state == "FIGHT" and self._prev != "FIGHT" and self._open is None:
+            self._open = frame_id
+        elif game_state == "KO" and self._prev != "KO" and self._open is not None:
+            self._close(frame_id)
+
+        self._prev = game_state
+        self._last_frame = frame_id
+
+    def _close(self, end_frame):
+        self.rounds.append({"index": len(self.rounds), "start_frame": self._open, "end_frame": end_frame})
+        self._open = None
+
+    def flush(self):
+        """Fecha o round em andamento (se houver) no último frame visto."""
+
+        if self._open is not None and self._last_frame is not None:
+            self._close(self._last_frame)
+        return self.rounds
+
+    def state_dict(self):
+        return {"rounds": self.rounds, "open": self._open, "prev": self._prev, "last_frame": self._last_frame}
+
+    @classmethod
+    def from_state(cls, state):
+        tracker = cls()
+        tracker.rounds = list(state["rounds"])
+        tracker._open = state["open"]
+        tracker._prev = state["prev"]
+        tracker._last_frame = state["last_frame"]
+        return tracker
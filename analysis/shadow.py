@@ -0,0 +1,218 @@
+"""Configs sombra: análises extras sobre os mesmos registros de visão da principal.
+
+Cada `ShadowRun` tem a própria `FrameAnalysis` (estado, vida, eventos,
+frame-data, rounds) e compara, frame a frame, o seu `FrameData` com o da
+análise principal. Ao fim, `ShadowRun.report` produz os resultados da sombra
+e um diff contra a principal:
+
+- `frames`: quantos frames diferem e em quais campos (`FIELDS`), com amostras
+  dos primeiros frames divergentes
+- `events`: contagem por tipo nas duas análises e eventos só em uma delas
+  (comparados por `(type, frame_id, attacker)`), com amostras dos primeiros
+  eventos divergentes
+- `frame_data_summary`: valores das duas análises e delta para os campos
+  numéricos; contagens para as listas (pulos, drive impacts, whiffs)
+- `rounds` / `insights`: contagens
+"""
+
+from collections import Counter
+
+from analysis.frame_analysis import AnalysisConfig, FrameAnalysis
+from models.structures import Event
+
+FIELDS = ("p1_state", "p2_state", "life_p1", "life_p2", "game_state")
+# frames divergentes guardados como amostra no diff
+DIFF_SAMPLES = 20
+
+
+def _event_key(e):
+    return (e.type, e.frame_id, e.attacker)
+
+
+def _sample_order(key):
+    # por frame; empates em ordem fixa (a ordem do set depende do hash das strings)
+    event_type, frame_id, attacker = key
+    return frame_id, event_type, attacker or ""
+
+
+class ShadowDiff:
+    """Acumula as diferenças por frame e os eventos emitidos pelas duas análises.
+
+    Os eventos de um frame têm o `frame_id` daquele frame (spans são emitidos
+    no início), então as duas análises são comparadas frame a frame e só as
+    contagens e as primeiras `samples` divergências ficam guardadas.
+    """
+
+    def __init__(self, samples=DIFF_SAMPLES):
+        self.samples = samples
+        self.frames = 0
+        self.frames_differing = 0
+        self.fields = Counter()
+        self.first_differences = []
+        self.primary_types = Counter()
+        self.shadow_types = Counter()
+        self.only_primary = 0
+        self.only_shadow = 0
+        self.only_primary_sample = []
+        self.only_shadow_sample = []
+
+    def push(self, primary, shadow, primary_events, shadow_events):
+        self.frames += 1
+        changed = {f: [getattr(primary, f), getattr(shadow, f)] for f in FIELDS if getattr(primary, f) != getattr(shadow, f)}
+        if changed:
+            self.frames_differing += 1
+            self.fields.update(changed.keys())
+            if len(self.first_differences) < self.samples:
+                self.first_differences.append({"frame_id": primary.frame_id, **changed})
+        if not primary_events and not shadow_events:
+            return
+        primary_keys = {_event_key(e) for e in primary_events}
+        shadow_keys = {_event_key(e) for e in shadow_events}
+        self.primary_types.update(k[0] for k in primary_keys)
+        self.shadow_types.update(k[0] for k in shadow_keys)
+        only_primary = primary_keys - shadow_keys
+        only_shadow = shadow_keys - primary_keys
+        self.only_primary += len(only_primary)
+        self.only_shadow += len(only_shadow)
+        for keys, sample in ((only_primary, self.only_primary_sample), (only_shadow, self.only_shadow_sample)):
+            if keys and len(sample) < self.samples:
+                sample.extend([list(k) for k in sorted(keys, key=_sample_order)][:self.samples - len(sample)])
+
+    def report(self, primary_result, shadow_result):
+        primary_types, shadow_types = self.primary_types, self.shadow_types
+        return {
+            "frames": {
+                "compared": self.frames,
+                "differing": self.frames_differing,
+                "fields": dict(self.fields),
+                "first_differences": self.first_differences,
+            },
+            "events": {
+                "by_type": {
+                    t: {"primary": primary_types[t], "shadow": shadow_types[t]}
+                    for t in sorted(set(primary_types) | set(shadow_types))
+                },
+                "only_primary": self.only_primary,
+                "only_shadow": self.only_shadow,
+                "only_primary_sample": list(self.only_primary_sample),
+                "only_shadow_sample": list(self.only_shadow_sample),
+            },
+            "frame_data_summary": summary_diff(primary_result["frame_data"]["summary"], shadow_result["frame_data"]["summary"]),
+            "rounds": {"primary": len(primary_result["rounds"]), "shadow": len(shadow_result["rounds"])},
+            "insights": {"primary": len(primary_result["insights"]), "shadow": len(shadow_result["insights"])},
+        }
+
+    def state_dict(self):
+        return {
+            "frames": self.frames,
+            "frames_differing": self.frames_differing,
+            "fields": dict(self.fields),
+            "first_differences": self.first_differences,
+            "primary_types": dict(self.primary_types),
+            "shadow_types": dict(self.shadow_types),
+            "only_primary": self.only_primary,
+            "only_shadow": self.only_shadow,
+            "only_primary_sample": self.only_primary_sample,
+            "only_shadow_sample": self.only_shadow_sample,
+        }
+
+    @classmethod
+    def from_state(cls, state, samples=DIFF_SAMPLES):
+        diff = cls(samples)
+        diff.frames = state["frames"]
+        diff.frames_differing = state["frames_differing"]
+        diff.fields = Counter(state["fields"])
+        diff.first_differences = list(state["first_differences"])
+        diff.primary_types = Counter(state["primary_types"])
+        diff.shadow_types = Counter(state["shadow_types"])
+        diff.only_primary = state["only_primary"]
+        diff.only_shadow = state["only_shadow"]
+        diff.only_primary_sample = [list(k) for k in state["only_primary_sample"]]
+        diff.only_shadow_sample = [list(k) for k in state["only_shadow_sample"]]
+        return diff
+
+
+def summary_diff(primary, shadow):
+    """Diff do `summary` do frame-data: delta nos números, contagem nas listas."""
+
+    out = {}
+    for key in sorted(set(primary) | set(shadow)):
+        a, b = primary.get(key), shadow.get(key)
+        if isinstance(a, list) or isinstance(b, list):
+            a, b = len(a or []), len(b or [])
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            out[key] = {"primary": a, "shadow": b, "delta": b - a}
+        else:
+            out[key] = {"primary": a, "shadow": b}
+    return out
+
+
+class ShadowRun:
+    """
+    Uma config sombra acompanhando a análise principal.
+
+    Uso:
+      shadow = ShadowRun(config, fps)
+      for rec in records:
+          data, frame_events, _ = primary.step(rec)
+          shadow.step(rec, data, frame_events)
+      shadow.flush()
+      shadow.report(primary_result)  # {"name", "config", "result", "events", "diff"}
+    """
+
+    def __init__(self, config: AnalysisConfig, fps=60.0):
+        self.config = config
+        self.analysis = FrameAnalysis(config, fps)
+        self.events = []
+        self.diff = ShadowDiff()
+
+    @property
+    def name(self):
+        return self.config.name
+
+    def step(self, rec, primary_data, primary_events):
+        data, frame_events, _ = self.analysis.step(rec)
+        self.events.extend(frame_events)
+        self.diff.push(primary_data, data, primary_events, frame_events)
+        return data
+
+    def flush(self):
+        self.analysis.flush()
+
+    def report(self, primary_result):
+        result = self.analysis.result()
+        return {
+            "name": self.name,
+            "config": self.config.to_dict(),
+            "result": result,
+            "events": [e.__dict__ for e in self.events],
+            "diff": self.diff.report(primary_result, result),
+        }
+
+    def state_dict(self, first_event=0, first_closed=None):
+        """Estado serializável; só os eventos a partir de `first_event` (os anteriores ficam com o chamador).
+
+        `first_closed`: idem para os resultados de frame-data (ver `FrameAnalysis.state_dict`).
+        """
+
+        return {
+            "config": self.config.to_dict(),
+            "analysis": self.analysis.state_dict(first_closed),
+            "events": [e.__dict__ for e in self.events[first_event:]],
+            "diff": self.diff.state_dict(),
+        }
+
+    @classmethod
+    def from_state(cls, state, fps=60.0, saved_events=(), saved_closed=None):
+        """Reconstrói a sombra; `saved_events` são os eventos anteriores aos de `state["events"]`.
+
+        `saved_closed`: idem para os resultados de frame-data.
+        """
+
+        config = AnalysisConfig.from_dict(state["config"])
+        shadow = cls(config, fps)
+        shadow.events = [Event(**e) for e in list(saved_events) + state["events"]]
+        shadow.analysis = FrameAnalysis.from_state(state["analysis"], config, fps, known_events=shadow.events,
+                                                  saved_closed=saved_closed)
+        shadow.diff = ShadowDiff.from_state(state["diff"])
+        return shadow
@@ -0,0 +1,182 @@
+"""Índice de spans (run-length) de estado por jogador.
+
+Frames consecutivos quase sempre repetem o mesmo `p1_state`/`p2_state`, então a
+timeline de cada jogador é codificada como sequências (spans) ordenadas de
+`(início, fim, estado, can_act)`. Consultas pontuais viram buscas binárias
+sobre os inícios dos spans:
+
+- `state_at(player, frame)`: estado do jogador no frame, O(log n)
+- `next_actionable(player, frame)`: primeiro frame >= `frame` em que o jogador pode agir
+- `spans_in(player, start, stop)`: spans que cobrem o intervalo `[start, stop)`
+
+Os `frame_id` da timeline são considerados contíguos (como os produzidos por
+`main.run`). A forma codificada (`encode`/`decode`) é um jeito compacto de
+guardar timelines completas.
+
+O consumidor é `analysis.frame_data.calculate_frame_data_arrays`: janelas,
+lookahead de whiff/pulo e vantagem de eventos viram buscas sobre os spans. Ele
+é usado no recálculo offline de uma timeline gravada
+(`analysis.reports.results_from_timeline`). O streaming de `main.run` não tem
+a timeline inteira e segue frame a frame (`FrameDataCalculator`). O vídeo de
+debug e os resumos por segmento consultam janelas e oportunidades já
+calculadas (`WhiffIndex`, tabela de oportunidades), não o estado por frame.
+"""
+
+import numpy as np
+
+from models.timeline import STATE_CODES, state_name
+
+
+class StateSpanIndex:
+    """Spans de estado/can_act por jogador (`p1`, `p2`)."""
+
+    def __init__(self, first_frame, last_frame, players):
+        # players: {"p1": {"starts", "ends", "states", "can_act"}, ...} com arrays numpy
+        self.first_frame = first_frame
+        self.last_frame = last_frame
+        self._players = players
+        # spans em que o jogador pode agir (para `next_actionable`)
+        self._actionable = {}
+        for player, cols in players.items():
+            sel = cols["can_act"]
+            self._actionable[player] = (cols["starts"][sel], cols["ends"][sel])
+
+    # ---------------------------------------------------------------- criação
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Constrói o índice a partir de um `TimelineArrays`."""
+
+        fids = arrays.frame_id.astype(np.int64)
+        n = len(fids)
+        players = {}
+        for player in ("p1", "p2"):
+            state = arrays.column(player, "state")
+            can = arrays.column(player, "can_act")
+            if n:
+                change = np.flatnonzero((state[1:] != state[:-1]) | (can[1:] != can[:-1])) + 1
+                first = np.concatenate(([0], change))
+                last = np.concatenate((change - 1, [n - 1]))
+            else:
+                first = last = np.zeros(0, dtype=np.int64)
+            players[player] = {
+                "starts": fids[first],
+                "ends": fids[last],
+                "states": state[first].astype(np.int8),
+                "can_act": can[first].astype(bool),
+            }
+        first_frame = int(fids[0]) if n else 0
+        last_frame = int(fids[-1]) if n else -1
+        return cls(first_frame, last_frame, players)
+
+    @classmethod
+    def from_frames(cls, frames):
+        """Constrói o índice a partir de uma lista de `FrameData`."""
+
+        from models.timeline import TimelineArrays
+
+        return cls.from_arrays(TimelineArrays.from_frames(frames))
+
+    # --------------------------------------------------------------- consultas
+    def _span_of(self, player, frame):
+        starts = self._players[player]["starts"]
+        k = int(np.searchsorted(starts, frame, side="right")) - 1
+        if k < 0 or frame > self._players[player]["ends"][k]:
+            return None
+        return k
+
+    def state_at(self, player, frame):
+        """Estado (nome) de `player` em `frame`, ou None fora da timeline."""
+
+        k = self._span_of(player, frame)
+        return None if k is None else state_name(self._players[player]["states"][k])
+
+    def can_act_at(self, player, frame):
+        k = self._span_of(player, frame)
+        return False if k is None else bool(self._players[player]["can_act"][k])
+
+    def next_actionable_many(self, player, frames):
+        """Versão vetorizada de `next_actionable`: -1 onde não há frame livre."""
+
+        starts, ends = self._actionable[player]
+        frames = np.asarray(frames, dtype=np.int64)
+        # primeiro span livre que termina em/depois de `frame`
+        k = np.searchsorted(ends, frames, side="left")
+        found = k < len(starts)
+        k = np.minimum(k, max(len(starts) - 1, 0))
+        if not len(starts):
+            return np.full(frames.shape, -1, dtype=np.int64)
+        return np.where(found, np.maximum(starts[k], frames), -1)
+
+    def next_actionable(self, player, frame):
+        """Primeiro frame >= `frame` em que `player` pode agir, ou None."""
+
+        nxt = int(self.next_actionable_many(player, frame))
+        return None if nxt < 0 else nxt
+
+    def spans_in(self, player, start, stop):
+        """Lista de `(início, fim, estado, can_act)` cobrindo `[start, stop)`, recortados ao intervalo."""
+
+        cols = self._players[player]
+        lo = max(int(np.searchsorted(cols["starts"], start, side="right")) - 1, 0)
+        hi = int(np.searchsorted(cols["starts"], stop, side="left"))
+        out = []
+        for k in range(lo, hi):
+            s = max(int(cols["starts"][k]), start)
+            e = min(int(cols["ends"][k]), stop - 1)
+            if s <= e:
+                out.append((s, e, state_name(cols["states"][k]), bool(cols["can_act"][k])))
+        return out
+
+    def state_spans(self, player, state):
+        """Arrays `(inícios, fins)` (inclusivos) dos spans de `player` no estado `state`.
+
+        Spans vizinhos no mesmo estado (separados só por mudança de `can_act`)
+        são unidos.
+        """
+
+        cols = self._players[player]
+        sel = cols["states"] == STATE_CODES.get(state, -1)
+        starts, ends = cols["starts"][sel], cols["ends"][sel]
+        if len(starts) > 1:
+            glue = starts[1:] == ends[:-1] + 1
+            keep_start = np.concatenate(([True], ~glue))
+            keep_end = np.concatenate((~glue, [True]))
+            starts, ends = starts[keep_start], ends[keep_end]
+        return starts, ends
+
+    def span_count(self, player):
+        return len(self._players[player]["starts"])
+
+    # ----------------------------------------------------------- serialização
+    def encode(self):
+        """Forma compacta (JSON-serializável): inícios, estados e flags por jogador."""
+
+        return {
+            "first_frame": self.first_frame,
+            "last_frame": self.last_frame,
+            "players": {
+                player: {
+                    "starts": cols["starts"].tolist(),
+                    "states": cols["states"].tolist(),
+                    "can_act": cols["can_act"].astype(np.int8).tolist(),
+                }
+                for player, cols in self._players.items()
+            },
+        }
+
+    @classmethod
+    def decode(cls, data):
+        """Reconstrói o índice a partir de `encode()`."""
+
+        last_frame = int(data["last_frame"])
+        players = {}
+        for player, cols in data["players"].items():
+            starts = np.asarray(cols["starts"], dtype=np.int64)
+            ends = np.append(starts[1:] - 1, last_frame) if len(starts) else starts
+            players[player] = {
+                "starts": starts,
+                "ends": ends,
+                "states": np.asarray(cols["states"], dtype=np.int8),
+                "can_act": np.asarray(cols["can_act"], dtype=bool),
+            }
+        return cls(int(data["first_frame"]), last_frame, players)
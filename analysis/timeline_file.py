@@ -0,0 +1,215 @@
+"""Arquivo binário colunar da timeline, lido via memory-map.
+
+Layout (todos os blocos alinhados em 64 bytes):
+
+    MAGIC (8 bytes) | tamanho do header (uint32 LE) | header JSON | colunas... | eventos
+
+- O header descreve cada coluna de `TimelineArrays` (nome, dtype, formato por
+  frame e offset), os dicionários usados para codificar strings (estados,
+  game_state, ações, tipos de evento e jogadores), a tabela de eventos e
+  metadados livres da execução.
+- Cada coluna é um bloco de largura fixa (`n_frames * itemsize`).
+- Eventos são uma tabela estruturada `(type, start, end, attacker, defender)`
+  com strings codificadas pelos dicionários do header.
+
+`TimelineFile` mapeia o arquivo e devolve visões numpy de qualquer intervalo
+de frames sem ler o resto do arquivo.
+"""
+
+import json
+import os
+import struct
+
+import numpy as np
+
+from models.structures import Event
+from models.timeline import ACTION_NAMES, GAME_STATE_NAMES, STATE_NAMES, TimelineArrays
+
+MAGIC = b"SF6TLN01"
+ALIGN = 64
+VERSION = 1
+
+EVENT_DTYPE = np.dtype([("type", "<i2"), ("start", "<i4"), ("end", "<i4"), ("attacker", "i1"), ("defender", "i1")])
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _encode_events(events):
+    """Converte `Event`s em tabela estruturada + dicionários de strings."""
+
+    types, players = [], []
+    type_idx, player_idx = {}, {}
+
+    def code(value, table, index):
+        if value is None:
+            return -1
+        if value not in index:
+            index[value] = len(table)
+            table.append(value)
+        return index[value]
+
+    table = np.zeros(len(events), dtype=EVENT_DTYPE)
+    for i, e in enumerate(events):
+        table[i] = (
+            code(e.type, types, type_idx),
+            e.start_frame,
+            e.end_frame,
+            code(e.attacker, players, player_idx),
+            code(e.defender, players, player_idx),
+        )
+    return table, types, players
+
+
+def write_timeline(path, arrays, events=(), metadata=None):
+    """Grava `arrays` (TimelineArrays) e `events` no formato colunar binário."""
+
+    events = list(events)
+    ev_table, ev_types, ev_players = _encode_events(events)
+
+    n = len(arrays)
+    columns = []
+    blocks = []
+    for name, (dtype, shape) in TimelineArrays.COLUMNS.items():
+        data = np.ascontiguousarray(getattr(arrays, name), dtype=np.dtype(dtype).newbyteorder("<"))
+        columns.append({"name": name, "dtype": data.dtype.str, "shape": list(shape), "nbytes": data.nbytes})
+        blocks.append(data)
+
+    header = {
+        "version": VERSION,
+        "n_frames": n,
+        "columns": columns,
+        "dictionaries": {
+            "state": list(STATE_NAMES),
+            "game_state": list(GAME_STATE_NAMES),
+            "action": list(ACTION_NAMES),
+            "event_type": ev_types,
+            "player": ev_players,
+        },
+        "events": {"count": len(events), "dtype": EVENT_DTYPE.descr},
+        "metadata": metadata or {},
+    }
+
+    # offsets dependem do tamanho do header (e vice-versa): itera até estabilizar
+    def assign_offsets(base):
+        offset = base
+        for col in columns:
+            col["offset"] = offset
+            offset = _align(offset + col["nbytes"])
+        header["events"]["offset"] = offset
+
+    base = 0
+    while True:
+        assign_offsets(base)
+        raw_header = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        needed = _align(len(MAGIC) + 4 + len(raw_header))
+        if needed == base:
+            break
+        base = needed
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(raw_header)))
+        f.write(raw_header)
+        for col, data in zip(columns, blocks):
+            f.seek(col["offset"])
+            f.write(data.tobytes())
+        f.seek(header["events"]["offset"])
+        f.write(ev_table.tobytes())
+        # seek + write vazio não estende o arquivo: garante que blocos vazios no fim caibam no mmap
+        f.truncate(header["events"]["offset"] + ev_table.nbytes)
+    os.replace(tmp, path)
+
+
+class TimelineFile:
+    """Leitor memory-mapped de um arquivo gravado por `write_timeline`.
+
+    Uso:
+      tf = TimelineFile("output/timeline.sf6t")
+      chunk = tf.range(1000, 2000)   # TimelineArrays com visões do mmap
+      evs = tf.events_in(1000, 2000)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic = f.read(len(MAGIC))
+            if magic != MAGIC:
+                raise ValueError(f"{path}: not a timeline file")
+            (hlen,) = struct.unpack("<I", f.read(4))
+            self.header = json.loads(f.read(hlen).decode("utf-8"))
+
+        self.n_frames = int(self.header["n_frames"])
+        self.metadata = self.header.get("metadata", {})
+        self.dictionaries = self.header["dictionaries"]
+        self._mm = np.memmap(path, mode="r", dtype=np.uint8)
+
+        self._columns = {}
+        for col in self.header["columns"]:
+            shape = (self.n_frames,) + tuple(col["shape"])
+            self._columns[col["name"]] = self._view(shape, np.dtype(col["dtype"]), col["offset"])
+
+        ev = self.header["events"]
+        self._events = self._view((ev["count"],), EVENT_DTYPE, ev["offset"])
+
+    def _view(self, shape, dtype, offset):
+        if 0 in shape:
+            # blocos vazios podem apontar para além do fim do arquivo (gravados antes do truncate)
+            return np.empty(shape, dtype=dtype)
+        return np.ndarray(shape, dtype=dtype, buffer=self._mm, offset=offset)
+
+    def __len__(self):
+        return self.n_frames
+
+    def column(self, name):
+        """Coluna inteira (visão do mmap)."""
+
+        return self._columns[name]
+
+    @property
+    def arrays(self):
+        return TimelineArrays(**self._columns)
+
+    def _rows(self, start, stop):
+        fids = self._columns["frame_id"]
+        lo = int(np.searchsorted(fids, start, side="left")) if start is not None else 0
+        hi = int(np.searchsorted(fids, stop, side="left")) if stop is not None else self.n_frames
+        return lo, hi
+
+    def range(self, start=None, stop=None):
+        """`TimelineArrays` (visões, sem cópia) dos frames com `start <= frame_id < stop`."""
+
+        lo, hi = self._rows(start, stop)
+        return self.arrays.slice(lo, hi)
+
+    @property
+    def event_table(self):
+        """Tabela estruturada de eventos (visão do mmap)."""
+
+        return self._events
+
+    def events_in(self, start=None, stop=None):
+        """Eventos cujo span intersecta `[start, stop)`, como `Event`."""
+
+        table = self._events
+        mask = np.ones(len(table), dtype=bool)
+        if start is not None:
+            mask &= table["end"] >= start
+        if stop is not None:
+            mask &= table["start"] < stop
+        types = self.dictionaries["event_type"]
+        players = self.dictionaries["player"]
+
+        def player(code):
+            return players[code] if code >= 0 else None
+
+        return [
+            Event(types[int(r["type"])], int(r["start"]), attacker=player(int(r["attacker"])),
+                  defender=player(int(r["defender"])), end_frame=int(r["end"]))
+            for r in table[mask]
+        ]
+
+    def events(self):
+        return self.events_in()
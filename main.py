@@ -10,155 +10,678 @@ Este módulo orquestra a execução das etapas principais:
 - agregação de frame-data (`analysis.frame_data`)
 - geração de insights (`analysis.insights`)
 
-O resultado é escrito em `output/results.json` e inclui uma fatia
-de `debug_timeline` para inspeção rápida.
+O frame-data é calculado de forma incremental (`FrameDataCalculator`), sem
+manter a timeline inteira em memória. O resultado é escrito em
+`output/results.json` e inclui uma fatia de `debug_timeline` para inspeção rápida.
+
+Com `stream_path`, cada frame, evento e janela é anexado em NDJSON
+(`analysis.results_stream`) durante a execução; nesse modo `results.json`
+guarda só o frame-data consolidado e os insights.
+
+A timeline completa e os eventos também são gravados no formato binário
+colunar de `analysis.timeline_file` (`output/timeline.sf6t`), que as
+ferramentas podem ler por intervalo via memory-map.
+
+Os resultados incluem `metadata` (fps, contagem de frames, resolução e hash
+SHA-256 do vídeo), então os relatórios de `analysis.reports` não precisam
+reabrir o vídeo. Com `reports=True` eles são gerados ao fim da execução, a
+partir dos resultados em memória.
+
+A execução tem dois estágios: visão (decodificação, rastreamento e
+estatísticas brutas por frame, `VisionRecord`) e análise (thresholds de
+estado/efeitos, vida, eventos, frame-data). As saídas de visão ficam em cache
+(`vision.vision_cache`, chave = hash do vídeo + config de visão); uma nova
+execução com a mesma chave pula a decodificação e só refaz a análise.
+
+A cada `checkpoint_every` frames o estado da execução é gravado de forma
+atômica em `checkpoint_path` (`analysis.checkpoint`). Com `resume=True`, a
+execução continua do último checkpoint. Com o cache de visão (hit), a
+análise retomada recebe os mesmos registros e o resultado é idêntico ao de uma
+execução sem interrupção. Decodificando o vídeo, o detector não é
+restaurado: o vídeo é posicionado logo após o frame salvo, o MOG2 é aquecido
+com um pre-roll curto e os trackers são reinicializados com as bboxes salvas,
+então as bboxes (e, com elas, estados e eventos) podem divergir das de uma
+execução contínua depois do ponto de retomada.
+
+Com `shadows` (lista de `AnalysisConfig`), cada config sombra roda a análise
+sobre os mesmos registros de visão da principal (`analysis.shadow`): mesmos
+frames decodificados, bboxes e estatísticas brutas, só os thresholds mudam.
+Cada sombra grava `output/shadow-<nome>.json` (eventos, frame-data, rounds,
+insights) e `results["shadows"]` traz o diff de cada uma contra a principal.
+
+Com `profile` (`vision.speed_profile.SpeedProfile` ou nome de um perfil
+gerado por `tools/autotune_speed.py`), o estágio de visão troca qualidade por
+throughput: escala e backend do tracker, cadência de rastreamento e de sinais
+de jogo, recortes de ROI nos efeitos. Os knobs do perfil entram na chave do
+cache de visão e em `metadata["speed_profile"]`; `metadata["tracker"]` registra
+o backend efetivo (o do perfil, ou "template" se o OpenCV não o tiver).
 """
 
 import cv2
+import itertools
 import json
+import os
+from contextlib import closing
 
-from models.structures import FrameData
+from models.structures import Event, VisionRecord
 from vision.character_detection import detect_characters
 try:
     from vision.auto_detector import AutoDetector
-    _AUTO_DETECTOR = AutoDetector()
+    AutoDetector()
+    _HAS_AUTO_DETECTOR = True
 except Exception:
-    _AUTO_DETECTOR = None
-from vision.state_detection import detect_state, can_act
-from analysis.events import detect_events
-from analysis.frame_data import calculate_frame_data
-from analysis.insights import generate_insights
-from vision.game_state import detect_game_state
+    _HAS_AUTO_DETECTOR = False
+from vision.state_detection import StateDetectorConfig, load_state_config
+from analysis.checkpoint import finalized_events, load_checkpoint, remove_checkpoint, save_checkpoint
+from analysis.frame_analysis import EFFECTS_MEAN_DIFF_THRESH, AnalysisConfig, FrameAnalysis, frame_from_record
+from analysis.pipeline import QUEUE_SIZE, Pipeline
+from analysis.reports import build_reports
+from analysis.results_stream import NDJSONResultsWriter, frame_record
+from analysis.shadow import ShadowRun
+from analysis.timeline_file import write_timeline
+from models.timeline import TimelineBuilder
+from video.video_utils import file_sha256, video_metadata
+from vision.measure_pool import MeasurePool, measure_frame
+from vision.players import get_player_pool
+from vision.speed_profile import SpeedProfile, load_speed_profile
+from vision.tracker import get_manager
+from vision.vision_cache import VisionCache, VisionRecordColumns, vision_cache_key
 
+# Quantos frames iniciais são exportados em `debug_timeline`
+DEBUG_TIMELINE_FRAMES = 200
+# Timeline binária completa (ver `analysis.timeline_file`)
+TIMELINE_PATH = "output/timeline.sf6t"
+# Cache das saídas de visão (ver `vision.vision_cache`)
+VISION_CACHE_DIR = "output/cache"
+# Checkpoints periódicos (ver `analysis.checkpoint`)
+CHECKPOINT_PATH = "output/checkpoint.npz"
+CHECKPOINT_EVERY = 3600  # frames (1 min a 60 fps)
+# Frames anteriores ao ponto de retomada usados para aquecer o MOG2
+RESUME_PREROLL = 30
+# Estágios em threads dedicadas (ver `analysis.pipeline`); com eles, o trabalho
+# de p1 e p2 dentro de cada frame também roda em paralelo (ver `vision.players`)
+PIPELINE_THREADS = True
+# Processos para as medições por frame (ver `vision.measure_pool`); 0 = desativado
+MEASURE_WORKERS = 0
 
-def run(video_path):
-    """
-    Pipeline principal:
-    vídeo → frames → estados → eventos → frame data → insights
-    """
+# Pré-processamento de efeitos (altera os MADs brutos -> faz parte da chave do cache)
+EFFECTS_PREPROCESS = {"blur_ksize": None, "morph_kernel": None, "binary_thresh": None}
 
-    cap = cv2.VideoCapture(video_path)
 
-    timeline = []  # Linha do tempo completa da partida
-    events = []  # Eventos relevantes
+def vision_config(profile=None):
+    """Parâmetros que alteram as saídas brutas do estágio de visão."""
 
-    prev = None
-    frame_id = 0
+    profile = profile or SpeedProfile()
+    return {
+        "detector": "auto" if _HAS_AUTO_DETECTOR else "template",
+        "effects": EFFECTS_PREPROCESS,
+        "speed": profile.knobs(),
+    }
 
-    # estados persistentes
-    prev_frame = None
-    prev_p1_bbox = None
-    prev_p2_bbox = None
-    life_p1 = 100
-    life_p2 = 100
-    prev_game_state = None
+
+def make_detector(profile, executor=None):
+    """`AutoDetector` novo (MOG2 e trackers próprios) para uma execução; None sem ele."""
+
+    if not _HAS_AUTO_DETECTOR:
+        return None
+    # a área mínima de movimento é medida no frame reduzido
+    return AutoDetector(min_area=max(1, int(800 * profile.scale ** 2)), tracker=profile.tracker, executor=executor)
+
+
+def _scale_bbox(bbox, factor):
+    if bbox is None or factor == 1.0:
+        return bbox
+    return tuple(int(round(v * factor)) for v in bbox)
+
+
+def decode_frames(cap, frame_id=0):
+    """Fonte do pipeline: `(frame_id, frame)` a partir da posição atual de `cap`."""
 
     while cap.isOpened():
         ret, frame = cap.read()
         if not ret:
             break
+        yield frame_id, frame
+        frame_id += 1
+
+
+class VisionStages:
+    """
+    Estágio de visão dividido em rastreamento e medição (um estado por estágio).
+
+    - `track((frame_id, frame))` -> `(frame_id, frame, p1_bbox, p2_bbox)`:
+      detector/tracker no frame reduzido, na cadência do perfil
+    - `measure((frame_id, frame, p1_bbox, p2_bbox))` -> `VisionRecord`:
+      features das ROIs, MADs de efeitos e sinais de jogo, usando o frame anterior
+
+    Cada método guarda só o próprio histórico, então os dois podem rodar em
+    threads diferentes (`analysis.pipeline`), desde que recebam os frames em ordem.
 
-        # Detecta/rastra posição dos personagens
-        if _AUTO_DETECTOR is not None:
-            p1_bbox, p2_bbox = _AUTO_DETECTOR.process(frame)
+    Com `executor` (ver `vision.players`), o trabalho de p1 e p2 dentro de um
+    frame (update dos trackers, features das ROIs) roda em paralelo; os
+    resultados são os mesmos da versão sequencial.
+
+    Com `measure_pool` (`vision.measure_pool.MeasurePool`), a medição vira dois
+    estágios: `submit` copia o frame para o anel de shared memory e envia o
+    slot aos processos; `collect` espera o resultado e monta o `VisionRecord`
+    (ver `stages()`).
+    """
+
+    def __init__(self, profile=None, executor=None, measure_pool=None):
+        self.profile = profile or SpeedProfile()
+        self.executor = executor
+        self.measure_pool = measure_pool
+        self.detector = make_detector(self.profile, executor)
+        self.scale = self.profile.scale
+        # histórico do rastreamento
+        self._track_started = False
+        self._track_bboxes = (None, None)
+        self._prev_small = None
+        # histórico da medição
+        self._prev_frame = None
+        self._prev_bboxes = (None, None)
+        self._signals_started = False
+        self._game_signals = None
+
+    @property
+    def tracker_backend(self):
+        """Backend de rastreamento efetivo: o do perfil se o OpenCV o tiver, senão "template"."""
+
+        if self.detector is None or not self.detector.mgr.available:
+            return "template"
+        return self.detector.mgr.backend
+
+    def _small(self, frame):
+        if frame is None or self.scale == 1.0:
+            return frame
+        return cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+    def resume(self, cap, start_frame, resume_bboxes, preroll=RESUME_PREROLL):
+        """Retomada: posiciona `cap` `preroll` frames antes de `start_frame`, aquece o
+        detector com esses frames e reinicializa os trackers com `resume_bboxes`
+        (bboxes do frame `start_frame - 1`). Retorna o `frame_id` do próximo frame lido.
+        """
+
+        first = max(0, start_frame - preroll)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+        last = []
+
+        def preroll_frames():
+            for _ in range(start_frame - first):
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                last[:] = [frame]
+                yield frame
+
+        scaled_bboxes = [_scale_bbox(b, self.scale) for b in resume_bboxes]
+        if self.detector is not None:
+            self.detector.warm_start((self._small(f) for f in preroll_frames()), *scaled_bboxes)
+        else:
+            for _ in preroll_frames():
+                pass
+            if last:
+                get_manager().initialize(self._small(last[0]), *scaled_bboxes)
+
+        prev_frame = last[0] if last else None
+        self._track_started = prev_frame is not None
+        self._track_bboxes = tuple(resume_bboxes)
+        self._prev_small = self._small(prev_frame)
+        self._prev_frame = prev_frame
+        self._prev_bboxes = tuple(resume_bboxes)
+        return start_frame
+
+    def track(self, item):
+        frame_id, frame = item
+        prev_p1_bbox, prev_p2_bbox = self._track_bboxes
+
+        # Detecta/rastra posição dos personagens (no frame reduzido, na cadência do perfil)
+        if not self._track_started or frame_id % self.profile.track_every == 0:
+            frame_small = self._small(frame)
+            if self.detector is not None:
+                p1_bbox, p2_bbox = self.detector.process(frame_small)
+            else:
+                prev_bboxes = (prev_p1_bbox, prev_p2_bbox) if (prev_p1_bbox is not None and prev_p2_bbox is not None) else None
+                if prev_bboxes is not None and self.scale != 1.0:
+                    prev_bboxes = tuple(_scale_bbox(b, self.scale) for b in prev_bboxes)
+                p1_bbox, p2_bbox = detect_characters(frame_small, self._prev_small, prev_bboxes)
+            p1_bbox, p2_bbox = _scale_bbox(p1_bbox, 1 / self.scale), _scale_bbox(p2_bbox, 1 / self.scale)
+            self._prev_small = frame_small
         else:
-            prev_bboxes = (prev_p1_bbox, prev_p2_bbox) if (prev_p1_bbox is not None and prev_p2_bbox is not None) else None
-            p1_bbox, p2_bbox = detect_characters(frame, prev_frame, prev_bboxes)
-
-        # Detecta estado de cada jogador usando histórico para detectar jump/drive
-        p1_state = detect_state(frame, p1_bbox, prev_frame, prev_p1_bbox)
-        p2_state = detect_state(frame, p2_bbox, prev_frame, prev_p2_bbox)
-
-        # Detecta efeitos entre frames (hitsparks)
-        from vision.effects_detection import detect_effects
-        from config import DAMAGE_PER_HIT
-
-        effects = detect_effects(frame, prev_frame, p1_bbox, p2_bbox)
-
-        # Atualiza vida/ações com base em efeitos
-        p1_action = None
-        p2_action = None
-        for eff in effects:
-            if eff.get("type") == "hitspark":
-                target = eff.get("target")
-                if target == "p2":
-                    life_p2 = max(0, life_p2 - DAMAGE_PER_HIT)
-                    p2_action = "hit"
-                    # marca atacante como em ataque ativo (melhora janelas)
-                    p1_state = "attack_active"
-                    p1_action = "attack"
-                elif target == "p1":
-                    life_p1 = max(0, life_p1 - DAMAGE_PER_HIT)
-                    p1_action = "hit"
-                    p2_state = "attack_active"
-                    p2_action = "attack"
-
-        # Cria o FrameData
-        data = FrameData(
+            p1_bbox, p2_bbox = prev_p1_bbox, prev_p2_bbox
+
+        self._track_started = True
+        self._track_bboxes = (p1_bbox, p2_bbox)
+        return frame_id, frame, p1_bbox, p2_bbox
+
+    def _want_game_signals(self, frame_id):
+        want = not self._signals_started or frame_id % self.profile.game_state_every == 0
+        self._signals_started = True
+        return want
+
+    def _record(self, frame_id, p1_bbox, p2_bbox, measured):
+        p1_features, p2_features, mads, signals = measured
+        if signals is not None:
+            self._game_signals = signals
+        return VisionRecord(
             frame_id=frame_id,
-            timestamp=frame_id / 60,
-            p1_state=p1_state,
-            p2_state=p2_state,
-            p1_can_act=can_act(p1_state),
-            p2_can_act=can_act(p2_state),
             p1_bbox=p1_bbox,
             p2_bbox=p2_bbox,
-            life_p1=life_p1,
-            life_p2=life_p2,
-            p1_action=p1_action,
-            p2_action=p2_action,
+            p1_features=p1_features,
+            p2_features=p2_features,
+            effect_mads=mads,
+            game_signals=self._game_signals,
         )
 
-        # Detect game-wide state (FIGHT / KO / REPLAY)
-        try:
-            gs = detect_game_state(frame, prev_frame, data, prev_game_state)
-        except Exception:
-            gs = None
-        data.game_state = gs
-        prev_game_state = gs
+    def measure(self, item):
+        frame_id, frame, p1_bbox, p2_bbox = item
+        measured = measure_frame(frame, self._prev_frame, (p1_bbox, p2_bbox), self._prev_bboxes,
+                                 self._want_game_signals(frame_id), EFFECTS_PREPROCESS,
+                                 self.profile.effects_roi_pad, self.executor)
+        self._prev_frame = frame.copy() if frame is not None else None
+        self._prev_bboxes = (p1_bbox, p2_bbox)
+        return self._record(frame_id, p1_bbox, p2_bbox, measured)
 
-        timeline.append(data)
+    def submit(self, item):
+        """Como `measure`, mas envia o frame para `measure_pool`; o resultado sai em `collect`."""
 
-        # Detecta eventos com base no frame anterior
-        events.extend(detect_events(data, prev))
+        frame_id, frame, p1_bbox, p2_bbox = item
+        if self._prev_frame is not None:
+            # retomada: o frame anterior (último do pre-roll) ainda não está no anel
+            self.measure_pool.prime(self._prev_frame)
+            self._prev_frame = None
+        pending = self.measure_pool.submit(frame, (p1_bbox, p2_bbox), self._prev_bboxes, self._want_game_signals(frame_id))
+        self._prev_bboxes = (p1_bbox, p2_bbox)
+        return frame_id, p1_bbox, p2_bbox, pending
 
-        prev = data
-        prev_frame = frame.copy() if frame is not None else None
-        prev_p1_bbox = p1_bbox
-        prev_p2_bbox = p2_bbox
-        frame_id += 1
-        
+    def collect(self, item):
+        frame_id, p1_bbox, p2_bbox, pending = item
+        return self._record(frame_id, p1_bbox, p2_bbox, pending.result())
 
-    cap.release()
+    def stages(self):
+        """Estágios `(nome, função)` do pipeline após a decodificação."""
 
-    # Calcula frame advantage e outras métricas a partir da timeline e eventos
-    frame_data_result = calculate_frame_data(timeline, events)
+        if self.measure_pool is None:
+            return [("track", self.track), ("measure", self.measure)]
+        return [("track", self.track), ("submit", self.submit), ("measure", self.collect)]
+
+    def close(self, abort=False):
+        if self.measure_pool is not None:
+            self.measure_pool.close(abort=abort)
+
+
+def vision_records(cap, start_frame=0, resume_bboxes=None, preroll=RESUME_PREROLL, profile=None):
+    """Estágio de visão: decodifica `cap` e produz um `VisionRecord` por frame.
+
+    Com `start_frame > 0` (retomada), posiciona o vídeo `preroll` frames antes,
+    usa esses frames para aquecer o detector e reinicializa os trackers com
+    `resume_bboxes` (bboxes do frame `start_frame - 1`).
+
+    `profile` (`SpeedProfile`) controla escala e backend do detector/tracker e
+    as cadências de rastreamento e de sinais de jogo; o padrão é a qualidade
+    máxima. Versão sequencial de `VisionStages` (ver `run` para a versão em threads).
+    """
 
-    # Gera insights de gameplay
-    insights = generate_insights(frame_data_result)
+    stages = VisionStages(profile)
+    frame_id = stages.resume(cap, start_frame, resume_bboxes, preroll) if start_frame > 0 else 0
+    for item in decode_frames(cap, frame_id):
+        yield stages.measure(stages.track(item))
+
+
+def load_shadow_configs(path):
+    """Configs sombra de um JSON: lista de `{"name", "state": {campos de StateDetectorConfig}, "effects_mean_diff_thresh"}`.
+
+    Campos ausentes de `state` herdam a config principal (`load_state_config`).
+    """
+
+    with open(path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    base = dict(load_state_config().__dict__)
+    shadows = []
+    for i, item in enumerate(items):
+        shadows.append(AnalysisConfig(
+            name=item.get("name", f"shadow{i}"),
+            state=StateDetectorConfig(**{**base, **item.get("state", {})}),
+            effects_mean_diff_thresh=item.get("effects_mean_diff_thresh", EFFECTS_MEAN_DIFF_THRESH),
+        ))
+    return shadows
+
+
+def write_shadow_results(shadow_reports, out_dir="output"):
+    """Grava `shadow-<nome>.json` por sombra; retorna `[{"name", "path", "diff"}]` para `results`."""
+
+    summary = []
+    for rep in shadow_reports:
+        path = os.path.join(out_dir, f"shadow-{rep['name']}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"name": rep["name"], "config": rep["config"], **rep["result"], "events": rep["events"]}, f)
+        summary.append({"name": rep["name"], "config": rep["config"], "path": path, "diff": rep["diff"]})
+    return summary
+
+
+def run(video_path, stream_path=None, timeline_path=TIMELINE_PATH, reports=False, vision_cache=VISION_CACHE_DIR,
+        checkpoint_path=CHECKPOINT_PATH, checkpoint_every=CHECKPOINT_EVERY, resume=False, shadows=None, profile=None,
+        threads=PIPELINE_THREADS, measure_workers=MEASURE_WORKERS):
+    """
+    Pipeline principal:
+    vídeo → frames → estados → eventos → frame data → insights
+
+    - stream_path: se informado, grava a timeline completa, eventos e janelas em
+      NDJSON nesse caminho à medida que o vídeo é processado
+    - timeline_path: arquivo binário colunar com a timeline e os eventos
+      (None desativa)
+    - reports: gera punish report, resumo por segmento e gráfico em `output/`
+      a partir dos resultados em memória (ver `analysis.reports`)
+    - vision_cache: diretório do cache de visão (None desativa)
+    - checkpoint_path / checkpoint_every: checkpoint atômico a cada N frames
+      (None desativa); removido ao fim de uma execução completa
+    - resume: continua a partir de `checkpoint_path`, se existir. Só é exata
+      com o cache de visão (hit); decodificando o vídeo, o MOG2 e os trackers
+      são reconstruídos a partir de um pre-roll e das bboxes salvas, e as
+      bboxes podem divergir das de uma execução contínua a partir da retomada
+      (por alguns frames, ou até o fim do vídeo). Uma execução retomada não
+      grava o cache de visão (ele ficaria incompleto)
+    - shadows: lista de `AnalysisConfig` avaliadas sobre os mesmos registros de
+      visão; nomes precisam ser únicos (ver `analysis.shadow`)
+    - profile: `SpeedProfile`, nome de um perfil em `output/profiles` ou caminho
+      `.json` (ver `vision.speed_profile`); None = qualidade máxima
+    - threads: roda decodificação, rastreamento, medição e análise em threads
+      ligadas por filas limitadas (`analysis.pipeline`); `results["pipeline"]`
+      traz a profundidade das filas e a utilização de cada estágio. Também
+      paraleliza o trabalho de p1 e p2 dentro de cada frame (`vision.players`)
+    - measure_workers: processos para as medições por frame (features, efeitos,
+      sinais de jogo), com os frames num anel de shared memory
+      (`vision.measure_pool`); 0 = mede na thread do estágio
+    """
+
+    profile = load_speed_profile(profile)
+
+    checkpoint = load_checkpoint(checkpoint_path) if resume and checkpoint_path else None
+    ck = checkpoint[0] if checkpoint is not None else None
+    start_frame = ck["frame_id"] + 1 if ck is not None else 0
+
+    cache = VisionCache(vision_cache) if vision_cache and os.path.exists(video_path) else None
+    cap = None
+    vision = None
+    measure_pool = None
+    cache_columns = None
+    records = None
+    sha256 = None
+    tracker_backend = None
+
+    if cache is not None:
+        sha256 = file_sha256(video_path)
+        cache_key = vision_cache_key(sha256, vision_config(profile))
+        hit = cache.load(cache_key)
+        if hit is not None:
+            # mesma chave: reaproveita as saídas de visão, sem decodificar o vídeo
+            video_meta, records = hit
+            tracker_backend = video_meta.pop("tracker", None)
+            records = (r for r in records if r.frame_id >= start_frame)
+
+    if records is None:
+        cap = cv2.VideoCapture(video_path)
+        video_meta = video_metadata(video_path, cap, sha256=sha256)
+        if measure_workers > 0:
+            # o anel cobre os frames entre `submit` e `collect` (ver `vision.measure_pool`)
+            measure_pool = MeasurePool(measure_workers, QUEUE_SIZE + 3, EFFECTS_PREPROCESS, profile.effects_roi_pad)
+        vision = VisionStages(profile, get_player_pool() if threads else None, measure_pool)
+        tracker_backend = vision.tracker_backend
+        if ck is not None:
+            vision.resume(cap, start_frame, (ck["prev"]["p1_bbox"], ck["prev"]["p2_bbox"]))
+        source = ("decode", decode_frames(cap, start_frame))
+        stages = vision.stages()
+        if cache is not None and ck is None:
+            cache_columns = VisionRecordColumns()
+    else:
+        source = ("cache", records)
+        stages = []
+
+    if ck is not None and (ck["video"]["source"], ck["video"]["frame_count"]) != (video_meta["source"], video_meta["frame_count"]):
+        raise ValueError(f"{checkpoint_path}: checkpoint belongs to another video ({ck['video']['source']})")
+    if ck is not None and ck.get("speed_profile", SpeedProfile().knobs()) != profile.knobs():
+        raise ValueError(f"{checkpoint_path}: checkpoint was written with another speed profile")
+
+    metadata = dict(video_meta)
+    metadata["vision_cache"] = None if cache is None else ("hit" if cap is None else "miss")
+    metadata["speed_profile"] = profile.to_dict()
+    metadata["tracker"] = tracker_backend
+    fps = metadata["fps"]
+    config = AnalysisConfig(state=load_state_config(), effects_mean_diff_thresh=EFFECTS_MEAN_DIFF_THRESH)
+    shadows = list(shadows or [])
+    if len({s.name for s in shadows} | {config.name}) != len(shadows) + 1:
+        raise ValueError("shadow config names must be unique (and not 'primary')")
+
+    debug_timeline = []  # Primeiros frames da partida (inspeção rápida)
+    events = []  # Eventos relevantes (condições contínuas agrupadas em spans)
+    analysis = FrameAnalysis(config, fps)
+    shadow_runs = [ShadowRun(s, fps) for s in shadows]
+    timeline = TimelineBuilder() if timeline_path else None
+
+    frame_id = 0
+    # o que os chunks do checkpoint já têm (ver `analysis.checkpoint`)
+    chunk = 0
+    events_saved = {}  # nome da config -> quantos eventos já estão nos chunks
+    closed_saved = {}  # nome da config -> {campo: quantos resultados de frame-data já estão nos chunks}
+    timeline_saved = 0
+
+    if ck is not None:
+        # retoma o estado da análise salvo no checkpoint
+        frame_id = ck["frame_id"]
+        debug_timeline = [frame_from_record(r) for r in ck["debug_timeline"]]
+        # eventos finalizados (chunks) + os que ainda podiam mudar no checkpoint
+        saved_events, saved_closed = checkpoint[2], checkpoint[3]
+        events = [Event(**e) for e in saved_events.get(config.name, []) + ck["events"]]
+        events_saved = {name: len(items) for name, items in saved_events.items()}
+        closed_saved = {name: {field: len(items) for field, items in closed.items()} for name, closed in saved_closed.items()}
+        chunk = ck["chunks"]
+        analysis = FrameAnalysis.from_state(ck, config, fps, known_events=events, saved_closed=saved_closed.get(config.name))
+        saved = ck.get("shadows", [])
+        if [s["config"]["name"] for s in saved] != [s.name for s in shadows]:
+            raise ValueError(f"{checkpoint_path}: checkpoint was written with other shadow configs")
+        shadow_runs = [ShadowRun.from_state(s, fps, saved_events.get(s["config"]["name"], []), saved_closed.get(s["config"]["name"]))
+                       for s in saved]
+        if timeline is not None and checkpoint[1] is not None:
+            timeline = TimelineBuilder.from_arrays(checkpoint[1])
+            timeline_saved = len(timeline)
+
+    stream = None
+    if stream_path:
+        stream = NDJSONResultsWriter(stream_path, resume_offset=ck.get("stream_offset") if ck is not None else None)
+
+    keep_events = stream is None or timeline is not None
+
+    def analyze(rec):
+        """Estágio de análise: principal + sombras; no frame de checkpoint, o estado da análise."""
+
+        data, frame_events, closed = analysis.step(rec)
+        for shadow in shadow_runs:
+            shadow.step(rec, data, frame_events)
+        # spans contínuos só são gravados quando fecham (end_frame final)
+        closed_spans = analysis.closed_spans if stream is not None else ()
+        if keep_events:
+            events.extend(frame_events)
+        state = None
+        if checkpoint_path and checkpoint_every and (rec.frame_id + 1) % checkpoint_every == 0:
+            # eventos e frame-data finalizados vão para o chunk novo; o que ainda
+            # pode mudar (spans abertos, whiffs pendentes) fica no estado
+            new_events, done, new_closed, closed_done = {}, {}, {}, {}
+            for name, evs, an in [(config.name, events, analysis)] + [(s.name, s.events, s.analysis) for s in shadow_runs]:
+                start = events_saved.get(name, 0)
+                done[name] = finalized_events(evs, start, an.coalescer)
+                new_events[name] = [e.__dict__ for e in evs[start:done[name]]]
+                first = closed_saved.get(name, {})
+                closed_done[name] = an.calculator.finalized()
+                new_closed[name] = {field: getattr(an.calculator, field)[first.get(field, 0):stop]
+                                    for field, stop in closed_done[name].items()}
+            state = {
+                "frame_id": rec.frame_id,
+                "speed_profile": profile.knobs(),
+                **analysis.state_dict(closed_done[config.name]),
+                "events": [e.__dict__ for e in events[done[config.name]:]],
+                "shadows": [s.state_dict(first_event=done[s.name], first_closed=closed_done[s.name]) for s in shadow_runs],
+            }
+            # serializa já: os spans abertos continuam sendo estendidos pelos próximos frames
+            state = json.loads(json.dumps(state)), json.loads(json.dumps({"events": new_events, "frame_data": new_closed}))
+            events_saved.update(done)
+            closed_saved.update(closed_done)
+        return rec, data, frame_events, closed, closed_spans, state
+
+    if measure_pool is not None:
+        # sobe os workers antes de qualquer thread do pipeline; o formato do anel vem do primeiro frame
+        first = next(source[1], None)
+        if first is not None:
+            measure_pool.start(first[1])
+            source = (source[0], itertools.chain([first], source[1]))
+
+    pipeline = Pipeline(source[1], stages + [("analysis", analyze)], maxsize=QUEUE_SIZE, threaded=threads, source_name=source[0],
+                        order_key=lambda item: item[0].frame_id)
+
+    try:
+        # `closing`: numa exceção as threads dos estágios param (e são aguardadas) antes
+        # de liberar o vídeo e o pool de medição abaixo
+        with closing(pipeline.run()) as outputs:
+            for rec, data, frame_events, closed, closed_spans, state in outputs:
+                if cache_columns is not None:
+                    cache_columns.append(rec)
+                frame_id = rec.frame_id
+
+                if len(debug_timeline) < DEBUG_TIMELINE_FRAMES:
+                    debug_timeline.append(data)
+                if timeline is not None:
+                    timeline.append(data)
+
+                if stream is not None:
+                    stream.write_frame(data)
+                    for e in frame_events:
+                        if e.type not in analysis.coalescer.continuous:
+                            stream.write_event(e)
+                    for e in closed_spans:
+                        stream.write_event(e)
+                    for kind, record in closed:
+                        stream.write(kind, record)
+
+                if state is not None:
+                    state, delta = state
+                    save_checkpoint(checkpoint_path, {
+                        "video": {"source": video_meta["source"], "frame_count": video_meta["frame_count"]},
+                        **state,
+                        "debug_timeline": [frame_record(fd) for fd in debug_timeline],
+                        "stream_offset": stream.tell() if stream is not None else None,
+                    }, chunk, timeline.build().slice(timeline_saved) if timeline is not None else None, **delta)
+                    chunk += 1
+                    timeline_saved = len(timeline) if timeline is not None else 0
+    except BaseException:
+        # o estágio de análise mantém referências ao stream e ao vídeo: fecha já,
+        # sem esperar o coletor (um buffer descarregado depois corromperia a retomada);
+        # as threads do pipeline já terminaram (`closing` acima)
+        if stream is not None:
+            stream.close()
+        if cap is not None:
+            cap.release()
+        if vision is not None:
+            vision.close(abort=True)
+        raise
+
+    pipeline_stats = pipeline.stats()
+    frames_processed = frame_id + 1 if analysis.prev is not None else 0
+    if cap is not None:
+        cap.release()
+    if vision is not None:
+        vision.close()
+    if cache_columns is not None and len(cache_columns) == frames_processed:
+        # o backend efetivo vai junto, para um hit reportar o mesmo `metadata["tracker"]`
+        cache.save(cache_key, cache_columns, dict(video_meta, tracker=tracker_backend))
+    metadata["frames_processed"] = frames_processed
+
+    # Fecha spans e lookaheads pendentes e consolida frame advantage e outras métricas
+    closed_spans, closed = analysis.flush()
+    primary_result = analysis.result()
+    frame_data_result = primary_result["frame_data"]
+    round_spans = primary_result["rounds"]
+    # Insights de gameplay
+    insights = primary_result["insights"]
+
+    shadow_summary = None
+    if shadow_runs:
+        for shadow in shadow_runs:
+            shadow.flush()
+        shadow_summary = write_shadow_results([shadow.report(primary_result) for shadow in shadow_runs])
+
+    if timeline is not None:
+        write_timeline(timeline_path, timeline.build(), events, metadata=metadata)
+
+    if stream is not None:
+        for e in closed_spans:
+            stream.write_event(e)
+        for kind, record in closed:
+            stream.write(kind, record)
+        stream.write_summary({
+            "frames": frames_processed,
+            "metadata": metadata,
+            "rounds": round_spans,
+            "frame_data_summary": frame_data_result["summary"],
+            "insights": insights,
+        })
+        stream.close()
+
+        results = {"metadata": metadata, "rounds": round_spans, "frame_data": frame_data_result, "insights": insights, "stream": stream_path,
+                   "pipeline": pipeline_stats}
+        if shadow_summary is not None:
+            results["shadows"] = shadow_summary
+        with open("output/results.json", "w") as f:
+            json.dump(results, f)
+        remove_checkpoint(checkpoint_path)
+        if reports:
+            build_reports(results)
+        return results
 
     # Exporta resultados estruturados
-    with open("output/results.json", "w") as f:
-        json.dump(
+    results = {
+        "metadata": metadata,
+        "rounds": round_spans,
+        "frame_data": frame_data_result,
+        "insights": insights,
+        "events": [e.__dict__ for e in events],
+        "debug_timeline": [
             {
-                "frame_data": frame_data_result,
-                "insights": insights,
-                "events": [e.__dict__ for e in events],
-                "debug_timeline": [
-                    {
-                        "frame_id": fd.frame_id,
-                        "p1_state": fd.p1_state,
-                        "p2_state": fd.p2_state,
-                        "p1_can_act": fd.p1_can_act,
-                        "p2_can_act": fd.p2_can_act,
-                        "game_state": fd.game_state,
-                    }
-                    for fd in timeline[:200]
-                ],
-            },
-            f,
-            indent=2,
-        )
+                "frame_id": fd.frame_id,
+                "p1_state": fd.p1_state,
+                "p2_state": fd.p2_state,
+                "p1_can_act": fd.p1_can_act,
+                "p2_can_act": fd.p2_can_act,
+                "game_state": fd.game_state,
+            }
+            for fd in debug_timeline
+        ],
+        "pipeline": pipeline_stats,
+    }
+    if shadow_summary is not None:
+        results["shadows"] = shadow_summary
+    with open("output/results.json", "w") as f:
+        json.dump(results, f, indent=2)
+    remove_checkpoint(checkpoint_path)
+    if reports:
+        build_reports(results)
+    return results
 
 if __name__ == "__main__":
-    run("match.mp4")
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("video", nargs="?", default="match.mp4", help="padrão: match.mp4")
+    parser.add_argument("--stream", metavar="PATH", help="grava frames, eventos e janelas em NDJSON durante a execução")
+    parser.add_argument("--reports", action="store_true", help="gera punish report, resumos por segmento e gráfico ao fim")
+    parser.add_argument("--resume", action="store_true",
+                        help="continua do último checkpoint; exato só com o cache de visão (decodificando, as bboxes podem divergir)")
+    parser.add_argument("--shadows", metavar="JSON", help="configs sombra (ver `load_shadow_configs`)")
+    parser.add_argument("--profile", help="perfil de velocidade: nome em output/profiles ou caminho .json")
+    parser.add_argument("--measure-workers", type=int, default=MEASURE_WORKERS, help="processos de medição (0 = desativado)")
+    parser.add_argument("--no-threads", action="store_true", help="roda os estágios em sequência, sem threads")
+    args = parser.parse_args()
+    if args.measure_workers < 0:
+        parser.error("--measure-workers must be >= 0")
+
+    run(args.video, stream_path=args.stream, reports=args.reports, resume=args.resume,
+        shadows=load_shadow_configs(args.shadows) if args.shadows else None, profile=args.profile,
+        threads=not args.no_threads, measure_workers=args.measure_workers)
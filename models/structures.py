@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Optional, Tuple
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Tuple
 
 
 # Representa o estado completo de UM frame da partida
@@ -46,10 +46,41 @@ class Event:
     Representa um evento discreto detectado na timeline.
 
     - `type`: string com o tipo do evento (ex.: 'hit', 'block', 'attack_start')
-    - `frame_id`: frame onde o evento foi detectado
+    - `frame_id`: frame onde o evento foi detectado (início do span)
     - `attacker`, `defender`: identificadores opcionais ('p1'/'p2' ou 'P1'/'P2')
+    - `start_frame`, `end_frame`: span do evento; eventos pontuais têm
+      `start_frame == end_frame == frame_id`, condições contínuas (ex.: 'block')
+      cobrem vários frames em um único evento
     """
     type: str  # Tipo do evento (attack_start, block, hit, jump, etc)
     frame_id: int  # Frame onde ocorreu
     attacker: Optional[str] = None
     defender: Optional[str] = None
+    start_frame: Optional[int] = None
+    end_frame: Optional[int] = None
+
+    def __post_init__(self):
+        if self.start_frame is None:
+            self.start_frame = self.frame_id
+        if self.end_frame is None:
+            self.end_frame = self.start_frame
+
+
+# Saída do estágio de visão para UM frame (reprocessável sem decodificar o vídeo)
+@dataclass
+class VisionRecord:
+    """
+    Tudo que a etapa de análise precisa de um frame, sem depender de thresholds.
+
+    - `p1_bbox`, `p2_bbox`: bounding boxes (x1, y1, x2, y2)
+    - `p1_features`, `p2_features`: `vision.state_detection.StateFeatures`
+    - `effect_mads`: MAD bruto das ROIs de P1 e P2 (`vision.effects_detection.effect_mads`)
+    - `game_signals`: `vision.game_state.GameStateSignals`
+    """
+    frame_id: int
+    p1_bbox: Tuple[int, int, int, int]
+    p2_bbox: Tuple[int, int, int, int]
+    p1_features: Any
+    p2_features: Any
+    effect_mads: List[Optional[float]] = field(default_factory=lambda: [None, None])
+    game_signals: Any = None
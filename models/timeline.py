@@ -0,0 +1,205 @@
+"""Timeline colunar (structure-of-arrays) para análises em lote.
+
+`TimelineArrays` guarda a mesma informação de uma lista de `FrameData`, mas em
+colunas numpy compactas: estados como códigos int8, flags `can_act` como bool,
+bboxes como int16 e vida como uint8. Cada frame ocupa ~30 bytes, contra várias
+centenas de bytes por instância de `FrameData` com strings.
+"""
+
+from dataclasses import dataclass, fields
+from typing import Optional, Sequence
+
+import numpy as np
+
+from models.structures import FrameData
+
+
+# Vocabulário fixo de estados (índice == código int8)
+STATE_NAMES = ("neutral", "attack_active", "jump", "drive", "block")
+STATE_CODES = {name: code for code, name in enumerate(STATE_NAMES)}
+UNKNOWN_STATE = -1
+
+# Estado global do jogo (0 == None)
+GAME_STATE_NAMES = (None, "FIGHT", "KO", "REPLAY")
+GAME_STATE_CODES = {name: code for code, name in enumerate(GAME_STATE_NAMES)}
+
+# Ações opcionais por jogador (0 == None)
+ACTION_NAMES = (None, "hit", "attack")
+ACTION_CODES = {name: code for code, name in enumerate(ACTION_NAMES)}
+
+MISSING_BBOX = (-1, -1, -1, -1)
+
+
+def state_code(name):
+    """Converte o nome de um estado em código int8 (`UNKNOWN_STATE` se desconhecido)."""
+
+    return STATE_CODES.get(name, UNKNOWN_STATE)
+
+
+def state_name(code):
+    code = int(code)
+    return STATE_NAMES[code] if 0 <= code < len(STATE_NAMES) else "unknown"
+
+
+@dataclass
+class TimelineArrays:
+    """
+    Timeline em colunas. Todas as colunas têm o mesmo comprimento `n`.
+
+    - `frame_id`: int32 (n,) ordenado crescente
+    - `p1_state`, `p2_state`: int8 (n,) códigos de `STATE_NAMES`
+    - `p1_can_act`, `p2_can_act`: bool (n,)
+    - `p1_bbox`, `p2_bbox`: int16 (n, 4) no formato (x1, y1, x2, y2); -1 quando ausente
+    - `life_p1`, `life_p2`: uint8 (n,) vida 0-100
+    - `p1_action`, `p2_action`: int8 (n,) códigos de `ACTION_NAMES`
+    - `game_state`: int8 (n,) códigos de `GAME_STATE_NAMES`
+    """
+
+    frame_id: np.ndarray
+    p1_state: np.ndarray
+    p2_state: np.ndarray
+    p1_can_act: np.ndarray
+    p2_can_act: np.ndarray
+    p1_bbox: np.ndarray
+    p2_bbox: np.ndarray
+    life_p1: np.ndarray
+    life_p2: np.ndarray
+    p1_action: np.ndarray
+    p2_action: np.ndarray
+    game_state: np.ndarray
+
+    # dtype e formato (por frame) de cada coluna
+    COLUMNS = {
+        "frame_id": (np.int32, ()),
+        "p1_state": (np.int8, ()),
+        "p2_state": (np.int8, ()),
+        "p1_can_act": (np.bool_, ()),
+        "p2_can_act": (np.bool_, ()),
+        "p1_bbox": (np.int16, (4,)),
+        "p2_bbox": (np.int16, (4,)),
+        "life_p1": (np.uint8, ()),
+        "life_p2": (np.uint8, ()),
+        "p1_action": (np.int8, ()),
+        "p2_action": (np.int8, ()),
+        "game_state": (np.int8, ()),
+    }
+
+    def __len__(self):
+        return int(self.frame_id.shape[0])
+
+    @classmethod
+    def empty(cls, n=0):
+        return cls(**{name: np.zeros((n,) + shape, dtype=dtype) for name, (dtype, shape) in cls.COLUMNS.items()})
+
+    @classmethod
+    def from_frames(cls, frames: Sequence[FrameData]) -> "TimelineArrays":
+        """Converte uma sequência de `FrameData` em colunas."""
+
+        arr = cls.empty(len(frames))
+        for i, fd in enumerate(frames):
+            arr.set_frame(i, fd)
+        return arr
+
+    def set_frame(self, i, fd: FrameData):
+        """Escreve um `FrameData` na linha `i`."""
+
+        self.frame_id[i] = fd.frame_id
+        self.p1_state[i] = state_code(fd.p1_state)
+        self.p2_state[i] = state_code(fd.p2_state)
+        self.p1_can_act[i] = bool(fd.p1_can_act)
+        self.p2_can_act[i] = bool(fd.p2_can_act)
+        self.p1_bbox[i] = fd.p1_bbox if fd.p1_bbox is not None else MISSING_BBOX
+        self.p2_bbox[i] = fd.p2_bbox if fd.p2_bbox is not None else MISSING_BBOX
+        self.life_p1[i] = fd.life_p1
+        self.life_p2[i] = fd.life_p2
+        self.p1_action[i] = ACTION_CODES.get(fd.p1_action, 0)
+        self.p2_action[i] = ACTION_CODES.get(fd.p2_action, 0)
+        self.game_state[i] = GAME_STATE_CODES.get(fd.game_state, 0)
+
+    def frame(self, i, fps=60.0) -> FrameData:
+        """Reconstrói o `FrameData` da linha `i` (`timestamp = frame_id / fps`)."""
+
+        def bbox(col):
+            b = tuple(int(v) for v in col[i])
+            return None if b == MISSING_BBOX else b
+
+        fid = int(self.frame_id[i])
+        return FrameData(
+            frame_id=fid,
+            timestamp=fid / fps,
+            p1_state=state_name(self.p1_state[i]),
+            p2_state=state_name(self.p2_state[i]),
+            p1_can_act=bool(self.p1_can_act[i]),
+            p2_can_act=bool(self.p2_can_act[i]),
+            p1_bbox=bbox(self.p1_bbox),
+            p2_bbox=bbox(self.p2_bbox),
+            life_p1=int(self.life_p1[i]),
+            life_p2=int(self.life_p2[i]),
+            p1_action=ACTION_NAMES[int(self.p1_action[i])],
+            p2_action=ACTION_NAMES[int(self.p2_action[i])],
+            game_state=GAME_STATE_NAMES[int(self.game_state[i])],
+        )
+
+    def slice(self, start: Optional[int] = None, stop: Optional[int] = None) -> "TimelineArrays":
+        """Retorna uma visão (sem cópia) das linhas `[start:stop]`."""
+
+        return TimelineArrays(**{f.name: getattr(self, f.name)[start:stop] for f in fields(self)})
+
+    def column(self, player, name):
+        """Atalho para colunas por jogador: `column('p1', 'state')` -> `p1_state`."""
+
+        if name == "life":
+            return getattr(self, f"life_{player}")
+        return getattr(self, f"{player}_{name}")
+
+    def timestamps(self, fps=60.0):
+        return self.frame_id / float(fps)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, f.name).nbytes for f in fields(self))
+
+
+class TimelineBuilder:
+    """Acumula `FrameData` diretamente em colunas (capacidade dobrada sob demanda).
+
+    Uso:
+      builder = TimelineBuilder()
+      builder.append(fd)
+      arrays = builder.build()  # TimelineArrays com as linhas escritas
+    """
+
+    def __init__(self, capacity=4096):
+        self._arrays = TimelineArrays.empty(capacity)
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    @classmethod
+    def from_arrays(cls, arrays, capacity=4096):
+        """Builder que continua a partir das linhas de `arrays` (ex.: checkpoint)."""
+
+        builder = cls(max(capacity, 2 * len(arrays)))
+        for f in fields(arrays):
+            getattr(builder._arrays, f.name)[:len(arrays)] = getattr(arrays, f.name)
+        builder._n = len(arrays)
+        return builder
+
+    def append(self, fd: FrameData):
+        if self._n == len(self._arrays):
+            self._grow()
+        self._arrays.set_frame(self._n, fd)
+        self._n += 1
+
+    def _grow(self):
+        old = self._arrays
+        new = TimelineArrays.empty(max(1, 2 * len(old)))
+        for f in fields(old):
+            getattr(new, f.name)[:len(old)] = getattr(old, f.name)
+        self._arrays = new
+
+    def build(self) -> TimelineArrays:
+        """Retorna as linhas escritas até agora (visão, sem cópia)."""
+
+        return self._arrays.slice(0, self._n)
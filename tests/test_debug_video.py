@@ -0,0 +1,187 @@
+import json
+import os
+import random
+import shutil
+
+import cv2
+import numpy as np
+import pytest
+
+from analysis.timeline_file import write_timeline
+from models.structures import Event, FrameData
+from models.timeline import TimelineArrays
+import tools.generate_debug_video as debug_video
+from tools.generate_debug_video import (
+    BackgroundWriter,
+    WhiffIndex,
+    clip_intervals,
+    event_targets,
+    read_intervals,
+    segment_bounds,
+)
+
+
+def _brute_force(windows, frame):
+    # regra original: primeira janela de whiff (ordem da lista) que cobre o frame
+    for idx, win in enumerate(windows):
+        if win.get("whiff") and win["start"] <= frame <= win["end"]:
+            return sum(1 for w in windows[:idx + 1] if w.get("whiff")), win
+    return None
+
+
+def test_whiff_index_matches_linear_scan():
+    rng = random.Random(7)
+    windows = []
+    for _ in range(60):
+        start = rng.randrange(0, 500)
+        windows.append({"attacker": rng.choice(["p1", "p2"]), "start": start, "end": start + rng.randrange(0, 40),
+                        "whiff": rng.random() < 0.6, "on_block_adv": 0})
+    index = WhiffIndex(windows)
+    assert index.total == sum(1 for w in windows if w["whiff"])
+    for frame in range(0, 560):
+        assert index.at(frame) == _brute_force(windows, frame)
+
+
+def test_background_writer_keeps_order(tmp_path):
+    path = str(tmp_path / "out.avi")
+    levels = list(range(0, 250, 25))
+    with BackgroundWriter(path, 30.0, (32, 24), lambda v: np.full((24, 32, 3), v, np.uint8), fourcc="MJPG", maxsize=2) as writer:
+        for v in levels:
+            writer.write(v)
+    assert writer.frames_written == len(levels)
+
+    cap = cv2.VideoCapture(path)
+    read = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        read.append(int(round(frame.mean())))
+    cap.release()
+    assert np.allclose(read, levels, atol=3)
+
+
+def test_clip_intervals_pad_and_merge():
+    results = {"frame_data": {"summary": {
+        "whiff_punishes": [{"attacker": "p1", "start": 100, "end": 110, "punishable": True}],
+        "punishable_jumps": [{"player": "p2", "start": 125, "land": 140, "punishable": False}],
+        "drive_impacts": [{"frame_id": 5, "attacker": "p2", "defender": "p1"}, {"frame_id": 400, "attacker": "p1", "defender": "p2"}],
+    }}}
+    intervals = clip_intervals(event_targets(results), pad=10, n_frames=405)
+    assert [(i["start"], i["stop"]) for i in intervals] == [(0, 16), (90, 151), (390, 405)]
+    assert [e["type"] for e in intervals[1]["events"]] == ["whiff_punish", "punishable_jump"]
+
+
+def test_read_intervals_seeks_to_exact_frames(tmp_path):
+    path = str(tmp_path / "seq.avi")
+    with BackgroundWriter(path, 30.0, (32, 24), lambda v: np.full((24, 32, 3), v, np.uint8), fourcc="MJPG") as writer:
+        for v in range(120):
+            writer.write(2 * v)
+    intervals = [{"start": 3, "stop": 6}, {"start": 10, "stop": 12}, {"start": 80, "stop": 84}]
+    cap = cv2.VideoCapture(path)
+    got = [(i, int(round(frame.mean()))) for i, frame in read_intervals(cap, intervals, seek_gap=5)]
+    cap.release()
+    expected = [i for iv in intervals for i in range(iv["start"], iv["stop"])]
+    assert [i for i, _ in got] == expected
+    assert all(abs(mean - 2 * i) <= 2 for i, mean in got)
+
+
+def _decode(path):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def test_segment_bounds():
+    assert segment_bounds(10, 3) == [{"start": 0, "stop": 4}, {"start": 4, "stop": 8}, {"start": 8, "stop": None}]
+    assert segment_bounds(2, 4) == [{"start": 0, "stop": 1}, {"start": 1, "stop": None}]
+
+
+def _render_inputs(tmp_path, n, size):
+    rng = np.random.default_rng(1)
+    video = str(tmp_path / "in.avi")
+    with BackgroundWriter(video, 30.0, size, fourcc="HFYU") as writer:
+        for _ in range(n):
+            writer.write(rng.integers(0, 255, size=(size[1], size[0], 3), dtype=np.uint8))
+    frames = [FrameData(i, i / 30.0, "neutral", "block", True, False, (5, 5, 40, 60), (50, 5, 90, 60),
+                        100 - i, 100, "hit" if i % 7 == 0 else None, None) for i in range(n)]
+    timeline = str(tmp_path / "timeline.sf6t")
+    write_timeline(timeline, TimelineArrays.from_frames(frames), [Event("hit", 7, "p2", "p1")])
+    windows = [{"attacker": "p1", "start": 5, "end": 18, "whiff": True, "punishable": True, "on_block_adv": 0},
+               {"attacker": "p2", "start": 12, "end": 25, "whiff": True, "on_block_adv": 0}]
+    results = str(tmp_path / "results.json")
+    with open(results, "w", encoding="utf-8") as f:
+        json.dump({"frame_data": {"windows": windows}}, f)
+    return video, timeline, results
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="render paralelo exige ffmpeg")
+def test_parallel_render_matches_sequential(tmp_path):
+    n = 30
+    video, timeline, results = _render_inputs(tmp_path, n, (96, 64))
+
+    # HFYU é sem perdas: os frames decodificados não dependem de onde o arquivo começa
+    seq, par = str(tmp_path / "seq.avi"), str(tmp_path / "par.avi")
+    assert debug_video.main(video, seq, timeline, results, events=False, workers=1, fourcc="HFYU") == n
+    assert debug_video.main(video, par, timeline, results, events=False, workers=3, fourcc="HFYU") == n
+    a, b = _decode(seq), _decode(par)
+    assert len(a) == len(b) == n
+    assert all(np.array_equal(x, y) for x, y in zip(a, b))
+
+
+def test_parallel_render_concat_order_with_fake_ffmpeg(tmp_path, monkeypatch):
+    n = 30
+    video, timeline, results = _render_inputs(tmp_path, n, (96, 64))
+    seq = str(tmp_path / "seq.avi")
+    debug_video.main(video, seq, timeline, results, events=False, workers=1, fourcc="HFYU")
+
+    calls = []
+
+    def fake_run(cmd, check):
+        # no lugar do ffmpeg: lê a lista de concatenação e decodifica os segmentos
+        list_path = cmd[cmd.index("-i") + 1]
+        with open(list_path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        paths = [line[len("file '"):-1] for line in lines]
+        calls.append({"cmd": cmd, "lines": lines, "paths": paths, "frames": [_decode(p) for p in paths]})
+        open(cmd[-1], "wb").close()
+
+    monkeypatch.setattr(debug_video, "_ffmpeg", lambda: "/usr/bin/ffmpeg")
+    monkeypatch.setattr(debug_video.subprocess, "run", fake_run)
+    par = str(tmp_path / "par.avi")
+    assert debug_video.main(video, par, timeline, results, events=False, workers=3, fourcc="HFYU") == n
+
+    assert len(calls) == 1
+    call = calls[0]
+    assert call["cmd"][0] == "/usr/bin/ffmpeg" and call["cmd"][-1] == par
+    assert call["cmd"][call["cmd"].index("-f") + 1] == "concat" and call["cmd"][call["cmd"].index("-c") + 1] == "copy"
+    assert [os.path.basename(p) for p in call["paths"]] == ["segment-000.avi", "segment-001.avi", "segment-002.avi"]
+    assert all(os.path.isabs(p) for p in call["paths"])
+    assert [len(f) for f in call["frames"]] == [10, 10, 10]
+    # segmentos em ordem == render sequencial (HFYU é sem perdas)
+    joined = [frame for frames in call["frames"] for frame in frames]
+    assert len(joined) == len(_decode(seq)) == n
+    assert all(np.array_equal(x, y) for x, y in zip(joined, _decode(seq)))
+    # lista e segmentos temporários são removidos
+    assert not os.path.exists(par + ".segments.txt")
+    assert not any(name.startswith("debug-segments-") for name in os.listdir(tmp_path))
+
+
+def test_parallel_render_without_ffmpeg_is_sequential(tmp_path, monkeypatch):
+    n = 12
+    video, timeline, results = _render_inputs(tmp_path, n, (96, 64))
+    monkeypatch.setattr(debug_video, "_ffmpeg", lambda: None)
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("render_parallel called without ffmpeg")
+
+    monkeypatch.setattr(debug_video, "render_parallel", no_pool)
+    out = str(tmp_path / "out.avi")
+    assert debug_video.main(video, out, timeline, results, events=False, workers=3, fourcc="HFYU") == n
+    assert len(_decode(out)) == n
@@ -55,3 +55,51 @@ def test_attack_start_and_block():
     types = [e.type for e in ev]
     assert "attack_start" in types
     assert "block" in types
+
+
+def test_attack_start_and_block_symmetric():
+    prev = make_frame(frame_id=40, p1_state="neutral", p2_state="neutral")
+    cur = make_frame(frame_id=41, p1_state="block", p2_state="attack_active")
+    ev = detect_events(cur, prev)
+    assert any(e.type == "attack_start" and e.attacker == "P2" for e in ev)
+    assert any(e.type == "block" and e.attacker == "P2" and e.defender == "P1" for e in ev)
+
+
+def test_vectorized_rules_match_pairwise_detection():
+    import random
+
+    from analysis.events import EventCoalescer, detect_events_arrays
+    from models.timeline import TimelineArrays
+
+    rnd = random.Random(7)
+    states = ["neutral", "attack_active", "jump", "drive", "block"]
+    timeline, life_p1, life_p2 = [], 100, 100
+    for i in range(500):
+        if rnd.random() < 0.05:
+            life_p1 = max(0, life_p1 - 10)
+        if rnd.random() < 0.05:
+            life_p2 = max(0, life_p2 - 10)
+        timeline.append(make_frame(i, life_p1, life_p2, rnd.choice(states), rnd.choice(states)))
+
+    coalescer = EventCoalescer()
+    expected = []
+    for prev, cur in zip(timeline, timeline[1:]):
+        expected.extend(coalescer.push(cur.frame_id, detect_events(cur, prev)))
+    coalescer.flush()
+    assert detect_events_arrays(TimelineArrays.from_frames(timeline)) == expected
+
+
+def test_block_coalesced_into_single_span():
+    from analysis.events import EventCoalescer
+
+    timeline = [make_frame(0)] + [make_frame(i, p2_state="block") for i in range(1, 40)] + [make_frame(40)]
+    coalescer = EventCoalescer()
+    events = []
+    for prev, cur in zip(timeline, timeline[1:]):
+        events.extend(coalescer.push(cur.frame_id, detect_events(cur, prev)))
+    closed = coalescer.flush()
+
+    blocks = [e for e in events if e.type == "block"]
+    assert len(blocks) == 1
+    assert (blocks[0].start_frame, blocks[0].end_frame) == (1, 39)
+    assert closed == blocks and coalescer.pop_closed() == []
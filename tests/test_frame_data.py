@@ -0,0 +1,167 @@
+from analysis.frame_data import FrameDataCalculator, calculate_frame_data
+from models.structures import FrameData, Event
+
+
+def make_frame(frame_id, p1_state="neutral", p2_state="neutral"):
+    return FrameData(
+        frame_id=frame_id,
+        timestamp=float(frame_id) / 60.0,
+        p1_state=p1_state,
+        p2_state=p2_state,
+        p1_can_act=p1_state == "neutral",
+        p2_can_act=p2_state == "neutral",
+        p1_bbox=(0, 0, 10, 10),
+        p2_bbox=(100, 0, 110, 10),
+        life_p1=100,
+        life_p2=100,
+    )
+
+
+def make_timeline(states):
+    return [make_frame(i, s1, s2) for i, (s1, s2) in enumerate(states)]
+
+
+def test_window_emitted_as_soon_as_it_closes():
+    states = [("neutral", "neutral")] * 2 + [("attack_active", "block")] * 3 + [("neutral", "block")] * 2 + [("neutral", "neutral")] * 5
+    calc = FrameDataCalculator()
+    closed_at = None
+    for frame in make_timeline(states):
+        for kind, rec in calc.push(frame):
+            if kind == "window":
+                closed_at = frame.frame_id
+                assert rec == {"attacker": "p1", "start": 2, "end": 7, "on_block_adv": -2}
+    assert closed_at == 7
+
+
+def test_whiff_punishable_lookahead():
+    states = [("attack_active", "jump")] * 5 + [("neutral", "jump")] * 30 + [("neutral", "neutral")] * 3
+    result = calculate_frame_data(make_timeline(states))
+    whiffs = result["summary"]["whiff_punishes"]
+    assert whiffs == [{"attacker": "p1", "start": 0, "end": 31, "punishable": False}]
+
+    states = [("attack_active", "jump")] * 5 + [("neutral", "jump")] * 28 + [("neutral", "neutral")] * 3
+    result = calculate_frame_data(make_timeline(states))
+    assert result["summary"]["whiff_punishes"][0]["punishable"] is True
+
+
+def test_event_windows_deduplicated_and_heuristic():
+    states = [("neutral", "neutral")] * 3 + [("drive", "block")] * 70
+    timeline = make_timeline(states)
+    events = [Event("hit", 3, attacker="P1", defender="P2"), Event("drive_impact", 3, attacker="P1", defender="P2")]
+    result = calculate_frame_data(timeline, events)
+    assert result["windows"] == [{"attacker": "p1", "start": 3, "on_block_adv": 10}]
+    assert result["summary"]["drive_impacts"] == [{"frame_id": 3, "attacker": "P1", "defender": "P2"}]
+
+
+def test_merge_chunks_matches_single_pass():
+    states = ([("neutral", "neutral")] * 4 + [("attack_active", "block")] * 4 + [("neutral", "neutral")] * 4
+              + [("jump", "neutral")] * 6 + [("neutral", "neutral")] * 6)
+    timeline = make_timeline(states)
+
+    first, second = FrameDataCalculator(), FrameDataCalculator()
+    for frame in timeline[:12]:
+        first.push(frame)
+    for frame in timeline[12:]:
+        second.push(frame)
+    first.flush()
+    second.flush()
+
+    merged = first.merge(second).result()
+    assert merged == calculate_frame_data(timeline)
+    assert merged["summary"]["punishable_jumps"] == [{"player": "p1", "start": 12, "land": 18, "punishable": True}]
+
+
+def test_vectorized_matches_streaming_on_random_timelines():
+    import random
+
+    from analysis.events import detect_events
+    from analysis.frame_data import calculate_frame_data_arrays
+    from models.timeline import TimelineArrays
+
+    states = ["neutral", "attack_active", "jump", "drive", "block"]
+    for seed in range(40):
+        rnd = random.Random(seed)
+        s1 = s2 = "neutral"
+        pairs = []
+        for _ in range(rnd.randint(0, 300)):
+            if rnd.random() < 0.15:
+                s1 = rnd.choice(states)
+            if rnd.random() < 0.15:
+                s2 = rnd.choice(states)
+            pairs.append((s1, s2))
+        timeline = make_timeline(pairs)
+        events, prev = [], None
+        for frame in timeline:
+            events.extend(detect_events(frame, prev))
+            prev = frame
+
+        expected = calculate_frame_data(timeline, events)
+        assert calculate_frame_data_arrays(TimelineArrays.from_frames(timeline), events) == expected
+
+
+def test_state_dict_roundtrip_resumes_identically():
+    import json
+    import random
+
+    from analysis.events import EventCoalescer, detect_events
+
+    states = ["neutral", "attack_active", "jump", "drive", "block"]
+    for seed in range(20):
+        rnd = random.Random(seed)
+        s1 = s2 = "neutral"
+        pairs = []
+        for _ in range(200):
+            if rnd.random() < 0.2:
+                s1 = rnd.choice(states)
+            if rnd.random() < 0.2:
+                s2 = rnd.choice(states)
+            pairs.append((s1, s2))
+        timeline = make_timeline(pairs)
+        cut = rnd.randint(1, len(timeline) - 1)
+
+        def feed(calc, coalescer, frames, prev):
+            out = []
+            for frame in frames:
+                out.extend(calc.push(frame, coalescer.push(frame.frame_id, detect_events(frame, prev))))
+                prev = frame
+            return out
+
+        calc, coalescer = FrameDataCalculator(), EventCoalescer()
+        emitted = feed(calc, coalescer, timeline[:cut], None)
+        # checkpoint no meio do stream (via JSON, como em `main.run`): estado completo
+        # e estado só com o que ainda pode mudar + resultados finalizados à parte
+        done = calc.finalized()
+        saved = json.loads(json.dumps({
+            "calc": calc.state_dict(),
+            "split": calc.state_dict(done),
+            "closed": {field: getattr(calc, field)[:n] for field, n in done.items()},
+            "coalescer": coalescer.state_dict(),
+        }))
+        emitted += feed(calc, coalescer, timeline[cut:], timeline[cut - 1])
+        calc.flush()
+
+        split = saved["split"]
+        assert split["event_windows"] == split["punishable_jumps"] == split["drive_impacts"] == []
+        assert len(split["state_windows"]) <= len(timeline)
+        horizon = calc.event_lookahead
+        assert all(cut - 1 - start < horizon for _, start in split["event_keys"])
+
+        for state, closed in ((saved["calc"], None), (split, saved["closed"])):
+            resumed = FrameDataCalculator.from_state(state, closed)
+            resumed_coalescer = EventCoalescer.from_state(saved["coalescer"])
+            feed(resumed, resumed_coalescer, timeline[cut:], timeline[cut - 1])
+            resumed.flush()
+            assert json.loads(json.dumps(resumed.result())) == json.loads(json.dumps(calc.result()))
+
+
+def test_dedup_keys_stay_within_lookahead():
+    from analysis.events import EventCoalescer, detect_events
+
+    pattern = [("attack_active", "block")] * 3 + [("neutral", "neutral")] * 5
+    timeline = make_timeline(pattern * 200)
+    calc, coalescer, prev = FrameDataCalculator(), EventCoalescer(), None
+    for frame in timeline:
+        calc.push(frame, coalescer.push(frame.frame_id, detect_events(frame, prev)))
+        prev = frame
+    assert len(calc.state_windows) > 100
+    assert len(calc._state_keys) + len(calc._event_keys) <= 4 * calc.event_lookahead // len(pattern) + 4
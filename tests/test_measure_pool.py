@@ -0,0 +1,62 @@
+import os
+import signal
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+
+from vision.measure_pool import FrameRing, MeasurePool, measure_frame
+
+EFFECTS = {"blur_ksize": None, "morph_kernel": None, "binary_thresh": None}
+
+
+def _frames(n=8, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 255, (90, 160, 3), dtype=np.uint8) for _ in range(n)]
+
+
+def _bboxes(i):
+    return (10 + i, 20, 50 + i, 80), (100 - i, 20, 140 - i, 80)
+
+
+def test_pool_matches_in_process_measurements():
+    frames = _frames()
+    prime = frames[0]
+    expected = []
+    for i, frame in enumerate(frames[1:], start=1):
+        expected.append(measure_frame(frame, frames[i - 1], _bboxes(i), _bboxes(i - 1), i % 2 == 1, EFFECTS))
+
+    # anel mínimo: cada frame é coletado antes do próximo reescrever o slot do anterior
+    with MeasurePool(1, 3, EFFECTS) as pool:
+        pool.prime(prime)
+        pending = [pool.submit(frames[1], _bboxes(1), _bboxes(0), True)]
+        got = []
+        for i, frame in enumerate(frames[2:], start=2):
+            got.append(pending.pop().result())
+            pending.append(pool.submit(frame, _bboxes(i), _bboxes(i - 1), i % 2 == 1))
+        got.append(pending.pop().result())
+
+    assert got == expected
+    assert got[1][3] is None and got[0][3] is not None
+
+
+def test_ring_rejects_other_frame_shapes():
+    ring = FrameRing(3, (90, 160, 3))
+    try:
+        assert [ring.put(f) for f in _frames(4)] == [0, 1, 2, 0]
+        with pytest.raises(ValueError):
+            ring.put(np.zeros((90, 120, 3), dtype=np.uint8))
+    finally:
+        ring.close()
+
+
+def test_dead_worker_fails_pending_measurements():
+    frames = _frames(3)
+    with pytest.raises(BrokenProcessPool):
+        with MeasurePool(2, 4, EFFECTS) as pool:
+            pool.prime(frames[0])
+            assert pool.submit(frames[1], _bboxes(1), _bboxes(0), True).result()[0] is not None
+            for proc in pool._pool._processes.values():
+                os.kill(proc.pid, signal.SIGKILL)
+            # sem o worker, a medição levanta em vez de esperar para sempre
+            pool.submit(frames[2], _bboxes(2), _bboxes(1), True).result()
@@ -0,0 +1,55 @@
+import threading
+import time
+
+import pytest
+
+from analysis.pipeline import Pipeline
+
+
+def _stages():
+    state = {"prev": None}
+
+    def delta(x):
+        # estágio com estado: depende da ordem de chegada
+        out = (x, None if state["prev"] is None else x - state["prev"])
+        state["prev"] = x
+        return out
+
+    def slow(item):
+        time.sleep(0.001)
+        return item + (item[0] * 2,)
+
+    return [("delta", delta), ("slow", slow)]
+
+
+def test_threaded_matches_inline_and_keeps_order():
+    inline = list(Pipeline(range(200), _stages(), threaded=False).run())
+    pipeline = Pipeline(range(200), _stages(), maxsize=4, order_key=lambda item: item[0])
+    threaded = list(pipeline.run())
+    assert threaded == inline
+    assert [item[0] for item in threaded] == list(range(200))
+
+    stats = pipeline.stats()
+    assert stats["threaded"] is True
+    assert [s["stage"] for s in stats["stages"]] == ["decode", "delta", "slow", "output"]
+    assert all(s["items"] == 200 for s in stats["stages"])
+    assert all(s["queue_depth_max"] <= 4 for s in stats["stages"])
+    assert stats["bottleneck"] == "slow"
+
+
+def test_stage_error_propagates_to_consumer():
+    def boom(x):
+        if x == 50:
+            raise ValueError("bad frame")
+        return x
+
+    with pytest.raises(ValueError, match="bad frame"):
+        list(Pipeline(range(100), [("boom", boom)]).run())
+
+
+def test_early_exit_stops_threads():
+    before = threading.active_count()
+    run = Pipeline(iter(range(10_000)), [("id", lambda x: x)], maxsize=2).run()
+    assert [next(run) for _ in range(3)] == [0, 1, 2]
+    run.close()
+    assert threading.active_count() == before
@@ -0,0 +1,132 @@
+import json
+import os
+import random
+
+from analysis.events import EventCoalescer, detect_events
+from analysis.frame_data import FrameDataCalculator
+from analysis.reports import build_reports, load_run_results, punish_report, results_from_timeline, segment_rollups, segment_summary
+from analysis.rounds import RoundTracker
+from analysis.timeline_file import TimelineFile, write_timeline
+from models.structures import FrameData
+from models.timeline import TimelineArrays
+from vision.state_detection import can_act
+
+
+RESULTS = {
+    "metadata": {"fps": 30.0},
+    "frame_data": {
+        "summary": {
+            "whiff_punishes": [
+                {"attacker": "p1", "start": 30, "end": 60, "punishable": True},
+                {"attacker": "p2", "start": 2400, "end": 2440, "punishable": False},
+            ],
+            "punishable_jumps": [{"player": "p2", "start": 90, "land": 120, "punishable": True}],
+        }
+    },
+}
+
+
+def test_punish_report_uses_run_fps():
+    report = punish_report(RESULTS)
+    assert report["counts"] == {"whiffs": 2, "punishable_jumps": 1}
+    assert report["rows"][0]["start_time"] == 1.0
+    assert report["rows"][2]["end_time"] == 4.0
+
+    summary = segment_summary(report, 60)
+    assert [s["total_opportunities"] for s in summary["segments"]] == [2, 1]
+    assert summary["segments"][0]["punishable_jumps"] == 1
+
+    # sem metadata não há tempos e, portanto, nem segmentos
+    assert segment_summary(punish_report({"frame_data": RESULTS["frame_data"]})) is None
+
+
+def test_build_reports_writes_all_artifacts(tmp_path):
+    written = build_reports(RESULTS, str(tmp_path), plot=False)
+    assert set(written) == {
+        "punish_report_csv", "punish_report_json", "segment_rollups_json", "segment_summary_json", "segment_summary_csv",
+    }
+    with open(written["segment_summary_json"], encoding="utf-8") as f:
+        assert json.load(f)["segment_seconds"] == 60
+
+
+def test_rollups_multi_granularity_and_rounds():
+    from analysis.rounds import RoundTracker
+
+    tracker = RoundTracker()
+    states = [None] * 10 + ["KO"] * 5 + ["REPLAY"] * 5 + ["FIGHT"] * 3 + [None] * 77
+    for fid, gs in enumerate(states):
+        tracker.push(fid * 30, gs)  # 1 frame por segundo a 30 fps
+    rounds = tracker.flush()
+    assert [(r["start_frame"], r["end_frame"]) for r in rounds] == [(0, 300), (600, 2970)]
+
+    other = {"match": "b", "rows": [{"type": "whiff_punish", "punishable": True, "start_time": 5.0}]}
+    out = segment_rollups([punish_report({**RESULTS, "rounds": rounds}), other], (10, "round", "match"))
+    assert out["matches"] == ["match_0", "b"]
+
+    by_round = [(s["match"], s["segment_index"], s["total_opportunities"]) for s in out["rollups"]["round"]]
+    # rounds em segundos: [0, 10] e [20, 99]; linhas em 1s, 3s (round 0) e 80s (round 1)
+    assert by_round == [("match_0", 0, 2), ("match_0", 1, 1), ("b", 0, 1)]
+    assert [s["total_opportunities"] for s in out["rollups"]["match"]] == [3, 1]
+    assert len([s for s in out["rollups"]["10s"] if s["match"] == "match_0"]) == 9
+
+
+def _run_timeline(n=600, seed=3):
+    """Timeline aleatória com eventos e frame-data calculados como em `FrameAnalysis.step`."""
+
+    rnd = random.Random(seed)
+    states = ["neutral", "attack_active", "jump", "drive", "block"]
+    s1 = s2 = "neutral"
+    life, gs = [100, 100], "FIGHT"
+    frames, events, prev = [], [], None
+    coalescer, calc, rounds = EventCoalescer(), FrameDataCalculator(), RoundTracker()
+    for i in range(n):
+        s1 = rnd.choice(states) if rnd.random() < 0.15 else s1
+        s2 = rnd.choice(states) if rnd.random() < 0.15 else s2
+        if rnd.random() < 0.03:
+            life[rnd.randrange(2)] -= 10
+        if i % 200 == 150:
+            gs = "KO"
+        elif i % 200 == 190:
+            gs = "FIGHT"
+        frame = FrameData(i, i / 60, s1, s2, can_act(s1), can_act(s2), (0, 0, 10, 10), (20, 0, 30, 10), *life)
+        frame.game_state = gs
+        frame_events = coalescer.push(i, detect_events(frame, prev))
+        events.extend(frame_events)
+        calc.push(frame, frame_events)
+        rounds.push(i, gs)
+        frames.append(frame)
+        prev = frame
+    coalescer.flush()
+    calc.flush()
+    return frames, events, calc.result(), rounds.flush()
+
+
+def test_results_from_timeline_match_streaming_run(tmp_path):
+    frames, events, frame_data, rounds = _run_timeline()
+    path = str(tmp_path / "timeline.sf6t")
+    write_timeline(path, TimelineArrays.from_frames(frames), [], metadata={"fps": 60.0})
+
+    res = results_from_timeline(TimelineFile(path))
+    assert res["frame_data"] == frame_data
+    assert res["rounds"] == rounds and len(rounds) == 4
+    assert res["metadata"] == {"fps": 60.0}
+    # eventos re-detectados das colunas: os mesmos do streaming
+    assert res["events"] == [e.__dict__ for e in events]
+
+
+def test_load_run_results_recomputes_stale_results(tmp_path):
+    frames, events, frame_data, _ = _run_timeline(n=200)
+    timeline = str(tmp_path / "timeline.sf6t")
+    results = str(tmp_path / "results.json")
+    assert load_run_results(results, timeline) is None
+
+    write_timeline(timeline, TimelineArrays.from_frames(frames), events, metadata={"fps": 60.0})
+    assert load_run_results(results, timeline)["frame_data"] == frame_data
+
+    with open(results, "w", encoding="utf-8") as f:
+        json.dump({"frame_data": {"windows": []}}, f)
+    assert load_run_results(results, timeline) == {"frame_data": {"windows": []}}
+    # results.json mais antigo que a timeline: recalcula
+    stamp = os.path.getmtime(timeline)
+    os.utime(results, (stamp - 10, stamp - 10))
+    assert load_run_results(results, timeline)["frame_data"] == frame_data
@@ -0,0 +1,22 @@
+from analysis.results_stream import NDJSONResultsWriter, read_ndjson
+from models.structures import Event, FrameData
+
+
+def test_ndjson_roundtrip_and_partial_tail(tmp_path):
+    path = tmp_path / "results.ndjson"
+    fd = FrameData(0, 0.0, "neutral", "block", True, False, (0, 0, 10, 10), (20, 0, 30, 10), 100, 100)
+    with NDJSONResultsWriter(str(path), flush_every=1) as out:
+        out.write_frame(fd)
+        out.write_event(Event("block", 0, attacker="P1", defender="P2", end_frame=12))
+        out.write("window", {"attacker": "p1", "start": 0, "on_block_adv": 2})
+        out.write_summary({"frames": 1})
+
+    # simula um escritor ainda ativo: linha final incompleta é ignorada
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"kind": "frame", "frame_')
+
+    records = list(read_ndjson(str(path)))
+    assert [r["kind"] for r in records] == ["frame", "event", "window", "summary"]
+    assert records[0]["p2_bbox"] == [20, 0, 30, 10]
+    assert records[1]["end_frame"] == 12
+    assert list(read_ndjson(str(path), kinds={"summary"})) == [{"kind": "summary", "frames": 1}]
@@ -0,0 +1,80 @@
+import json
+
+import numpy as np
+
+from analysis.frame_analysis import AnalysisConfig, FrameAnalysis
+from analysis.shadow import DIFF_SAMPLES, ShadowRun
+from models.structures import VisionRecord
+from vision.game_state import GameStateSignals
+from vision.state_detection import StateDetectorConfig, StateFeatures
+
+
+def _records(n=240, seed=0):
+    rng = np.random.default_rng(seed)
+    for i in range(n):
+        feats = [
+            StateFeatures(valid=True, h=150, w=60, area=int(rng.integers(2000, 30000)), mean_color=float(rng.uniform(0, 80)),
+                          dcy=float(rng.normal(0, 8)), dcx=float(rng.normal(0, 8)), mad=float(rng.uniform(0, 10)),
+                          has_prev_frame=i > 0)
+            for _ in range(2)
+        ]
+        mads = [None if i == 0 else float(rng.uniform(0, 14)) for _ in range(2)]
+        yield VisionRecord(i, (0, 0, 60, 150), (100, 0, 160, 150), feats[0], feats[1], mads,
+                           GameStateSignals(overlay_ratio=0.0, changed_pixels=1000, pixels=10000))
+
+
+def _run(primary_cfg, shadow_cfg, split=None):
+    primary = FrameAnalysis(primary_cfg)
+    shadow = ShadowRun(shadow_cfg)
+    states = []
+    for rec in _records():
+        if rec.frame_id == split:
+            # checkpoint no meio: o estado da sombra passa por JSON
+            shadow = ShadowRun.from_state(json.loads(json.dumps(shadow.state_dict())))
+        data, frame_events, _ = primary.step(rec)
+        states.append(shadow.step(rec, data, frame_events).p1_state)
+    primary.flush()
+    shadow.flush()
+    return shadow.report(primary.result()), primary, states
+
+
+def test_identical_shadow_has_empty_diff():
+    cfg = AnalysisConfig(state=StateDetectorConfig(area_attack_threshold=15000, motion_thresh=3.0))
+    report, primary, _ = _run(cfg, AnalysisConfig(name="same", state=cfg.state))
+    diff = report["diff"]
+    assert diff["frames"]["compared"] == 240 and diff["frames"]["differing"] == 0
+    assert diff["events"]["only_primary"] == diff["events"]["only_shadow"] == 0
+    assert all(v.get("delta", 0) == 0 for v in diff["frame_data_summary"].values())
+    assert report["result"]["frame_data"] == primary.result()["frame_data"]
+
+
+def test_shadow_diff_and_resume_from_state():
+    cfg = AnalysisConfig(state=StateDetectorConfig(area_attack_threshold=15000, motion_thresh=3.0))
+    other = AnalysisConfig(name="loose", state=StateDetectorConfig(area_attack_threshold=5000, motion_thresh=1.0),
+                           effects_mean_diff_thresh=12.0)
+    report, _, states = _run(cfg, other)
+    resumed, _, resumed_states = _run(cfg, other, split=120)
+
+    standalone = FrameAnalysis(other)
+    expected = [standalone.step(rec)[0].p1_state for rec in _records()]
+    assert states == expected == resumed_states
+
+    diff = report["diff"]
+    assert diff["frames"]["differing"] > 0 and diff["frames"]["fields"]["p1_state"] > 0
+    assert diff["events"]["only_primary"] + diff["events"]["only_shadow"] > 0
+    assert resumed == report
+    # o diff guarda só contagens e amostras, não os eventos
+    events = diff["events"]
+    assert events["only_primary"] > len(events["only_primary_sample"]) == DIFF_SAMPLES
+
+
+def test_analysis_does_not_keep_closed_spans():
+    cfg = AnalysisConfig(state=StateDetectorConfig(area_attack_threshold=15000, motion_thresh=3.0))
+    analysis = FrameAnalysis(cfg)
+    spans = []
+    for rec in _records():
+        _, frame_events, _ = analysis.step(rec)
+        spans.extend(e for e in frame_events if e.type in analysis.coalescer.continuous)
+        assert analysis.state_dict()["coalescer"]["closed"] == []
+        assert all(s in spans for s in analysis.closed_spans)
+    assert spans
@@ -0,0 +1,46 @@
+import multiprocessing
+
+import numpy as np
+
+from video.shared_memory import SharedArrays
+
+
+def _child_sum(spec):
+    shared = SharedArrays.attach(spec)
+    out = {k: float(v.sum()) for k, v in shared.arrays.items()}
+    out["readonly"] = not shared.arrays["a"].flags.writeable
+    return out
+
+
+def test_shared_arrays_visible_in_worker_process():
+    arrays = {"a": np.arange(10, dtype=np.int32), "b": np.ones((3, 5)), "empty": np.zeros(0, dtype=bool)}
+    with SharedArrays.create(arrays) as shared:
+        with multiprocessing.Pool(1) as pool:
+            got = pool.apply(_child_sum, (shared.spec(),))
+    assert got == {"a": 45.0, "b": 15.0, "empty": 0.0, "readonly": True}
+
+
+def test_parallel_tuning_matches_serial():
+    from tools.tune_state_detection import config_grid, iter_config_counts
+
+    rng = np.random.default_rng(3)
+    n = 200
+    table = {
+        "valid": rng.random(n) > 0.1,
+        "h": rng.integers(40, 200, n).astype(np.int32),
+        "w": rng.integers(20, 120, n).astype(np.int32),
+        "area": rng.integers(500, 25000, n).astype(np.int32),
+        "mean_color": rng.uniform(0, 80, n),
+        "dcy": rng.normal(0, 10, n),
+        "dcx": rng.normal(0, 10, n),
+        "mad": rng.uniform(0, 8, n),
+        "has_prev_frame": np.ones(n, dtype=bool),
+    }
+    tables = {"p1": table, "p2": {k: v[::-1].copy() for k, v in table.items()}}
+    hits = sorted(rng.choice(n, 15, replace=False).tolist())
+    configs = config_grid()
+
+    serial = [np.concatenate(c) for c in zip(*iter_config_counts(tables, hits, configs, workers=1))]
+    parallel = [np.concatenate(c) for c in zip(*iter_config_counts(tables, hits, configs, workers=3, batch=50))]
+    assert len(serial[0]) == len(configs)
+    assert all(np.array_equal(p, s) for p, s in zip(parallel, serial))
@@ -0,0 +1,53 @@
+from analysis.spans import StateSpanIndex
+from models.structures import FrameData
+
+
+def make_timeline(p1_states):
+    return [
+        FrameData(
+            frame_id=i,
+            timestamp=i / 60.0,
+            p1_state=s,
+            p2_state="neutral",
+            p1_can_act=s == "neutral",
+            p2_can_act=True,
+            p1_bbox=(0, 0, 10, 10),
+            p2_bbox=(100, 0, 110, 10),
+            life_p1=100,
+            life_p2=100,
+        )
+        for i, s in enumerate(p1_states)
+    ]
+
+
+STATES = ["neutral"] * 3 + ["attack_active"] * 4 + ["block"] * 2 + ["neutral"] * 3
+
+
+def test_point_queries():
+    idx = StateSpanIndex.from_frames(make_timeline(STATES))
+    assert idx.span_count("p1") == 4
+    assert idx.span_count("p2") == 1
+    assert idx.state_at("p1", 0) == "neutral"
+    assert idx.state_at("p1", 5) == "attack_active"
+    assert idx.state_at("p1", 8) == "block"
+    assert idx.state_at("p1", 12) is None
+    assert idx.next_actionable("p1", 1) == 1
+    assert idx.next_actionable("p1", 3) == 9
+    assert idx.next_actionable("p1", 12) is None
+
+
+def test_spans_in_clips_to_range():
+    idx = StateSpanIndex.from_frames(make_timeline(STATES))
+    assert idx.spans_in("p1", 5, 10) == [
+        (5, 6, "attack_active", False),
+        (7, 8, "block", False),
+        (9, 9, "neutral", True),
+    ]
+
+
+def test_encode_roundtrip():
+    idx = StateSpanIndex.from_frames(make_timeline(STATES))
+    decoded = StateSpanIndex.decode(idx.encode())
+    for frame in range(len(STATES)):
+        assert decoded.state_at("p1", frame) == idx.state_at("p1", frame)
+        assert decoded.next_actionable("p1", frame) == idx.next_actionable("p1", frame)
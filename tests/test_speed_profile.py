@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from models.structures import Event
+from tools.autotune_speed import disagreement, event_items
+from vision.effects_detection import effect_mads
+from vision.speed_profile import SpeedProfile, load_speed_profile, save_speed_profile
+
+
+def test_effect_mads_roi_pad_matches_full_frame():
+    rng = np.random.default_rng(3)
+    prev, cur = (rng.integers(0, 255, size=(120, 160, 3), dtype=np.uint8) for _ in range(2))
+    p1, p2 = (10, 20, 60, 100), (0, 30, 150, 119)
+    for blur, morph, bin_th in [(None, None, None), (5, 3, None), (3, 5, 128)]:
+        full = effect_mads(cur, prev, p1, p2, blur_ksize=blur, morph_kernel=morph, binary_thresh=bin_th)
+        # margem que cobre o suporte dos filtros: idêntico ao frame inteiro
+        pad = (blur or 0) // 2 + 2 * ((morph or 0) // 2)
+        assert effect_mads(cur, prev, p1, p2, blur_ksize=blur, morph_kernel=morph, binary_thresh=bin_th, roi_pad=pad) == full
+
+
+def test_speed_profile_roundtrip(tmp_path):
+    profile = SpeedProfile(name="fast", scale=0.5, tracker="kcf", track_every=2, effects_roi_pad=4)
+    path = save_speed_profile(profile, str(tmp_path), extra={"tuning": {"fps": 120.0}})
+    assert load_speed_profile("fast", str(tmp_path)) == profile
+    assert load_speed_profile(path) == profile
+    assert load_speed_profile(None) == SpeedProfile()
+    with pytest.raises(ValueError):
+        SpeedProfile(tracker="boosting")
+
+
+def test_disagreement_tolerance():
+    ref = event_items([Event("hit", 10, "p1"), Event("hit", 40, "p2"), Event("block", 50, "p1")])
+    assert disagreement(ref, ref) == 0.0
+    # deslocamento dentro da tolerância ainda pareia
+    shifted = event_items([Event("hit", 12, "p1"), Event("hit", 39, "p2"), Event("block", 50, "p1")])
+    assert disagreement(ref, shifted, tolerance=2) == 0.0
+    # atacante trocado (1 sem par de cada lado) + um evento a mais: 3 sem par em 7 itens
+    other = event_items([Event("hit", 10, "p2"), Event("hit", 40, "p2"), Event("block", 50, "p1"), Event("jump", 5, "p1")])
+    assert disagreement(ref, other) == pytest.approx(3 / 7)
+    assert disagreement([], []) == 0.0
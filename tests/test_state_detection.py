@@ -0,0 +1,61 @@
+import numpy as np
+
+from models.timeline import STATE_NAMES
+from vision.state_detection import StateDetectorConfig, classify_state, classify_state_batch, compute_state_features, stack_state_features
+
+
+def test_classify_state_batch_matches_scalar_for_config_grid():
+    rng = np.random.default_rng(1)
+    frames = [rng.integers(0, 255, size=(120, 160, 3), dtype=np.uint8) for _ in range(30)]
+    feats, prev_frame, prev_bbox = [], None, None
+    for frame in frames:
+        x, y = (int(v) for v in rng.integers(0, 60, size=2))
+        bbox = (x, y, x + int(rng.integers(0, 80)), y + int(rng.integers(0, 60)))
+        feats.append(compute_state_features(frame, bbox, prev_frame, prev_bbox))
+        prev_frame, prev_bbox = frame, bbox
+    table = stack_state_features(feats)
+
+    configs = [
+        StateDetectorConfig(
+            area_attack_threshold=float(rng.uniform(0, 4000)),
+            area_attack_fallback=float(rng.uniform(0, 4000)),
+            mean_color_block_threshold=float(rng.uniform(100, 150)),
+            jump_cy_delta=float(rng.uniform(0, 0.5)),
+            drive_cx_delta_factor=float(rng.uniform(0, 0.5)),
+            motion_thresh=float(rng.uniform(60, 100)),
+        )
+        for _ in range(25)
+    ]
+    # todas as configs de uma vez: campos (k, 1) -> resultado (k, n)
+    grid = StateDetectorConfig()
+    for name in ("area_attack_threshold", "area_attack_fallback", "mean_color_block_threshold",
+                 "jump_cy_delta", "drive_cx_delta_factor", "motion_thresh"):
+        setattr(grid, name, np.asarray([getattr(c, name) for c in configs])[:, None])
+    codes = classify_state_batch(table, grid)
+
+    assert codes.shape == (len(configs), len(feats))
+    for k, cfg in enumerate(configs):
+        assert [STATE_NAMES[c] for c in codes[k]] == [classify_state(f, cfg) for f in feats]
+    assert len(set(codes.ravel().tolist())) > 2
+
+
+def test_effects_sweep_matches_detect_effects():
+    import itertools
+
+    from vision.effects_detection import EffectsSweep, detect_effects
+
+    rng = np.random.default_rng(2)
+    frames = [rng.integers(0, 255, size=(90, 120, 3), dtype=np.uint8) for _ in range(8)]
+    bboxes = [((5, 5, 50, 60), (60, 10, 118, 88))] * 4 + [((-4, 0, 30, 30), (100, 70, 130, 95))] * 4
+
+    sweep = EffectsSweep(frames, bboxes)
+    thresholds, blurs, morphs, bins = [20.0, 60.0], [None, 5], [None, 5], [None, 60]
+    candidates = sweep.sweep(thresholds, blurs, morphs, bins)
+    for c, (thr, blur, morph, bin_th) in zip(candidates, itertools.product(thresholds, blurs, morphs, bins)):
+        expected = [
+            i for i in range(1, len(frames))
+            if detect_effects(frames[i], frames[i - 1], *bboxes[i], mean_diff_thresh=thr,
+                              blur_ksize=blur, morph_kernel=morph, binary_thresh=bin_th)
+        ]
+        assert (c["mean_diff_thresh"], c["blur"], c["morph"], c["bin"]) == (thr, blur, morph, bin_th)
+        assert c["hits"] == expected
@@ -0,0 +1,41 @@
+from analysis.timeline_file import TimelineFile, write_timeline
+from models.structures import Event, FrameData
+from models.timeline import TimelineBuilder
+
+
+def test_write_and_mmap_range(tmp_path):
+    builder = TimelineBuilder(capacity=2)
+    for i in range(50):
+        state = "attack_active" if 10 <= i < 15 else "neutral"
+        builder.append(FrameData(i, i / 60, state, "block", state == "neutral", False,
+                                 (i, 0, i + 10, 10), (100, 0, 110, 10), 100 - i // 10, 100, game_state="FIGHT"))
+    arrays = builder.build()
+    events = [Event("block", 1, attacker="P1", defender="P2", end_frame=49), Event("attack_start", 10, attacker="P1")]
+
+    path = str(tmp_path / "timeline.sf6t")
+    write_timeline(path, arrays, events, metadata={"fps": 60.0})
+
+    tf = TimelineFile(path)
+    assert len(tf) == 50
+    assert tf.metadata == {"fps": 60.0}
+    chunk = tf.range(10, 20)
+    assert chunk.frame_id.tolist() == list(range(10, 20))
+    assert not chunk.p1_bbox.flags.owndata
+    assert chunk.frame(0) == arrays.frame(10)
+    assert [e.type for e in tf.events_in(10, 11)] == ["block", "attack_start"]
+    assert [e.type for e in tf.events_in(12, 13)] == ["block"]
+    assert tf.events() == events
+
+
+def test_timeline_without_events_reads_back(tmp_path):
+    for n in (0, 1, 3, 7):
+        builder = TimelineBuilder(capacity=2)
+        for i in range(n):
+            builder.append(FrameData(i, i / 60, "neutral", "neutral", True, True, (i, 0, i + 10, 10), (100, 0, 110, 10), 100, 100))
+        path = str(tmp_path / f"quiet-{n}.sf6t")
+        write_timeline(path, builder.build(), [])
+
+        tf = TimelineFile(path)
+        assert len(tf) == n
+        assert tf.range().frame_id.tolist() == list(range(n))
+        assert tf.events() == [] and tf.events_in(0, n) == []
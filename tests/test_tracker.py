@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from vision.players import get_player_pool, per_player
+from vision.tracker import TrackerManager
+
+
+class _FakeTracker:
+    """Anda `step` px por update; `fail` = exceção no update."""
+
+    def __init__(self, box, step, fail=False):
+        self.box = list(box)
+        self.step = step
+        self.fail = fail
+
+    def update(self, frame):
+        if self.fail:
+            raise RuntimeError("tracker crashed")
+        self.box[0] += self.step
+        return True, tuple(self.box)
+
+
+def _manager(p1, p2):
+    mgr = TrackerManager(backend="none")
+    mgr.trackers = {"p1": p1, "p2": p2}
+    mgr.last_bboxes = {"p1": (10, 10, 30, 50), "p2": (100, 10, 120, 50)}
+    return mgr
+
+
+def test_per_player_keeps_order_and_isolates_errors():
+    def fn(x):
+        if x == 1:
+            raise ValueError(x)
+        return x * 10
+
+    pool = get_player_pool()
+    assert per_player(fn, [(0,), (2,), (3,)], pool) == [0, 20, 30]
+    assert per_player(fn, [(0,), (1,)], pool, on_error=lambda i, exc: ("err", i)) == [0, ("err", 1)]
+    with pytest.raises(ValueError):
+        per_player(fn, [(1,), (2,)], pool)
+
+
+def test_update_parallel_matches_sequential():
+    frame = np.zeros((90, 160, 3), dtype=np.uint8)
+    seq = _manager(_FakeTracker((10, 10, 20, 40), 1), _FakeTracker((100, 10, 20, 40), -1))
+    par = _manager(_FakeTracker((10, 10, 20, 40), 1), _FakeTracker((100, 10, 20, 40), -1))
+    for _ in range(5):
+        assert seq.update(frame) == par.update(frame, executor=get_player_pool())
+    assert par.last_bboxes == {"p1": (15, 10, 35, 50), "p2": (95, 10, 115, 50)}
+
+
+def test_update_error_only_affects_failing_player():
+    frame = np.zeros((90, 160, 3), dtype=np.uint8)
+    mgr = _manager(_FakeTracker((10, 10, 20, 40), 2), _FakeTracker((100, 10, 20, 40), 0, fail=True))
+    p1, p2 = mgr.update(frame, executor=get_player_pool())
+    assert p1 == (12, 10, 32, 50)
+    assert p2 == (100, 10, 120, 50)
+
+
+def test_tracker_backend_reports_template_fallback(monkeypatch):
+    import main
+    import vision.tracker
+
+    vision_stages = main.VisionStages()
+    if vision_stages.detector is None:
+        assert vision_stages.tracker_backend == "template"
+        return
+    expected = "csrt" if vision.tracker.tracker_factory("csrt") is not None else "template"
+    assert vision_stages.tracker_backend == expected
+
+    # OpenCV sem o backend: o manager cai no template matching e o rótulo acompanha
+    monkeypatch.setattr(vision.tracker, "tracker_factory", lambda backend="csrt": None)
+    assert main.VisionStages().tracker_backend == "template"
@@ -0,0 +1,215 @@
+import cv2
+import numpy as np
+
+from main import vision_records
+from tools.tune_state_detection import (
+    EFFECT_VARIANTS,
+    SEARCH_SPACE,
+    config_counts,
+    count_rates,
+    evaluate_corpus,
+    frame_subset,
+    iter_corpus_results,
+    sample_configs,
+    subset_tables,
+    successive_halving,
+)
+from tools.tuning_corpus import FEATURE_NAMES, FeatureShard, build_shard, load_manifest, write_shard
+from vision.state_detection import compute_state_features, stack_state_features
+
+
+def _tables(n, seed=4):
+    rng = np.random.default_rng(seed)
+    table = {
+        "valid": rng.random(n) > 0.1,
+        "h": rng.integers(40, 200, n).astype(np.int32),
+        "w": rng.integers(20, 120, n).astype(np.int32),
+        "area": rng.integers(500, 30000, n).astype(np.int32),
+        "mean_color": rng.uniform(0, 80, n),
+        "dcy": rng.normal(0, 10, n),
+        "dcx": rng.normal(0, 10, n),
+        "mad": rng.uniform(0, 8, n),
+        "has_prev_frame": np.ones(n, dtype=bool),
+    }
+    hits = sorted(rng.choice(n, n // 20, replace=False).tolist())
+    return {"p1": table, "p2": {k: v[::-1].copy() for k, v in table.items()}}, hits
+
+
+def _shard(tmp_path, name, n, seed):
+    """Shard sintético cujos hits (efeito `EFFECT`) são exatamente os de `_tables`."""
+
+    tables, hits = _tables(n, seed)
+    mads = np.full((n, 2), np.nan)
+    mads[1:, 0] = 0.0
+    mads[hits, 0] = 100.0
+    path = write_shard(str(tmp_path / f"{name}.npz"), tables, {v: mads for v in EFFECT_VARIANTS}, {"name": name})
+    return FeatureShard(path), tables, hits
+
+
+def evaluate_configs(tables, hits, configs, n_frames):
+    """Avaliação direta (sem shards/lotes) de referência."""
+
+    covered, attack = config_counts(tables, hits, configs)
+    metrics = count_rates(covered, len(hits), attack, n_frames)
+    return [
+        {"config": c, "coverage": cov, "attack_rate": rate, "score": sc}
+        for c, cov, rate, sc in zip(configs, *(m.tolist() for m in metrics))
+    ]
+
+
+EFFECT = {"mean_diff_thresh": 40.0, "blur": 5, "morph": 5, "bin": 50}
+
+
+def test_lhs_sampling_covers_every_stratum():
+    configs = sample_configs(50, method="lhs", seed=1)
+    for name, (lo, hi) in SEARCH_SPACE.items():
+        strata = sorted(int((c[name] - lo) / (hi - lo) * 50) for c in configs)
+        assert strata == list(range(50))
+
+
+def test_subset_coverage_window_stops_at_block_edge():
+    tables, _ = _tables(600)
+    idx, block_start = frame_subset(600, 120, block=60)
+    assert len(idx) == 120 and idx[0] == 0 and idx[-1] == 599
+    # hit no 2º frame do segundo bloco: a janela começa no início do bloco
+    # hits fora do subconjunto são descartados
+    sub, pos, hit_lo = subset_tables(tables, [3, 300, int(idx[61])], idx, block_start)
+    assert len(sub["p1"]["area"]) == 120
+    assert pos.tolist() == [3, 61]
+    assert hit_lo.tolist() == [0, 60]
+
+
+def test_successive_halving_final_rung_uses_all_frames(tmp_path):
+    shard, tables, hits = _shard(tmp_path, "a", 900, seed=4)
+    configs = sample_configs(90, method="random", seed=2)
+    rungs = list(successive_halving([shard], EFFECT, configs, eta=3, min_frames=60, workers=1))
+
+    assert [r["configs"] for r, _, _ in rungs] == [90, 30, 10]
+    assert rungs[-1][0]["frames"] == 900
+    final = rungs[-1][1]
+    expected = evaluate_configs(tables, hits, [r["config"] for r in final], 900)
+    for r in final:
+        r.pop("videos")
+    assert sorted(final, key=lambda r: str(r["config"])) == sorted(expected, key=lambda r: str(r["config"]))
+    scores = [r["score"] for r in final]
+    assert scores == sorted(scores, reverse=True)
+
+
+def _video(path, n=40, size=(160, 120)):
+    rng = np.random.default_rng(3)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30.0, size)
+    for i in range(n):
+        frame = rng.integers(0, 40, size=(size[1], size[0], 3), dtype=np.uint8)
+        frame[60:110, 20 + i:45 + i] = 200
+        frame[55:110, 120 - i // 2:140 - i // 2] = 120
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def test_shard_features_use_main_run_bboxes(tmp_path):
+    video = _video(str(tmp_path / "clip.avi"))
+    shard = FeatureShard(build_shard(video, str(tmp_path / "shard.npz"), EFFECT_VARIANTS[:1]))
+
+    cap = cv2.VideoCapture(video)
+    records = list(vision_records(cap))
+    cap.release()
+    cap = cv2.VideoCapture(video)
+    frames = [cap.read()[1] for _ in records]
+    cap.release()
+
+    assert shard.n_frames == len(records) == 40
+    tables = shard.tables()
+    for k, player in enumerate(("p1", "p2")):
+        feats, prev_frame, prev_bbox = [], None, None
+        for frame, rec in zip(frames, records):
+            bbox = (rec.p1_bbox, rec.p2_bbox)[k]
+            # as bboxes de `main.run` já são (x1, y1, x2, y2) dentro do frame
+            assert 0 <= bbox[0] < bbox[2] <= frame.shape[1] and 0 <= bbox[1] < bbox[3] <= frame.shape[0]
+            feats.append(compute_state_features(frame, bbox, prev_frame, prev_bbox))
+            prev_frame, prev_bbox = frame, bbox
+        expected = stack_state_features(feats)
+        for name in FEATURE_NAMES:
+            assert np.allclose(tables[player][name], expected[name], equal_nan=True), (player, name)
+
+
+def test_corpus_aggregates_counts_across_videos(tmp_path):
+    shards, parts = [], []
+    for name, n, seed in (("a", 300, 5), ("b", 500, 6)):
+        shard, tables, hits = _shard(tmp_path, name, n, seed)
+        shards.append(shard)
+        parts.append((tables, hits, n))
+    configs = sample_configs(20, seed=3)
+
+    results, info = evaluate_corpus(shards, EFFECT, configs, workers=1)
+
+    per_video = [evaluate_configs(t, h, configs, n) for t, h, n in parts]
+    n_hits = sum(len(h) for _, h, _ in parts)
+    assert info["frames"] == 800 and info["hits"] == n_hits
+    assert [v["name"] for v in info["videos"]] == ["a", "b"]
+    for k, r in enumerate(results):
+        a, b = per_video[0][k], per_video[1][k]
+        assert r["videos"]["a"] == {"coverage": a["coverage"], "attack_rate": a["attack_rate"]}
+        assert np.isclose(r["attack_rate"], (a["attack_rate"] * 300 + b["attack_rate"] * 500) / 800)
+        assert np.isclose(r["coverage"], (a["coverage"] * len(parts[0][1]) + b["coverage"] * len(parts[1][1])) / n_hits)
+
+
+def test_corpus_partial_results_cover_finished_work(tmp_path):
+    shards = [_shard(tmp_path, name, n, seed)[0] for name, n, seed in (("a", 300, 5), ("b", 500, 6))]
+    configs = sample_configs(20, seed=3)
+
+    snapshots = list(iter_corpus_results(shards, EFFECT, configs, workers=1, batch=8))
+
+    # lotes do primeiro vídeo, depois um parcial por vídeo concluído
+    assert [len(r) for r, _ in snapshots] == [8, 16, 20, 20]
+    assert [[v["name"] for v in info["videos"]] for _, info in snapshots] == [["a"], ["a"], ["a"], ["a", "b"]]
+    only_a, _ = evaluate_corpus(shards[:1], EFFECT, configs, workers=1)
+    assert snapshots[1][0] == only_a[:16] and snapshots[2][0] == only_a
+    assert snapshots[-1] == evaluate_corpus(shards, EFFECT, configs, workers=1)
+
+
+def test_manifest_resolves_paths_and_names(tmp_path):
+    (tmp_path / "corpus.json").write_text('{"videos": ["clips/a.mp4", {"path": "b.mp4", "max_frames": 50}, "other/a.mp4"]}')
+    entries = load_manifest(str(tmp_path / "corpus.json"))
+    assert [e["name"] for e in entries] == ["a", "b", "a#2"]
+    assert entries[0]["path"] == str(tmp_path / "clips" / "a.mp4")
+    assert [e["max_frames"] for e in entries] == [None, 50, None]
+
+
+def test_shard_tables_read_only_the_requested_rows(tmp_path):
+    shard, tables, _ = _shard(tmp_path, "a", 300, seed=7)
+
+    for start, stop in ((0, 300), (40, 170), (250, 400), (300, 300)):
+        part = shard.tables(start, stop)
+        for player in ("p1", "p2"):
+            for name, column in tables[player].items():
+                assert np.array_equal(part[player][name], column[start:stop], equal_nan=True), (start, stop, player, name)
+
+
+def test_validation_folds_match_direct_evaluation(tmp_path):
+    from tools.validate_tuned_config import validate
+
+    parts = [_shard(tmp_path, name, n, seed) for name, n, seed in (("a", 300, 7), ("b", 450, 8))]
+    shards = [p[0] for p in parts]
+    grid = sample_configs(12, seed=5)
+    tuned = grid[3]
+
+    report = validate(shards, tuned, folds=3, workers=2, grid=grid)
+
+    full, _ = evaluate_corpus(shards, EFFECT, [tuned], workers=1)
+    assert report["total_frames"] == 750
+    assert np.isclose(report["score"], full[0]["score"])
+    # leave-one-video-out: o fold de teste de "b" é o vídeo "b" inteiro
+    fold_b = report["lovo"]["folds"][1]
+    direct = evaluate_configs(parts[1][1], parts[1][2], [tuned], 450)[0]
+    assert fold_b["video"] == "b"
+    assert np.isclose(fold_b["tuned"]["score"], direct["score"])
+    # retuning em "a": melhor config do grid no vídeo "a"
+    on_a = evaluate_configs(parts[0][1], parts[0][2], [tuned] + grid, 300)
+    best = sorted(on_a, key=lambda r: (-r["score"], r["attack_rate"]))[0]
+    assert np.isclose(fold_b["retuned"]["train_score"], best["score"])
+
+    kfold = report["kfold"]
+    assert [f["frames"] for f in kfold["folds"]] == [250, 250, 250]
+    scores = [f["tuned"]["score"] for f in kfold["folds"]]
+    assert np.isclose(kfold["summary"]["tuned"]["score"]["var"], np.var(scores))
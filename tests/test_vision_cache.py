@@ -0,0 +1,53 @@
+import numpy as np
+
+from models.structures import VisionRecord
+from vision.game_state import GameStateSignals, game_state_signals
+from vision.state_detection import StateDetectorConfig, classify_state, compute_state_features, detect_state
+from vision.vision_cache import VisionCache, VisionRecordColumns, vision_cache_key
+
+
+def _frames(n=4, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 255, size=(120, 160, 3), dtype=np.uint8) for _ in range(n)]
+
+
+def test_features_classify_matches_detect_state():
+    config = StateDetectorConfig(area_attack_threshold=1000, motion_thresh=1.0, mean_color_block_threshold=120)
+    frames = _frames()
+    bboxes = [(10, 20, 60, 100), (12, 10, 62, 90), (40, 10, 90, 90), (40, 10, 40, 90)]
+    prev_frame = prev_bbox = None
+    for frame, bbox in zip(frames, bboxes):
+        feats = compute_state_features(frame, bbox, prev_frame, prev_bbox)
+        assert classify_state(feats, config) == detect_state(frame, bbox, prev_frame, prev_bbox, config)
+        prev_frame, prev_bbox = frame, bbox
+
+
+def test_vision_cache_roundtrip(tmp_path):
+    frames = _frames(3)
+    cols = VisionRecordColumns()
+    records = []
+    prev = None
+    for i, frame in enumerate(frames):
+        rec = VisionRecord(
+            frame_id=i,
+            p1_bbox=(10, 20, 60, 100),
+            p2_bbox=(80, 20, 130, 100),
+            p1_features=compute_state_features(frame, (10, 20, 60, 100), prev, (10, 20, 60, 100) if prev is not None else None),
+            p2_features=compute_state_features(frame, (80, 20, 80, 100)),
+            effect_mads=[None, 12.5] if i else [None, None],
+            game_signals=game_state_signals(frame, prev),
+        )
+        cols.append(rec)
+        records.append(rec)
+        prev = frame
+
+    cache = VisionCache(str(tmp_path))
+    key = vision_cache_key("ab" * 32, {"detector": "auto"})
+    assert cache.load(key) is None
+    cache.save(key, cols, {"fps": 30.0})
+
+    meta, loaded = cache.load(key)
+    assert meta == {"fps": 30.0}
+    # NaN (sem bbox anterior) não é igual a si mesmo: compara pelo repr
+    assert [repr(r) for r in loaded] == [repr(r) for r in records]
+    assert records[0].game_signals == GameStateSignals(overlay_ratio=records[0].game_signals.overlay_ratio, pixels=120 * 160)
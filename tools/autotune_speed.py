@@ -0,0 +1,241 @@
+"""Autotuner dos knobs de velocidade do estágio de visão (`vision.speed_profile`).
+
+Roda uma passada de referência com o perfil de qualidade máxima sobre um
+trecho do vídeo (até `--max-frames`) e depois procura, knob a knob (busca por
+coordenadas, na ordem de `SEARCH_SPACE`), o valor mais rápido cujos eventos e
+janelas de frame-data ficam dentro do orçamento de discordância (`--budget`)
+em relação à referência. Cada knob parte do melhor perfil encontrado até
+então, então o custo é uma passada por valor candidato, não o produto de
+todos os knobs.
+
+Discordância (de 0 a 1) = itens sem par no outro lado / total de itens dos
+dois lados:
+
+- eventos: mesmo `(type, attacker)` com `frame_id` a até `TOLERANCE` frames;
+- janelas: mesmo `(attacker, on_block_adv)` com `start` a até `TOLERANCE` frames.
+
+A análise (thresholds de estado e efeitos) é a mesma de `main.run`; só o
+estágio de visão é cronometrado (decodificação incluída). Cada candidato é
+medido `--repeat` vezes e vale o menor tempo.
+
+Gera o perfil em `output/profiles/<nome>.json` (carregável com
+`main.run(profile=<nome>)`) e o relatório `output/speed_tuning_report.json`
+com todas as passadas.
+
+Uso: python tools/autotune_speed.py [--video match.mp4] [--budget 0.05] [--name fast]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from dataclasses import replace
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import cv2
+
+from analysis.frame_analysis import EFFECTS_MEAN_DIFF_THRESH, AnalysisConfig, FrameAnalysis
+from main import vision_records
+from vision.speed_profile import PROFILE_DIR, SpeedProfile, save_speed_profile
+from vision.state_detection import load_state_config
+from vision.tracker import tracker_factory
+
+VIDEO = "match.mp4"
+MAX_FRAMES = 600
+BUDGET = 0.05
+TOLERANCE = 2
+REPEAT = 1
+PROFILE_NAME = "fast"
+REPORT = "output/speed_tuning_report.json"
+
+# valores candidatos por knob; o valor do perfil de referência é sempre incluído
+SEARCH_SPACE = {
+    "scale": [0.5, 0.75],
+    "tracker": ["none", "mosse", "kcf", "mil"],
+    "track_every": [2, 3, 4],
+    "game_state_every": [2, 4, 8],
+    "effects_roi_pad": [0, 4, 8],
+}
+
+
+def vision_pass(video, profile, max_frames=MAX_FRAMES):
+    """`(records, segundos, fps do vídeo)` do estágio de visão com `profile` nos primeiros `max_frames` frames."""
+
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise SystemExit(f"Cannot open video {video}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 60.0
+        t0 = time.perf_counter()
+        records = list(itertools.islice(vision_records(cap, profile=profile), max_frames or None))
+        seconds = time.perf_counter() - t0
+    finally:
+        cap.release()
+    return records, seconds, fps
+
+
+def analyze(records, fps, config=None):
+    """Eventos e janelas de frame-data de `records` (mesma análise de `main.run`)."""
+
+    analysis = FrameAnalysis(config, fps)
+    events = []
+    for rec in records:
+        _, frame_events, _ = analysis.step(rec)
+        events.extend(frame_events)
+    analysis.flush()
+    return events, analysis.result()["frame_data"]["windows"]
+
+
+def disagreement(reference, candidate, tolerance=TOLERANCE):
+    """Fração de itens `(chave, frame)` sem par no outro lado (mesma chave, frames a até `tolerance`).
+
+    Pareamento guloso por chave, em ordem de frame. 0.0 = idênticos (ou ambos vazios).
+    """
+
+    ref, cand = defaultdict(list), defaultdict(list)
+    for key, frame in reference:
+        ref[key].append(frame)
+    for key, frame in candidate:
+        cand[key].append(frame)
+
+    matched = 0
+    for key in ref.keys() & cand.keys():
+        a, b = sorted(ref[key]), sorted(cand[key])
+        i = j = 0
+        while i < len(a) and j < len(b):
+            if abs(a[i] - b[j]) <= tolerance:
+                matched += 1
+                i += 1
+                j += 1
+            elif a[i] < b[j]:
+                i += 1
+            else:
+                j += 1
+
+    total = len(reference) + len(candidate)
+    return (total - 2 * matched) / total if total else 0.0
+
+
+def event_items(events):
+    return [((e.type, e.attacker), e.frame_id) for e in events]
+
+
+def window_items(windows):
+    return [((w.get("attacker"), w.get("on_block_adv")), w["start"]) for w in windows]
+
+
+class SpeedAutotuner:
+    """
+    Mede perfis contra a passada de referência.
+
+    Uso:
+      tuner = SpeedAutotuner(video, max_frames, budget)
+      best, trial = tuner.search(SEARCH_SPACE)
+      tuner.trials  # uma entrada por perfil medido
+    """
+
+    def __init__(self, video, max_frames=MAX_FRAMES, budget=BUDGET, tolerance=TOLERANCE, repeat=REPEAT, reference=None):
+        self.video = video
+        self.max_frames = max_frames
+        self.budget = budget
+        self.tolerance = tolerance
+        self.repeat = max(1, repeat)
+        self.config = AnalysisConfig(state=load_state_config(), effects_mean_diff_thresh=EFFECTS_MEAN_DIFF_THRESH)
+        self.trials = []
+        self._measured = {}
+
+        self.reference = reference or SpeedProfile(name="reference")
+        self.baseline = self.measure(self.reference, _reference=True)
+
+    def _timed_pass(self, profile):
+        best = None
+        for _ in range(self.repeat):
+            records, seconds, fps = vision_pass(self.video, profile, self.max_frames)
+            if best is None or seconds < best[1]:
+                best = (records, seconds, fps)
+        return best
+
+    def measure(self, profile, _reference=False):
+        """Throughput e discordância de `profile` (memoizado pelos knobs)."""
+
+        key = json.dumps(profile.knobs(), sort_keys=True)
+        if key in self._measured:
+            return self._measured[key]
+
+        records, seconds, fps = self._timed_pass(profile)
+        events, windows = analyze(records, fps, self.config)
+        trial = {
+            "profile": profile.knobs(),
+            "frames": len(records),
+            "seconds": seconds,
+            "fps": len(records) / seconds if seconds > 0 else 0.0,
+            "events": len(events),
+            "windows": len(windows),
+        }
+        if _reference:
+            self._ref_events, self._ref_windows = event_items(events), window_items(windows)
+            trial.update(event_disagreement=0.0, window_disagreement=0.0, within_budget=True, speedup=1.0)
+        else:
+            trial["event_disagreement"] = disagreement(self._ref_events, event_items(events), self.tolerance)
+            trial["window_disagreement"] = disagreement(self._ref_windows, window_items(windows), self.tolerance)
+            trial["within_budget"] = max(trial["event_disagreement"], trial["window_disagreement"]) <= self.budget
+            trial["speedup"] = self.baseline["seconds"] / seconds if seconds > 0 else float("inf")
+        self.trials.append(trial)
+        self._measured[key] = trial
+        return trial
+
+    def search(self, space=SEARCH_SPACE, name=PROFILE_NAME):
+        """Busca por coordenadas: para cada knob, o valor mais rápido dentro do orçamento."""
+
+        best = replace(self.reference, name=name)
+        best_trial = self.baseline
+        for knob, values in space.items():
+            for value in values:
+                if knob == "tracker" and value != "none" and tracker_factory(value) is None:
+                    print(f"tracker={value!r}: not available in this OpenCV build, skipped")
+                    continue
+                candidate = replace(best, **{knob: value})
+                trial = self.measure(candidate)
+                print(f"{knob}={value!r}: {trial['fps']:.1f} fps, events {trial['event_disagreement']:.3f}, "
+                      f"windows {trial['window_disagreement']:.3f}{'' if trial['within_budget'] else '  (over budget)'}")
+                if trial["within_budget"] and trial["seconds"] < best_trial["seconds"]:
+                    best, best_trial = candidate, trial
+        return best, best_trial
+
+
+def main(video=VIDEO, max_frames=MAX_FRAMES, budget=BUDGET, name=PROFILE_NAME, repeat=REPEAT, profile_dir=PROFILE_DIR):
+    tuner = SpeedAutotuner(video, max_frames=max_frames, budget=budget, repeat=repeat)
+    base = tuner.baseline
+    print(f"reference: {base['frames']} frames, {base['fps']:.1f} fps, {base['events']} events, {base['windows']} windows")
+
+    best, trial = tuner.search(SEARCH_SPACE, name=name)
+    path = save_speed_profile(best, profile_dir, extra={"tuning": {
+        "video": video, "frames": trial["frames"], "budget": budget, "tolerance": tuner.tolerance,
+        "fps": trial["fps"], "reference_fps": base["fps"], "speedup": trial["speedup"],
+        "event_disagreement": trial["event_disagreement"], "window_disagreement": trial["window_disagreement"],
+    }})
+
+    os.makedirs(os.path.dirname(REPORT), exist_ok=True)
+    with open(REPORT, "w", encoding="utf-8") as f:
+        json.dump({"video": video, "budget": budget, "tolerance": tuner.tolerance, "reference": base,
+                   "best": {"profile": best.to_dict(), **trial}, "trials": tuner.trials}, f, indent=2)
+
+    print(f"best: {best.knobs()} -> {trial['fps']:.1f} fps ({trial['speedup']:.2f}x)")
+    print(f"Profile saved to {path}; report saved to {REPORT}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--video", default=VIDEO)
+    parser.add_argument("--max-frames", type=int, default=MAX_FRAMES, help="0 = vídeo inteiro")
+    parser.add_argument("--budget", type=float, default=BUDGET, help="discordância máxima (0-1) de eventos e janelas")
+    parser.add_argument("--name", default=PROFILE_NAME, help="nome do perfil gerado")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="passadas por perfil (vale o menor tempo)")
+    args = parser.parse_args()
+    main(video=args.video, max_frames=args.max_frames, budget=args.budget, name=args.name, repeat=args.repeat)
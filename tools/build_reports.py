@@ -0,0 +1,49 @@
+"""Gera todos os relatórios de pós-processamento com uma única leitura.
+
+Carrega `output/results.json` uma vez e produz, em memória, o punish report,
+o resumo por segmento e o gráfico (`analysis.reports.build_reports`), sem
+arquivos intermediários relidos e sem reabrir o vídeo. Sem `results.json`, ou
+com um mais antigo que `output/timeline.sf6t`, os resultados são recalculados
+da timeline (`analysis.reports.load_run_results`).
+
+Uso: python tools/build_reports.py [segment_seconds]
+"""
+
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from analysis.reports import SEGMENT_SECONDS, build_reports, load_run_results
+
+RESULTS = os.path.join(ROOT, "output", "results.json")
+TIMELINE = os.path.join(ROOT, "output", "timeline.sf6t")
+OUT_DIR = os.path.join(ROOT, "output")
+
+
+def main(segment_seconds=SEGMENT_SECONDS):
+    res = load_run_results(RESULTS, TIMELINE)
+    if res is None:
+        print("No results.json or timeline found at", RESULTS, TIMELINE)
+        return
+    if "recomputed_from" in res:
+        print("results.json missing or older than the timeline; recomputed from", TIMELINE)
+
+    if "metadata" not in res:
+        print("results.json has no run metadata; times will be empty (re-run main.run)")
+
+    written = build_reports(res, OUT_DIR, segment_seconds)
+    for name, path in written.items():
+        print(f"{name}: {path}")
+
+
+if __name__ == '__main__':
+    seg = SEGMENT_SECONDS
+    if len(sys.argv) > 1:
+        try:
+            seg = int(sys.argv[1])
+        except Exception:
+            pass
+    main(seg)
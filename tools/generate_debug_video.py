@@ -5,212 +5,555 @@ O vídeo contém:
 - bounding boxes dos jogadores
 - estado detectado (`p1:...`, `p2:...`)
 - indicação de hitspark (círculo e label) quando detectado
+- janelas de whiff/punish do frame-data e barras de vida
 
 Use este arquivo para validar visualmente falsos-positivos ou posicionamento
 de bboxes e para ajustar parâmetros dos detectores.
+
+Bboxes, estados, vida e hits vêm da timeline gravada por `main.run`
+(`output/timeline.sf6t`); as janelas de whiff vêm de `output/results.json`
+(recalculadas da timeline se ele faltar ou for mais antigo que ela).
+Nada é re-detectado: o plano de overlay é pré-computado (`WhiffIndex` varre as
+janelas ordenadas por início/fim junto com os frames) e o desenho e a
+codificação (`VideoWriter`) rodam numa thread de escrita em segundo plano
+(`BackgroundWriter`), enquanto a thread principal só decodifica.
+
+Com `--events`, só os frames em volta de whiffs, pulos puníveis e drive
+impacts (punish report + frame-data) são renderizados: cada evento vira um
+intervalo com `--pad` frames de margem, intervalos sobrepostos são unidos e o
+vídeo é posicionado (seek) no início de cada um. Os intervalos vão
+concatenados num arquivo ou, com `--clips`, um arquivo por intervalo mais um
+`index.json`.
+
+Com `--workers N`, o render completo é dividido em N segmentos contíguos,
+cada um renderizado num processo que posiciona o vídeo no início do segmento;
+os segmentos saem no codec final e o ffmpeg os concatena em ordem sem
+re-codificar. Sem ffmpeg no PATH, o render é sequencial (com um aviso). Todo
+o estado do overlay vem da timeline ou do `WhiffIndex`, que se reconstrói no
+início de cada segmento, então os frames desenhados são os mesmos do render
+sequencial. Com codec com perdas, a codificação do primeiro frame de cada
+segmento pode diferir da do mesmo frame no meio de um arquivo único.
+
+Uso: python tools/generate_debug_video.py [video] [saida] [--events [--clips] [--pad N]] [--workers N]
 """
 
+import argparse
+import heapq
+import json
+import multiprocessing
 import os
+import queue
+import shutil
+import signal
+import subprocess
 import sys
+import tempfile
+import threading
+
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
 import cv2
-from vision.character_detection import detect_characters
-from vision.effects_detection import detect_effects
-from vision.state_detection import detect_state, StateDetectorConfig
-from config import DAMAGE_PER_HIT
-import json
 
-# load results if present to overlay whiff/punish annotations
-RESULTS_PATH = os.path.join("output", "results.json")
-results_data = None
-if os.path.exists(RESULTS_PATH):
-    try:
-        with open(RESULTS_PATH, "r", encoding="utf-8") as rf:
-            results_data = json.load(rf)
-    except Exception:
-        results_data = None
+from analysis.reports import load_run_results, punish_report
+from analysis.timeline_file import TimelineFile
 
 VIDEO = "Match.mp4"
 OUT = "output/debug_overlay.mp4"
+RESULTS_PATH = os.path.join("output", "results.json")
+TIMELINE_PATH = os.path.join("output", "timeline.sf6t")
+CLIPS_DIR = "output/debug_clips"
+# frames decodificados aguardando a thread de escrita
+QUEUE_SIZE = 64
+# margem (frames) antes e depois de cada evento no modo `--events`
+CLIP_PAD = 60
+# lacunas menores que isso entre intervalos são lidas em vez de um seek
+SEEK_GAP = 30
+# codec dos vídeos gerados (e dos segmentos do render paralelo)
+FOURCC = "mp4v"
+
+
+class WhiffIndex:
+    """
+    Janelas de whiff ativas por frame, consultadas em ordem crescente de frame.
+
+    Reproduz a regra do overlay: entre as janelas de whiff que cobrem o frame,
+    vale a primeira na ordem de `windows`; `ordinal` é a posição (1-based) dela
+    entre os whiffs. As janelas entram num heap (chave = posição em `windows`)
+    quando `start <= frame` e saem quando `end < frame`, então cada consulta
+    custa O(log janelas ativas).
+    """
 
-# configurações padrão do detector de estado (podem ser sobrescritas pelo tuning)
-cfg = StateDetectorConfig()
-
-cap = cv2.VideoCapture(VIDEO)
-if not cap.isOpened():
-    raise SystemExit(f"Cannot open video {VIDEO}")
-
-fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-writer = cv2.VideoWriter(OUT, fourcc, fps, (w, h))
-
-ret, prev = cap.read()
-if not ret:
-    raise SystemExit("Video empty")
-
-frame_idx = 0
-print("Writing debug overlay to", OUT)
-# vida inicial (0-100)
-life_p1 = 100
-life_p2 = 100
-prev_p1_bbox = None
-prev_p2_bbox = None
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    prev_bboxes = (prev_p1_bbox, prev_p2_bbox) if (prev_p1_bbox is not None and prev_p2_bbox is not None) else None
-    bboxes = detect_characters(frame, prev, prev_bboxes)
-    if not bboxes:
-        writer.write(frame)
-        frame_idx += 1
-        prev = frame
-        continue
-
-    p1_bbox, p2_bbox = bboxes
-    # detect effects between prev and current
-    eff1 = detect_effects(frame, prev, p1_bbox, p2_bbox, mean_diff_thresh=30.0)
-    # detect states (use previous bbox for motion comparisons)
-    s1 = detect_state(frame, p1_bbox, prev, prev_p1_bbox, config=cfg)
-    s2 = detect_state(frame, p2_bbox, prev, prev_p2_bbox, config=cfg)
-
-    out = frame.copy()
-    # draw bboxes
-    def draw_bbox(img, box, color, label=None):
-        # expect box as (x1,y1,x2,y2)
-        x1, y1, x2, y2 = map(int, box)
-        cv2.rectangle(img, (x1, y1), (x2, y2), color, 2)
-        if label:
-            # draw label inside the bbox at top-left corner
-            cv2.rectangle(img, (x1, y1), (x1 + 120, y1 + 20), color, -1)
-            cv2.putText(img, label, (x1 + 4, y1 + 15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
-
-    draw_bbox(out, p1_bbox, (0, 200, 0), f"p1:{s1}")
-    draw_bbox(out, p2_bbox, (0, 0, 200), f"p2:{s2}")
-
-    if eff1:
-        # mark center with a small circle
-        x1, y1, x2, y2 = map(int, p1_bbox)
-        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-        cv2.circle(out, (cx, cy), 8, (0, 255, 255), -1)
-        cv2.putText(out, f"hitspark", (cx + 10, cy), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
-        # reduce life based on detected hits
-        try:
-            for e in eff1:
-                t = e.get("target")
-                if t == "p2":
-                    life_p2 = max(0, life_p2 - DAMAGE_PER_HIT)
-                elif t == "p1":
-                    life_p1 = max(0, life_p1 - DAMAGE_PER_HIT)
-        except Exception:
-            pass
-
-    # overlay whiff/punish markers if results.json is available
-    if results_data:
-        windows = results_data.get("frame_data", {}).get("windows", [])
-        # total whiff count for legend
-        total_whiffs = sum(1 for w in windows if w.get("whiff"))
-        # find index of current whiff window (1-based)
+    def __init__(self, windows):
+        whiffs = [w for w in windows if w.get("whiff")]
+        self.total = len(whiffs)
+        # (start, ordinal, janela) ordenado por início
+        self._pending = sorted(((w["start"], k + 1, w) for k, w in enumerate(whiffs)), key=lambda item: item[0])
+        self._next = 0
+        self._active = []
+        self._last = None
+
+    def at(self, frame):
+        """`(ordinal, janela)` ativa em `frame`, ou None. `frame` não pode decrescer."""
+
+        if self._last is not None and frame < self._last:
+            raise ValueError("WhiffIndex.at() frames must be non-decreasing")
+        self._last = frame
+        while self._next < len(self._pending) and self._pending[self._next][0] <= frame:
+            _, ordinal, win = self._pending[self._next]
+            heapq.heappush(self._active, (ordinal, win["end"], win))
+            self._next += 1
+        # remove (preguiçosamente) as janelas que já terminaram
+        while self._active and self._active[0][1] < frame:
+            heapq.heappop(self._active)
+        if not self._active:
+            return None
+        ordinal, _, win = self._active[0]
+        return ordinal, win
+
+
+def _draw_bbox(img, box, color, label=None):
+    # expect box as (x1,y1,x2,y2)
+    x1, y1, x2, y2 = map(int, box)
+    cv2.rectangle(img, (x1, y1), (x2, y2), color, 2)
+    if label:
+        # draw label inside the bbox at top-left corner
+        cv2.rectangle(img, (x1, y1), (x1 + 120, y1 + 20), color, -1)
+        cv2.putText(img, label, (x1 + 4, y1 + 15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2)
+
+
+def _draw_life_bar(img, life, left=True):
+    # life: 0-100
+    h, w = img.shape[:2]
+    bar_w = int(w * 0.3)
+    bar_h = 18
+    margin = 10
+    pct = max(0, min(100, life))
+    fill_w = int(bar_w * (pct / 100.0))
+    y0 = margin
+    y1 = y0 + bar_h
+    if left:
+        x0 = margin
+        x1 = x0 + bar_w
+        cv2.rectangle(img, (x0, y0), (x1, y1), (50, 50, 50), -1)
+        cv2.rectangle(img, (x0, y0), (x0 + fill_w, y1), (0, 200, 0), -1)
+        cv2.putText(img, f"P1: {pct}%", (x0 + 4, y0 + bar_h - 2), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    else:
+        x1 = w - margin
+        x0 = x1 - bar_w
+        cv2.rectangle(img, (x0, y0), (x1, y1), (50, 50, 50), -1)
+        cv2.rectangle(img, (x1 - fill_w, y0), (x1, y1), (0, 0, 200), -1)
+        cv2.putText(img, f"P2: {pct}%", (x0 + 4, y0 + bar_h - 2), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+
+def draw_overlay(frame, frame_idx, data, whiff=None, total_whiffs=None, mode=None):
+    """Desenha os overlays de um frame (in-place) a partir do `FrameData` da execução."""
+
+    out = frame
+    h = out.shape[0]
+    p1_bbox, p2_bbox = data.p1_bbox, data.p2_bbox
+    if p1_bbox is not None:
+        _draw_bbox(out, p1_bbox, (0, 200, 0), f"p1:{data.p1_state}")
+    if p2_bbox is not None:
+        _draw_bbox(out, p2_bbox, (0, 0, 200), f"p2:{data.p2_state}")
+
+    # hitspark: o alvo do hit recebe a ação "hit" na análise
+    for action, bbox in ((data.p1_action, p1_bbox), (data.p2_action, p2_bbox)):
+        if action == "hit" and bbox is not None:
+            x1, y1, x2, y2 = map(int, bbox)
+            cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
+            cv2.circle(out, (cx, cy), 8, (0, 255, 255), -1)
+            cv2.putText(out, "hitspark", (cx + 10, cy), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+
+    if total_whiffs is not None:
         cur_whiff_index = None
-        # find whiff windows covering this frame
-        for idx, win in enumerate(windows):
-            if win.get("whiff") and win.get("start") <= frame_idx <= win.get("end"):
-                cur_whiff_index = sum(1 for w in windows[:idx+1] if w.get("whiff"))
-                # draw a prominent red label
-                cv2.putText(out, "WHIFF", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 3)
-                if win.get("punishable"):
-                    cv2.putText(out, "PUNISHABLE", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 255), 3)
-
-                # highlight attacker bbox for visibility
-                attacker = win.get("attacker")
-                if attacker == "p1":
-                    color = (0, 0, 255)
-                    bbox = p1_bbox
-                    target_bbox = p2_bbox
-                else:
-                    color = (0, 0, 255)
-                    bbox = p2_bbox
-                    target_bbox = p1_bbox
-
-                try:
-                    x1, y1, x2, y2 = map(int, bbox)
-                    cv2.rectangle(out, (x1, y1), (x2, y2), color, 4)
-                    cv2.putText(out, f"WHIFF->{attacker}", (x1, max(20, y1 - 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 3)
-                except Exception:
-                    pass
-
-                # mark target center with a circle
-                try:
-                    tx1, ty1, tx2, ty2 = map(int, target_bbox)
-                    tcx, tcy = (tx1 + tx2) // 2, (ty1 + ty2) // 2
-                    cv2.circle(out, (tcx, tcy), 12, (255, 0, 0), -1)
-                except Exception:
-                    pass
+        if whiff is not None:
+            cur_whiff_index, win = whiff
+            # draw a prominent red label
+            cv2.putText(out, "WHIFF", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 3)
+            if win.get("punishable"):
+                cv2.putText(out, "PUNISHABLE", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 255), 3)
 
-                break
+            # highlight attacker bbox and mark target center
+            attacker = win.get("attacker")
+            bbox, target_bbox = (p1_bbox, p2_bbox) if attacker == "p1" else (p2_bbox, p1_bbox)
+            if bbox is not None:
+                x1, y1, x2, y2 = map(int, bbox)
+                cv2.rectangle(out, (x1, y1), (x2, y2), (0, 0, 255), 4)
+                cv2.putText(out, f"WHIFF->{attacker}", (x1, max(20, y1 - 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 3)
+            if target_bbox is not None:
+                tx1, ty1, tx2, ty2 = map(int, target_bbox)
+                cv2.circle(out, ((tx1 + tx2) // 2, (ty1 + ty2) // 2), 12, (255, 0, 0), -1)
 
-        # draw legend with total whiffs and current whiff index
+        # legend with total whiffs, current whiff index and tracker mode
         legend_text = f"Whiffs: {total_whiffs}"
         if cur_whiff_index is not None:
             legend_text += f" (current {cur_whiff_index})"
-        # tracker mode: prefer CSRT if manager has active trackers
-        try:
-            from vision.tracker import get_manager
-
-            mgr = get_manager()
-            tracker_active = mgr.trackers.get("p1") is not None or mgr.trackers.get("p2") is not None
-            mode = "CSRT" if tracker_active else "TEMPLATE"
-        except Exception:
-            mode = "TEMPLATE"
-
-        legend_text += f"  |  Mode: {mode}"
-        # draw background for legend
+        if mode:
+            legend_text += f"  |  Mode: {mode}"
         cv2.rectangle(out, (8, 82), (8 + 380, 82 + 26), (30, 30, 30), -1)
         cv2.putText(out, legend_text, (10, 100), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
 
     # overlay frame index
     cv2.putText(out, f"frame:{frame_idx}", (10, h - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
 
-    # draw life bars and percentages
-    def draw_life_bar(img, life, left=True):
-        # life: 0-100
-        bar_w = int(w * 0.3)
-        bar_h = 18
-        margin = 10
-        pct = max(0, min(100, life))
-        fill_w = int(bar_w * (pct / 100.0))
-        if left:
-            x0 = margin
-            y0 = margin
-            x1 = x0 + bar_w
-            y1 = y0 + bar_h
-            cv2.rectangle(img, (x0, y0), (x1, y1), (50, 50, 50), -1)
-            cv2.rectangle(img, (x0, y0), (x0 + fill_w, y1), (0, 200, 0), -1)
-            cv2.putText(img, f"P1: {pct}%", (x0 + 4, y0 + bar_h - 2), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    _draw_life_bar(out, data.life_p1, left=True)
+    _draw_life_bar(out, data.life_p2, left=False)
+    return out
+
+
+class BackgroundWriter:
+    """
+    `VideoWriter` numa thread própria: `write(item)` enfileira (fila limitada) e
+    a thread aplica `render(item) -> frame` e codifica, na ordem de chegada.
+
+    Uso:
+      with BackgroundWriter(path, fps, (w, h), render) as writer:
+          writer.write(item)
+
+    Um erro na thread de escrita é relançado no próximo `write`/`close`.
+    """
+
+    def __init__(self, path, fps, size, render=None, fourcc=FOURCC, maxsize=QUEUE_SIZE):
+        self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+        if not self._writer.isOpened():
+            raise SystemExit(f"Cannot open video writer {path}")
+        self._render = render or (lambda item: item)
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._error = None
+        self.frames_written = 0
+        self._thread = threading.Thread(target=self._run, name="debug-video-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self._error is not None:
+                # drena a fila para não bloquear o produtor
+                continue
+            try:
+                self._writer.write(self._render(item))
+                self.frames_written += 1
+            except BaseException as exc:
+                self._error = exc
+
+    def _raise(self):
+        if self._error is not None:
+            raise self._error
+
+    def write(self, item):
+        self._raise()
+        self._queue.put(item)
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            self._writer.release()
+        self._raise()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_results(path=RESULTS_PATH, timeline_path=TIMELINE_PATH):
+    """Resultados da execução (`analysis.reports.load_run_results`); None sem `results.json` nem timeline."""
+
+    return load_run_results(path, timeline_path)
+
+
+def event_targets(results):
+    """Eventos a inspecionar: linhas do punish report (whiffs, pulos) e drive impacts.
+
+    Cada item é `{"type", "player", "start", "end"}` (frames, `end` inclusivo).
+    """
+
+    targets = [
+        {"type": row["type"], "player": row["player"], "start": row["start_frame"], "end": row["end_frame"]}
+        for row in punish_report(results)["rows"]
+        if row["start_frame"] is not None
+    ]
+    for d in results.get("frame_data", {}).get("summary", {}).get("drive_impacts", []):
+        targets.append({"type": "drive_impact", "player": d.get("attacker"), "start": d["frame_id"], "end": d["frame_id"]})
+    return targets
+
+
+def clip_intervals(targets, pad=CLIP_PAD, n_frames=None):
+    """Intervalos `[start, stop)` com `pad` frames de margem, unindo os que se sobrepõem.
+
+    Retorna `[{"start", "stop", "events": [...]}]` ordenado por início; cada
+    evento fica no intervalo que o contém. `n_frames` limita o fim ao vídeo.
+    """
+
+    intervals = []
+    for t in sorted(targets, key=lambda t: (t["start"], t["end"])):
+        start = max(0, t["start"] - pad)
+        stop = t["end"] + pad + 1
+        if n_frames is not None:
+            stop = min(stop, n_frames)
+        if start >= stop:
+            continue
+        if intervals and start <= intervals[-1]["stop"]:
+            last = intervals[-1]
+            last["stop"] = max(last["stop"], stop)
+            last["events"].append(t)
+        else:
+            intervals.append({"start": start, "stop": stop, "events": [t]})
+    return intervals
+
+
+def read_intervals(cap, intervals, seek_gap=SEEK_GAP):
+    """`(frame_idx, frame)` dos frames de `intervals` (ordenados), posicionando o vídeo em cada um.
+
+    Lacunas de até `seek_gap` frames são puladas lendo (mais barato que um seek,
+    que recomeça no keyframe anterior). `stop=None` lê até o fim do vídeo.
+    """
+
+    pos = 0
+    for interval in intervals:
+        start, stop = interval["start"], interval["stop"]
+        if start < pos or start - pos > seek_gap:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
         else:
-            x1 = w - margin
-            y0 = margin
-            x0 = x1 - bar_w
-            y1 = y0 + bar_h
-            cv2.rectangle(img, (x0, y0), (x1, y1), (50, 50, 50), -1)
-            cv2.rectangle(img, (x1 - fill_w, y0), (x1, y1), (0, 0, 200), -1)
-            cv2.putText(img, f"P2: {pct}%", (x0 + 4, y0 + bar_h - 2), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-    draw_life_bar(out, life_p1, left=True)
-    draw_life_bar(out, life_p2, left=False)
-
-    writer.write(out)
-    frame_idx += 1
-    prev = frame
-    prev_p1_bbox = p1_bbox
-    prev_p2_bbox = p2_bbox
-
-cap.release()
-writer.release()
-print("Debug video written:", OUT)
+            for _ in range(start - pos):
+                cap.grab()
+        pos = start
+        while stop is None or pos < stop:
+            ret, frame = cap.read()
+            if not ret:
+                return
+            yield pos, frame
+            pos += 1
+
+
+def _overlay_renderer(timeline, windows, fps):
+    arrays = timeline.arrays
+    first_frame = int(arrays.frame_id[0]) if len(arrays) else 0
+    whiffs = WhiffIndex(windows) if windows is not None else None
+    # backend que a execução usou de fato (CSRT, ..., ou TEMPLATE sem o tracker do OpenCV)
+    tracker = timeline.metadata.get("tracker")
+    mode = tracker.upper() if tracker else None
+
+    def render(item):
+        frame_idx, frame = item
+        row = frame_idx - first_frame
+        if not 0 <= row < len(arrays):
+            # frame fora da timeline (execução parcial): vai sem overlay
+            return frame
+        whiff = whiffs.at(frame_idx) if whiffs is not None else None
+        return draw_overlay(frame, frame_idx, arrays.frame(row, fps), whiff,
+                            whiffs.total if whiffs is not None else None, mode)
+
+    return render
+
+
+def segment_bounds(n_frames, segments):
+    """`segments` intervalos contíguos `{"start", "stop"}` cobrindo o vídeo; o último vai até o fim."""
+
+    segments = max(1, min(segments, n_frames or 1))
+    step = -(-(n_frames or 0) // segments)
+    bounds = [{"start": k * step, "stop": (k + 1) * step} for k in range(segments) if k * step < (n_frames or 1)]
+    # CAP_PROP_FRAME_COUNT é estimado em alguns containers: o último segmento lê até o EOF
+    bounds[-1]["stop"] = None
+    return bounds
+
+
+def _ffmpeg():
+    return shutil.which("ffmpeg")
+
+
+# estado de cada worker do pool (preenchido por `_init_worker`)
+_worker = {}
+
+
+def _load_worker(video, timeline_path, windows, fourcc):
+    _worker.update(video=video, timeline_path=timeline_path, windows=windows, fourcc=fourcc)
+
+
+def _init_worker(*args):
+    # Ctrl+C é tratado pelo processo pai, que encerra o pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _load_worker(*args)
+
+
+def _render_segment(task):
+    """Renderiza um segmento em `path`: posiciona o vídeo no início e aquece o índice de whiffs lá."""
+
+    segment, path = task
+    cap = cv2.VideoCapture(_worker["video"])
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        # renderer novo por segmento: `WhiffIndex` começa vazio e a primeira
+        # consulta já considera as janelas abertas antes do início do segmento
+        render = _overlay_renderer(TimelineFile(_worker["timeline_path"]), _worker["windows"], fps)
+        with BackgroundWriter(path, fps, size, render, fourcc=_worker["fourcc"]) as writer:
+            for item in read_intervals(cap, [segment]):
+                writer.write(item)
+        return path, writer.frames_written
+    finally:
+        cap.release()
+
+
+def concat_segments(paths, out, ffmpeg):
+    """Concatena os segmentos em ordem com o ffmpeg (cópia de stream, sem re-codificar)."""
+
+    list_path = out + ".segments.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for p in paths:
+            f.write(f"file '{os.path.abspath(p)}'\n")
+    try:
+        subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", out],
+                       check=True)
+    finally:
+        os.remove(list_path)
+
+
+def render_parallel(video, out, timeline_path, windows, n_frames, fps, size, workers, fourcc=FOURCC):
+    """Render completo em `workers` segmentos paralelos, concatenados em ordem em `out`.
+
+    Os segmentos já saem no codec final (`fourcc`, no container de `out`) e o
+    ffmpeg os concatena sem re-codificar, então os temporários ocupam o mesmo
+    que `out` e nenhuma etapa é serial. Exige ffmpeg (ver `main`).
+    """
+
+    ffmpeg = _ffmpeg()
+    if not ffmpeg:
+        raise RuntimeError("render_parallel needs ffmpeg on PATH to concatenate the segments")
+    ext = os.path.splitext(out)[1] or ".mp4"
+    segments = segment_bounds(n_frames, workers)
+    tmp_dir = tempfile.mkdtemp(prefix="debug-segments-", dir=os.path.dirname(out) or ".")
+    tasks = [(seg, os.path.join(tmp_dir, f"segment-{k:03d}{ext}")) for k, seg in enumerate(segments)]
+    initargs = (video, timeline_path, windows, fourcc)
+    try:
+        if len(tasks) == 1:
+            _load_worker(*initargs)
+            done = [_render_segment(tasks[0])]
+        else:
+            pool = multiprocessing.Pool(len(tasks), initializer=_init_worker, initargs=initargs)
+            try:
+                done = pool.map(_render_segment, tasks, chunksize=1)
+                pool.close()
+            except BaseException:
+                pool.terminate()
+                raise
+            finally:
+                pool.join()
+        concat_segments([p for p, _ in done], out, ffmpeg)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return sum(n for _, n in done)
+
+
+def main(video=VIDEO, out=OUT, timeline_path=TIMELINE_PATH, results_path=RESULTS_PATH,
+         events=False, clips=False, pad=CLIP_PAD, workers=1, fourcc=FOURCC):
+    """Renderiza o vídeo inteiro, ou (`events=True`) só os intervalos em volta dos eventos.
+
+    O render completo com `workers > 1` é dividido em segmentos renderizados
+    em paralelo (`render_parallel`); sem ffmpeg para concatená-los, cai no
+    render sequencial. `fourcc` é o codec dos arquivos gerados.
+
+    Com `clips=True` cada intervalo vira um arquivo em `out` (diretório) e
+    `out/index.json` lista intervalos, eventos e arquivos; senão os intervalos
+    são concatenados em `out`.
+    """
+
+    if not os.path.exists(timeline_path):
+        raise SystemExit(f"{timeline_path} not found: run main.run on {video} first")
+    timeline = TimelineFile(timeline_path)
+    results = load_results(results_path, timeline_path)
+    windows = results.get("frame_data", {}).get("windows", []) if results is not None else None
+
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise SystemExit(f"Cannot open video {video}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    n_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+    render = _overlay_renderer(timeline, windows, fps)
+
+    if not events and workers > 1 and not _ffmpeg():
+        print(f"Warning: ffmpeg not found on PATH; rendering sequentially instead of with {workers} workers")
+        workers = 1
+
+    if not events and workers > 1:
+        cap.release()
+        print(f"Writing debug overlay to {out} ({workers} workers)")
+        os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+        written = render_parallel(video, out, timeline_path, windows, n_frames, fps, (w, h), workers, fourcc)
+        print("Debug video written:", out)
+        return written
+
+    if not events:
+        print("Writing debug overlay to", out)
+        os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+        frame_idx = 0
+        with BackgroundWriter(out, fps, (w, h), render, fourcc=fourcc) as writer:
+            try:
+                while True:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    writer.write((frame_idx, frame))
+                    frame_idx += 1
+            finally:
+                cap.release()
+        print("Debug video written:", out)
+        return frame_idx
+
+    if results is None:
+        raise SystemExit(f"{results_path} not found: event clips need the run's results")
+    intervals = clip_intervals(event_targets(results), pad=pad, n_frames=n_frames)
+    total = sum(i["stop"] - i["start"] for i in intervals)
+    print(f"{len(intervals)} intervals, {total} frames" + (f" of {n_frames}" if n_frames else ""))
+
+    try:
+        if not clips:
+            os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+            with BackgroundWriter(out, fps, (w, h), render, fourcc=fourcc) as writer:
+                for item in read_intervals(cap, intervals):
+                    writer.write(item)
+            print("Debug clips written:", out)
+            return total
+
+        os.makedirs(out, exist_ok=True)
+        frames = read_intervals(cap, intervals)
+        for k, interval in enumerate(intervals):
+            interval["path"] = os.path.join(out, f"clip-{k:03d}-{interval['start']}-{interval['stop']}.mp4")
+            interval["start_time"] = interval["start"] / fps
+            interval["end_time"] = interval["stop"] / fps
+            with BackgroundWriter(interval["path"], fps, (w, h), render, fourcc=fourcc) as writer:
+                for _ in range(interval["stop"] - interval["start"]):
+                    item = next(frames, None)
+                    if item is None:
+                        break
+                    writer.write(item)
+    finally:
+        cap.release()
+
+    index_path = os.path.join(out, "index.json")
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump({"video": video, "fps": fps, "pad": pad, "clips": intervals}, f, indent=2)
+    print(f"{len(intervals)} debug clips written to {out} (index: {index_path})")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("video", nargs="?", default=VIDEO)
+    parser.add_argument("out", nargs="?", help=f"padrão: {OUT} (ou {CLIPS_DIR} com --clips)")
+    parser.add_argument("--events", action="store_true", help="só os frames em volta de whiffs, pulos e drive impacts")
+    parser.add_argument("--clips", action="store_true", help="com --events: um arquivo por intervalo + index.json")
+    parser.add_argument("--pad", type=int, default=CLIP_PAD, help="frames de margem antes/depois de cada evento")
+    parser.add_argument("--workers", type=int, default=1, help="render completo em N segmentos paralelos")
+    args = parser.parse_args()
+    out = args.out or (CLIPS_DIR if args.clips else OUT)
+    main(args.video, out, events=args.events or args.clips, clips=args.clips, pad=args.pad, workers=args.workers)
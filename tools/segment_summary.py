@@ -1,74 +1,78 @@
+"""Resumo de oportunidades por segmento, em uma ou mais granularidades.
+
+Uso:
+  python tools/segment_summary.py                  # 60s sobre output/punish_report.json
+  python tools/segment_summary.py 10 60 round match
+  python tools/segment_summary.py 60 match a/punish_report.json b/punish_report.json
+
+Números são segmentos em segundos; `round` e `match` agrupam por round e por
+partida. Com vários arquivos `.json`, cada um é tratado como uma partida. A
+primeira granularidade numérica também é gravada em `segment_summary.json/csv`
+(formato de sempre); todas vão para `segment_rollups.json`.
+"""
+
 import json
 import os
-import csv
-import math
+import sys
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from analysis.reports import segment_rollups, segment_summary, write_segment_rollups, write_segment_summary
+
 INPUT = os.path.join(ROOT, "output", "punish_report.json")
 OUT_JSON = os.path.join(ROOT, "output", "segment_summary.json")
 OUT_CSV = os.path.join(ROOT, "output", "segment_summary.csv")
+OUT_ROLLUPS = os.path.join(ROOT, "output", "segment_rollups.json")
 
 SEGMENT_SECONDS = 60  # 1-minute segments
 
 
-def main(segment_seconds=SEGMENT_SECONDS):
-    if not os.path.exists(INPUT):
-        print("No punish_report.json found at", INPUT)
-        return
-
-    with open(INPUT, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    rows = data.get("rows", [])
-
-    # ensure every row has start_time; if not, skip
-    times = [r.get("start_time") for r in rows if r.get("start_time") is not None]
-    if not times:
-        print("No timestamped rows found")
-        return
-
-    max_time = max(times)
-    n_segments = int(math.floor(max_time / segment_seconds)) + 1
-
-    segments = []
-    for s in range(n_segments):
-        start_t = s * segment_seconds
-        end_t = (s + 1) * segment_seconds
-        seg_rows = [r for r in rows if r.get("start_time") is not None and start_t <= r.get("start_time") < end_t]
-        total = len(seg_rows)
-        whiffs = len([r for r in seg_rows if r.get("type") == "whiff_punish"])
-        whiff_punishable = len([r for r in seg_rows if r.get("type") == "whiff_punish" and r.get("punishable")])
-        pun_jumps = len([r for r in seg_rows if r.get("type") == "punishable_jump" and r.get("punishable")])
-        segments.append({
-            "segment_index": s,
-            "start_time": start_t,
-            "end_time": end_t,
-            "total_opportunities": total,
-            "whiffs": whiffs,
-            "whiff_punishable": whiff_punishable,
-            "punishable_jumps": pun_jumps,
-        })
-
-    # write JSON and CSV
-    # escreve resumo por segmento em JSON
-    with open(OUT_JSON, "w", encoding="utf-8") as jf:
-        json.dump({"segment_seconds": segment_seconds, "segments": segments}, jf, indent=2)
-
-    with open(OUT_CSV, "w", newline='', encoding="utf-8") as cf:
-        writer = csv.DictWriter(cf, fieldnames=["segment_index", "start_time", "end_time", "total_opportunities", "whiffs", "whiff_punishable", "punishable_jumps"])
-        writer.writeheader()
-        for seg in segments:
-            writer.writerow(seg)
-
-    print("Wrote segment summaries:", OUT_JSON, OUT_CSV)
+def parse_args(argv):
+    granularities, inputs = [], []
+    for arg in argv:
+        if arg.endswith(".json"):
+            inputs.append(arg)
+        elif arg in ("round", "match"):
+            granularities.append(arg)
+        else:
+            try:
+                granularities.append(int(arg))
+            except ValueError:
+                try:
+                    granularities.append(float(arg))
+                except ValueError:
+                    pass
+    return granularities or [SEGMENT_SECONDS], inputs or [INPUT]
+
+
+def main(granularities=(SEGMENT_SECONDS,), inputs=(INPUT,)):
+    reports = []
+    for path in inputs:
+        if not os.path.exists(path):
+            print("No punish_report.json found at", path)
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            reports.append(json.load(f))
+
+    if len(reports) > 1:
+        # várias partidas: nomeia pelo arquivo quando o report não traz a origem
+        for path, report in zip(inputs, reports):
+            report["match"] = report.get("match") or os.path.basename(os.path.dirname(os.path.abspath(path)))
+
+    seconds = [g for g in granularities if g not in ("round", "match")]
+    if seconds and len(reports) == 1:
+        summary = segment_summary(reports[0], seconds[0])
+        if summary is None:
+            print("No timestamped rows found")
+            return
+        write_segment_summary(summary, OUT_JSON, OUT_CSV)
+        print("Wrote segment summaries:", OUT_JSON, OUT_CSV)
+
+    write_segment_rollups(segment_rollups(reports, granularities), OUT_ROLLUPS)
+    print("Wrote segment rollups:", OUT_ROLLUPS)
 
 
 if __name__ == '__main__':
-    import sys
-    seg = SEGMENT_SECONDS
-    if len(sys.argv) > 1:
-        try:
-            seg = int(sys.argv[1])
-        except Exception:
-            pass
-    main(seg)
+    main(*parse_args(sys.argv[1:]))
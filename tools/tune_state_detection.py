@@ -5,12 +5,41 @@ pré-processamento de efeitos visuais e parâmetros heurísticos do detector
 de estado. Produz um relatório em `output/tuning_report.json` com os
 melhores candidatos ordenados por `score`.
 
-Uso rápido: execute `python tools/tune_state_detection.py`.
+Os vídeos vêm de um manifesto (`--corpus`, ver `tools/tuning_corpus.py`) ou,
+sem ele, de `VIDEO` (até `MAX_FRAMES`). Cada vídeo tem um shard de features em
+disco, construído uma vez: estatísticas de ROI (área, cor média, MAD, deltas
+de centro) por frame e jogador e os MADs de efeitos de cada variante de
+pré-processamento (`EffectsSweep`). O efeito é escolhido pela contagem de hits
+somada no corpus; cada config é avaliada com comparações numpy sobre as
+tabelas (`classify_state_batch`), em lotes, um shard por vez. `coverage` e
+`attack_rate` são agregados a partir das contagens de todos os vídeos, e o
+relatório traz o detalhamento por vídeo. Os agregados são atualizados a cada
+lote do primeiro vídeo e a cada vídeo concluído, então um Ctrl+C grava o
+relatório parcial com o que já foi avaliado.
+
+Com `workers > 1` os lotes de configs são distribuídos num pool de processos.
+As tabelas de features e os hits ficam num bloco de `shared_memory`
+(`video.shared_memory.SharedArrays`): cada worker se conecta uma vez no
+início e as tarefas carregam apenas as configs do lote. Os resultados voltam
+lote a lote, em ordem.
+
+Com `--search halving` o grid fixo é trocado por successive halving: `--samples`
+configs amostradas (aleatória ou Latin hypercube) em `SEARCH_SPACE` são
+avaliadas num subconjunto pequeno de frames (blocos contíguos espalhados pelo
+vídeo); o melhor `1/eta` por `score` segue para um subconjunto `eta` vezes
+maior, até todos os frames carregados (`--max-frames 0` = vídeo inteiro).
+
+Uso rápido: execute `python tools/tune_state_detection.py [--workers N]`.
+Ex.: `python tools/tune_state_detection.py --corpus corpus.json --search halving --samples 20000 --sampler lhs`.
 """
 
+import argparse
 import json
 import itertools
+import math
+import multiprocessing
 import os
+import signal
 import sys
 
 # Ensure project root is on sys.path when running the script directly
@@ -18,55 +47,37 @@ ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
-from vision.state_detection import StateDetectorConfig, detect_state
-from vision.effects_detection import detect_effects
-from vision.character_detection import detect_characters
-import cv2
+import numpy as np
+
+from vision.state_detection import STATE_ATTACK, StateDetectorConfig, classify_state_batch
+from vision.effects_detection import hits_from_mads
+from video.shared_memory import SharedArrays
+from tools.tuning_corpus import SHARD_DIR, load_manifest, open_corpus, single_video_corpus
 
 VIDEO = "Match.mp4"
+REPORT = "output/tuning_report.json"
 # Use a smaller sample for faster iteration; increase to 500+ for full runs
 MAX_FRAMES = 300
 
 # Parameter grid (state detector)
 # Expanded grid to improve coverage — moderate size to keep runtime reasonable
-area_thresh_vals = [15000, 18000, 21000]
-area_fallback_vals = [2500, 3000]
-mean_color_vals = [30, 35, 40]
-jump_cy_delta_vals = [0.04, 0.06]
-drive_cx_factor_vals = [0.08, 0.12]
-motion_thresh_vals = [1.5, 3.0, 5.0]
-
-results = []
-
-cap = cv2.VideoCapture(VIDEO)
-if not cap.isOpened():
-    raise SystemExit(f"Cannot open video {VIDEO}")
-
-# read all frames up to MAX_FRAMES
-frames = []
-for i in range(MAX_FRAMES):
-    ret, frame = cap.read()
-    if not ret:
-        break
-    frames.append(frame)
-cap.release()
-
-print(f"Loaded {len(frames)} frames for tuning")
-
-# precompute bboxes per frame using detect_characters with simple tracking
-bboxes = []
-prev_b = None
-prev_fr = None
-for i, f in enumerate(frames):
-    pb1, pb2 = detect_characters(f, prev_fr, prev_b)
-    # convert (x,y,w,h) -> (x1,y1,x2,y2) for compatibility with detect_state
-    def to_xyxy(b):
-        x, y, w, h = map(int, b)
-        return (x, y, x + w, y + h)
-
-    bboxes.append((to_xyxy(pb1), to_xyxy(pb2)))
-    prev_fr = f
-    prev_b = (pb1, pb2)
+STATE_GRID = {
+    "area_t": [15000, 18000, 21000],
+    "area_fb": [2500, 3000],
+    "mean_c": [30, 35, 40],
+    "jump_delta": [0.04, 0.06],
+    "drive_factor": [0.08, 0.12],
+    "motion_thresh": [1.5, 3.0, 5.0],
+}
+# nome no relatório -> campo de StateDetectorConfig
+CONFIG_FIELDS = {
+    "area_t": "area_attack_threshold",
+    "area_fb": "area_attack_fallback",
+    "mean_c": "mean_color_block_threshold",
+    "jump_delta": "jump_cy_delta",
+    "drive_factor": "drive_cx_delta_factor",
+    "motion_thresh": "motion_thresh",
+}
 
 # effects detector preprocessing grid — mais restritivo para reduzir falsos positivos
 # aumentamos os thresholds e os tamanhos de kernel para limpeza mais forte
@@ -74,126 +85,395 @@ mean_diff_thresh_vals = [40.0, 60.0]
 blur_k_sizes = [5, 7]
 morph_k_sizes = [5, 7]
 binary_thresholds = [50, 60]
+# variantes de pré-processamento guardadas nos shards: (blur, bin, morph)
+EFFECT_VARIANTS = [(b, t, m) for b, m, t in itertools.product(blur_k_sizes, morph_k_sizes, binary_thresholds)]
+
+# Intervalos contínuos (min, max) para a busca por amostragem (`--search halving`)
+SEARCH_SPACE = {
+    "area_t": (10000.0, 26000.0),
+    "area_fb": (1500.0, 4000.0),
+    "mean_c": (20.0, 50.0),
+    "jump_delta": (0.02, 0.10),
+    "drive_factor": (0.04, 0.16),
+    "motion_thresh": (1.0, 8.0),
+}
+HALVING_SAMPLES = 2000
+HALVING_ETA = 3
+# menor subconjunto de frames avaliado no primeiro nível
+HALVING_MIN_FRAMES = 60
+# subconjuntos são formados por blocos contíguos deste tamanho (a cobertura olha para trás)
+SUBSET_BLOCK = 60
+
+COVERAGE_WINDOW = 8
+# quantas configs avaliar por operação vetorizada
+CONFIG_BATCH = 4096
+# processos para a avaliação do grid (1 = no próprio processo)
+TUNE_WORKERS = os.cpu_count() or 1
+
+
+def effect_candidates(shards):
+    """Candidatos de efeitos (ordem de `product(thresh, blur, morph, bin)`) com hits somados no corpus."""
+
+    counts = {}
+    for shard in shards:
+        for blur, bin_th, morph in EFFECT_VARIANTS:
+            per_thresh = hits_from_mads(shard.mads((blur, bin_th, morph)), mean_diff_thresh_vals)
+            for thr, h in zip(mean_diff_thresh_vals, per_thresh):
+                key = (thr, blur, morph, bin_th)
+                counts[key] = counts.get(key, 0) + len(h)
+    return [
+        {"mean_diff_thresh": thr, "blur": blur, "morph": morph, "bin": bin_th, "hits_count": counts.get((thr, blur, morph, bin_th), 0)}
+        for thr, blur, morph, bin_th in itertools.product(mean_diff_thresh_vals, blur_k_sizes, morph_k_sizes, binary_thresholds)
+    ]
+
+
+def effect_hits(shard, effect):
+    return shard.hits(effect["mean_diff_thresh"], (effect["blur"], effect["bin"], effect["morph"]))
+
+
+def choose_effect(effects_candidates, n_frames):
+    # choose candidate that yields a hits_count in a reasonable range
+    MIN_HITS = max(5, int(0.01 * n_frames))
+    MAX_HITS = max(10, int(0.5 * n_frames))
+    best_effect = None
+    best_e_score = None
+    for c in effects_candidates:
+        hc = c["hits_count"]
+        if hc < MIN_HITS or hc > MAX_HITS:
+            continue
+        escore = abs(hc - (MIN_HITS + MAX_HITS) / 2)
+        if best_e_score is None or escore < best_e_score:
+            best_e_score = escore
+            best_effect = c
+
+    if best_effect is None:
+        effects_candidates.sort(key=lambda x: abs(x["hits_count"] - (n_frames * 0.12)))
+        best_effect = effects_candidates[0]
+    return best_effect
+
+
+def config_grid(grid=STATE_GRID):
+    """Lista de configs (dicts com as chaves do relatório) na ordem do produto cartesiano."""
+
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def sample_configs(n, space=SEARCH_SPACE, method="random", seed=0):
+    """`n` configs amostradas em `space` ("random" uniforme ou "lhs" Latin hypercube)."""
+
+    rng = np.random.default_rng(seed)
+    names = list(space)
+    if method == "lhs":
+        # um ponto por estrato em cada dimensão, estratos embaralhados por dimensão
+        strata = np.stack([rng.permutation(n) for _ in names], axis=1)
+        unit = (strata + rng.random((n, len(names)))) / n
+    elif method == "random":
+        unit = rng.random((n, len(names)))
+    else:
+        raise ValueError(f"unknown sampler {method!r}")
+
+    lo = np.asarray([space[name][0] for name in names])
+    hi = np.asarray([space[name][1] for name in names])
+    values = np.round(lo + unit * (hi - lo), 6)
+    return [dict(zip(names, row)) for row in values.tolist()]
+
+
+def frame_subset(n_frames, size, block=SUBSET_BLOCK):
+    """Índices de ~`size` frames em blocos contíguos espalhados uniformemente.
+
+    Retorna `(idx, block_start)`: `block_start[p]` é a posição (em `idx`) do
+    início do bloco que contém a posição `p`. Usa todos os frames quando os
+    blocos cobririam o vídeo inteiro.
+    """
+
+    k = math.ceil(size / block)
+    if k * block >= n_frames:
+        return np.arange(n_frames), np.zeros(n_frames, dtype=np.int64)
+    starts = np.arange(k) * (n_frames - block) // max(k - 1, 1)
+    idx = (starts[:, None] + np.arange(block)).ravel()
+    block_start = np.repeat(np.arange(k) * block, block)
+    return idx, block_start
+
+
+def subset_tables(tables, hits, idx, block_start):
+    """Tabelas restritas a `idx`, com hits remapeados e o início da janela de cobertura."""
+
+    sub = {player: {name: arr[idx] for name, arr in table.items()} for player, table in tables.items()}
+    pos = np.searchsorted(idx, hits)
+    inside = pos < len(idx)
+    inside[inside] = idx[pos[inside]] == np.asarray(hits)[inside]
+    pos = pos[inside]
+    # a janela não atravessa a borda do bloco (o frame anterior não está no subconjunto)
+    hit_lo = np.maximum(pos - COVERAGE_WINDOW, block_start[pos])
+    return sub, pos, hit_lo
+
+
+def halving_rungs(n_frames, n_configs, eta=HALVING_ETA, min_frames=HALVING_MIN_FRAMES):
+    """Lista de `(frames, configs)` por nível, terminando com todos os frames."""
+
+    levels = 1
+    while n_frames / eta ** levels >= min_frames and n_configs / eta ** levels >= 1:
+        levels += 1
+    return [
+        (max(1, round(n_frames / eta ** (levels - 1 - r))), math.ceil(n_configs / eta ** r))
+        for r in range(levels)
+    ]
+
+
+def successive_halving(shards, effect, configs, eta=HALVING_ETA, min_frames=HALVING_MIN_FRAMES,
+                       workers=TUNE_WORKERS, batch=CONFIG_BATCH):
+    """Gera `(rung, results, info)` por nível de successive halving (`info` de `evaluate_corpus`).
+
+    Cada nível avalia as configs sobreviventes numa fração dos frames de cada
+    vídeo (`frame_subset`) e mantém o melhor `1/eta` por `score` (empate:
+    menor `attack_rate`). O último nível usa todos os frames; seus resultados
+    são comparáveis aos da busca em grid.
+    """
+
+    total = sum(shard.n_frames for shard in shards)
+    survivors = list(configs)
+    for r, (size, keep) in enumerate(halving_rungs(total, len(configs), eta, min_frames)):
+        survivors = survivors[:keep]
+        results, info = evaluate_corpus(shards, effect, survivors, fraction=size / total if total else 1.0,
+                                        workers=workers, batch=batch)
+        results.sort(key=lambda x: (-x["score"], x["attack_rate"]))
+        survivors = [x["config"] for x in results]
+        yield {"rung": r, "frames": info["frames"], "configs": len(results), "hits": info["hits"]}, results, info
+
+
+def _batch_config(configs):
+    """`StateDetectorConfig` com arrays (k, 1) nos campos varridos."""
+
+    cfg = StateDetectorConfig()
+    for name, field in CONFIG_FIELDS.items():
+        setattr(cfg, field, np.asarray([c[name] for c in configs], dtype=np.float64)[:, None])
+    return cfg
+
+
+def config_counts(tables, hits, configs, hit_lo=None):
+    """Contagens por config: `(hits cobertos, frames com ataque)`, arrays (k,).
+
+    Um frame conta como ataque quando P1 ou P2 está em `attack_active`. Um hit
+    é coberto quando há ataque em `[hit - COVERAGE_WINDOW, hit]` (ou
+    `[hit_lo[i], hit]`, quando `hit_lo` é dado).
+    """
+
+    hits = np.asarray(hits, dtype=np.int64)
+    lo = np.maximum(hits - COVERAGE_WINDOW, 0) if hit_lo is None else np.asarray(hit_lo, dtype=np.int64)
+    cfg = _batch_config(configs)
+    attack = (classify_state_batch(tables["p1"], cfg) == STATE_ATTACK) | (classify_state_batch(tables["p2"], cfg) == STATE_ATTACK)
+    if not len(hits):
+        return np.zeros(len(configs), dtype=np.int64), attack.sum(axis=1)
+    # ataques acumulados: há ataque na janela se a soma no intervalo > 0
+    csum = np.concatenate((np.zeros((len(configs), 1), dtype=np.int64), np.cumsum(attack, axis=1)), axis=1)
+    covered = (csum[:, hits + 1] - csum[:, lo]) > 0
+    return covered.sum(axis=1), attack.sum(axis=1)
+
+
+def count_rates(covered, n_hits, attack, n_frames):
+    """`(coverage, attack_rate, score)` a partir das contagens."""
+
+    attack_rate = attack / n_frames if n_frames else np.zeros(len(attack))
+    if n_hits:
+        coverage = covered / n_hits
+        # compute a score balancing coverage vs attack rate (penalize high attack_rate)
+        score = coverage - 0.6 * attack_rate
+    else:
+        # still record a result with zero coverage so user can inspect
+        coverage = np.zeros(len(attack))
+        score = -attack_rate
+    return coverage, attack_rate, score
+
+
+def _results(configs, covered, n_hits, attack, n_frames):
+    coverage, attack_rate, score = count_rates(covered, n_hits, attack, n_frames)
+    return [
+        {"config": c, "coverage": cov, "attack_rate": rate, "score": sc}
+        for c, cov, rate, sc in zip(configs, coverage.tolist(), attack_rate.tolist(), score.tolist())
+    ]
+
+
+# estado de cada worker do pool (preenchido por `_init_worker`)
+_worker = {}
+
+
+def _init_worker(spec):
+    # Ctrl+C é tratado pelo processo pai, que encerra o pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    shared = SharedArrays.attach(spec)
+    tables = {"p1": {}, "p2": {}}
+    for key, arr in shared.arrays.items():
+        if "/" in key:
+            player, name = key.split("/", 1)
+            tables[player][name] = arr
+    _worker.update(shared=shared, tables=tables, hits=shared.arrays["hits"], hit_lo=shared.arrays["hit_lo"])
+
+
+def _evaluate_batch(chunk):
+    return config_counts(_worker["tables"], _worker["hits"], chunk, hit_lo=_worker["hit_lo"])
+
+
+def iter_config_counts(tables, hits, configs, workers=TUNE_WORKERS, batch=CONFIG_BATCH, hit_lo=None):
+    """Gera `(covered, attack)` (de `config_counts`), lote a lote, na ordem de `configs`.
+
+    Com `workers > 1` os lotes são avaliados em um pool de processos que lê
+    as tabelas de um bloco de shared memory. Os lotes são reduzidos para que
+    todos os workers recebam trabalho mesmo em grids pequenos.
+    """
+
+    workers = max(1, min(workers, len(configs)))
+    if workers == 1:
+        for start in range(0, len(configs), batch):
+            yield config_counts(tables, hits, configs[start:start + batch], hit_lo=hit_lo)
+        return
+
+    batch = max(1, min(batch, math.ceil(len(configs) / workers)))
+    chunks = [configs[start:start + batch] for start in range(0, len(configs), batch)]
+    arrays = {f"{player}/{name}": arr for player, table in tables.items() for name, arr in table.items()}
+    arrays["hits"] = np.asarray(hits, dtype=np.int64)
+    arrays["hit_lo"] = np.maximum(arrays["hits"] - COVERAGE_WINDOW, 0) if hit_lo is None else np.asarray(hit_lo, dtype=np.int64)
+
+    with SharedArrays.create(arrays) as shared:
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(shared.spec(),))
+        try:
+            yield from pool.imap(_evaluate_batch, chunks)
+            pool.close()
+        except BaseException:
+            # interrupção (ou erro em um worker): descarta os lotes pendentes
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+
+def _corpus_results(configs, covered, attack, videos):
+    """`(results, info)` agregando as linhas de `covered`/`attack` (uma por vídeo de `videos`)."""
+
+    n_frames = sum(v["frames"] for v in videos)
+    n_hits = sum(v["hits"] for v in videos)
+    results = _results(configs, covered.sum(axis=0), n_hits, attack.sum(axis=0), n_frames)
+    per_video = [count_rates(covered[v], video["hits"], attack[v], video["frames"])[:2] for v, video in enumerate(videos)]
+    for k, r in enumerate(results):
+        r["videos"] = {
+            video["name"]: {"coverage": float(cov[k]), "attack_rate": float(rate[k])}
+            for video, (cov, rate) in zip(videos, per_video)
+        }
+    return results, {"frames": n_frames, "hits": n_hits, "videos": videos}
+
+
+def iter_corpus_results(shards, effect, configs, fraction=1.0, workers=TUNE_WORKERS, batch=CONFIG_BATCH):
+    """Avalia `configs` em todos os shards (um por vez) e gera `(results, info)` parciais.
+
+    No primeiro shard, um resultado por lote concluído (só as configs já
+    avaliadas); depois, um a cada shard concluído, com todas as configs
+    agregadas sobre os shards já avaliados. O último é o resultado completo;
+    um Ctrl+C no meio deixa o consumidor com o último parcial consistente.
+
+    Com `fraction < 1` cada vídeo contribui com `frame_subset` de ~`fraction`
+    dos seus frames. Cada resultado traz as métricas agregadas e `videos`
+    (`{nome: {"coverage", "attack_rate"}}`); `info` tem os totais de
+    frames/hits e o resumo por vídeo.
+    """
+
+    covered = np.zeros((len(shards), len(configs)), dtype=np.int64)
+    attack = np.zeros((len(shards), len(configs)), dtype=np.int64)
+    videos = []
+    for v, shard in enumerate(shards):
+        tables, hits, hit_lo = shard.tables(), effect_hits(shard, effect), None
+        n = shard.n_frames
+        if fraction < 1.0:
+            idx, block_start = frame_subset(n, max(1, round(n * fraction)))
+            if len(idx) < n:
+                tables, hits, hit_lo = subset_tables(tables, hits, idx, block_start)
+                n = len(idx)
+        video = {"name": shard.name, "source": shard.metadata.get("source"), "sha256": shard.metadata.get("sha256"),
+                 "frames": int(n), "hits": int(len(hits))}
+        start = 0
+        for cov, att in iter_config_counts(tables, hits, configs, workers=workers, batch=batch, hit_lo=hit_lo):
+            covered[v, start:start + len(cov)] = cov
+            attack[v, start:start + len(cov)] = att
+            start += len(cov)
+            if v == 0 and start < len(configs):
+                yield _corpus_results(configs[:start], covered[:1, :start], attack[:1, :start], [video])
+        videos.append(video)
+        del tables
+        yield _corpus_results(configs, covered[:v + 1], attack[:v + 1], list(videos))
+
+    if not shards:
+        yield _corpus_results(configs, covered, attack, videos)
+
+
+def evaluate_corpus(shards, effect, configs, fraction=1.0, workers=TUNE_WORKERS, batch=CONFIG_BATCH):
+    """Resultado completo de `iter_corpus_results`: `(results, info)`."""
+
+    for results, info in iter_corpus_results(shards, effect, configs, fraction=fraction, workers=workers, batch=batch):
+        pass
+    return results, info
+
+
+def write_report(results, n_frames, hits, path=REPORT, search=None, videos=None):
+    # sort by score desc then attack_rate asc
+    results_sorted = sorted(results, key=lambda r: (-r.get("score", 0.0), r.get("attack_rate", 0.0)))
+    report = {"total_frames": n_frames, "hits_detected": hits, "results": results_sorted[:20]}
+    if videos is not None:
+        report["videos"] = videos
+    if search is not None:
+        report["search"] = search
+
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return results_sorted
+
+
+def main(workers=TUNE_WORKERS, search="grid", samples=HALVING_SAMPLES, sampler="random", eta=HALVING_ETA,
+         seed=0, max_frames=MAX_FRAMES, corpus=None, rebuild_shards=False):
+    entries = load_manifest(corpus) if corpus else single_video_corpus(VIDEO, max_frames or None)
+
+    results = []
+    info = {"frames": 0, "hits": 0, "videos": None}
+    search_info = None
+    try:
+        shards = open_corpus(entries, EFFECT_VARIANTS, shard_dir=SHARD_DIR, rebuild=rebuild_shards)
+        total_frames = sum(shard.n_frames for shard in shards)
+        print(f"Loaded {len(shards)} video(s), {total_frames} frames for tuning")
+
+        best_effect = choose_effect(effect_candidates(shards), total_frames)
+        print(f"Chosen effects config: mean_diff_thresh={best_effect['mean_diff_thresh']}, blur={best_effect['blur']}, morph={best_effect['morph']}, bin={best_effect['bin']}, hits_count={best_effect['hits_count']}")
+
+        if search == "halving":
+            configs = sample_configs(samples, method=sampler, seed=seed)
+            search_info = {"mode": "halving", "sampler": sampler, "samples": samples, "eta": eta, "seed": seed, "rungs": []}
+            # o relatório usa o último nível completo (no interrupt, pode ser um subconjunto de frames)
+            for rung, results, info in successive_halving(shards, best_effect, configs, eta=eta, workers=workers):
+                search_info["rungs"].append(rung)
+                print(f"rung {rung['rung']}: {rung['configs']} configs on {rung['frames']} frames, best score={results[0]['score']:.4f}")
+        else:
+            # parciais por lote/vídeo: no interrupt, o relatório traz o que já foi avaliado
+            for results, info in iter_corpus_results(shards, best_effect, config_grid(), workers=workers):
+                pass
+    except KeyboardInterrupt:
+        print("Tuning interrupted by user — writing partial report")
+
+    results_sorted = write_report(results, info["frames"], info["hits"], search=search_info, videos=info["videos"])
+    print(f"Tuning complete — report saved to {REPORT}")
+    # also print top 5 results for quick inspection
+    for r in results_sorted[:5]:
+        cfg = r["config"]
+        print(f"cfg={cfg} coverage={r.get('coverage',0.0):.3f} attack_rate={r.get('attack_rate',0.0):.3f} score={r.get('score',0.0):.4f}")
+
 
-# Sweep parameter grid
-try:
-    for area_t, area_fb, mean_c, jump_delta, drive_factor in itertools.product(
-        area_thresh_vals, area_fallback_vals, mean_color_vals, jump_cy_delta_vals, drive_cx_factor_vals
-    ):
-        for motion_thresh in motion_thresh_vals:
-            cfg = StateDetectorConfig(
-                area_attack_threshold=area_t,
-                area_attack_fallback=area_fb,
-                mean_color_block_threshold=mean_c,
-                jump_cy_delta=jump_delta,
-                drive_cx_delta_factor=drive_factor,
-                motion_thresh=motion_thresh,
-            )
-
-            # First, sweep effects detector preprocessing to find a reasonable baseline of hits
-            effects_candidates = []
-            for mean_diff_thresh, blur_k, morph_k, bin_th in itertools.product(
-                mean_diff_thresh_vals, blur_k_sizes, morph_k_sizes, binary_thresholds
-            ):
-                hits_local = []
-                for i in range(1, len(frames)):
-                    eff = detect_effects(
-                        frames[i], frames[i - 1], bboxes[i][0], bboxes[i][1],
-                        mean_diff_thresh=mean_diff_thresh, blur_ksize=blur_k, morph_kernel=morph_k, binary_thresh=bin_th
-                    )
-                    if eff:
-                        hits_local.append(i)
-
-                effects_candidates.append(
-                    {"mean_diff_thresh": mean_diff_thresh, "blur": blur_k, "morph": morph_k, "bin": bin_th, "hits_count": len(hits_local), "hits": hits_local}
-                )
-
-            # choose candidate that yields a hits_count in a reasonable range
-            MIN_HITS = max(5, int(0.01 * len(frames)))
-            MAX_HITS = max(10, int(0.5 * len(frames)))
-            best_effect = None
-            best_e_score = None
-            for c in effects_candidates:
-                hc = c["hits_count"]
-                if hc < MIN_HITS or hc > MAX_HITS:
-                    continue
-                escore = abs(hc - (MIN_HITS + MAX_HITS) / 2)
-                if best_e_score is None or escore < best_e_score:
-                    best_e_score = escore
-                    best_effect = c
-
-            if best_effect is None:
-                effects_candidates.sort(key=lambda x: abs(x["hits_count"] - (len(frames) * 0.12)))
-                best_effect = effects_candidates[0]
-
-            print(f"Chosen effects config: mean_diff_thresh={best_effect['mean_diff_thresh']}, blur={best_effect['blur']}, morph={best_effect['morph']}, bin={best_effect['bin']}, hits_count={best_effect['hits_count']}")
-
-            # Use chosen hits as baseline
-            hits = best_effect["hits"]
-
-            attack_frames = set()
-            # run lightweight state detection over sample frames with current cfg
-            for i, frame in enumerate(frames):
-                p1_bbox, p2_bbox = bboxes[i]
-                prev_frame = frames[i - 1] if i > 0 else None
-                prev_p1_bbox, prev_p2_bbox = bboxes[i - 1] if i > 0 else (None, None)
-                s1 = detect_state(frame, p1_bbox, prev_frame, prev_p1_bbox, config=cfg)
-                s2 = detect_state(frame, p2_bbox, prev_frame, prev_p2_bbox, config=cfg)
-                if s1 == "attack_active":
-                    attack_frames.add(i)
-                if s2 == "attack_active":
-                    attack_frames.add(i)
-
-            if not hits:
-                # still record a result with zero coverage so user can inspect
-                results.append({
-                    "config": {"area_t": area_t, "area_fb": area_fb, "mean_c": mean_c, "jump_delta": jump_delta, "drive_factor": drive_factor, "motion_thresh": motion_thresh},
-                    "coverage": 0.0,
-                    "attack_rate": len(attack_frames) / len(frames) if frames else 0.0,
-                    "score": - (len(attack_frames) / len(frames) if frames else 0.0),
-                })
-                continue
-
-            # measure coverage: fraction of hit frames that have attack_active within window
-            covered = 0
-            coverage_window = 8
-            for h in hits:
-                window = range(max(0, h - coverage_window), h + 1)
-                if any(f in attack_frames for f in window):
-                    covered += 1
-
-            coverage = covered / len(hits) if hits else 0.0
-            attack_rate = len(attack_frames) / len(frames) if frames else 0.0
-
-            # compute a score balancing coverage vs attack rate (penalize high attack_rate)
-            score = coverage - 0.6 * attack_rate
-
-            results.append(
-                {
-                    "config": {
-                        "area_t": area_t,
-                        "area_fb": area_fb,
-                        "mean_c": mean_c,
-                        "jump_delta": jump_delta,
-                        "drive_factor": drive_factor,
-                        "motion_thresh": motion_thresh,
-                    },
-                    "coverage": coverage,
-                    "attack_rate": attack_rate,
-                    "score": score,
-                }
-            )
-except KeyboardInterrupt:
-    print("Tuning interrupted by user — writing partial report")
-
-# sort by score desc then attack_rate asc
-results_sorted = sorted(results, key=lambda r: (-r.get("score", 0.0), r.get("attack_rate", 0.0)))
-report = {"total_frames": len(frames), "hits_detected": len(hits) if 'hits' in locals() else 0, "results": results_sorted[:20]}
-
-with open("output/tuning_report.json", "w") as f:
-    json.dump(report, f, indent=2)
-print("Tuning complete — report saved to output/tuning_report.json")
-# also print top 5 results for quick inspection
-for r in results_sorted[:5]:
-    cfg = r["config"]
-    print(f"cfg={cfg} coverage={r.get('coverage',0.0):.3f} attack_rate={r.get('attack_rate',0.0):.3f} score={r.get('score',0.0):.4f}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="manifesto de vídeos (.json ou .txt); padrão: VIDEO")
+    parser.add_argument("--rebuild-shards", action="store_true", help="reconstrói os shards de features")
+    parser.add_argument("--workers", type=int, default=TUNE_WORKERS, help="processos para avaliar o grid")
+    parser.add_argument("--search", choices=("grid", "halving"), default="grid")
+    parser.add_argument("--samples", type=int, default=HALVING_SAMPLES, help="configs amostradas (halving)")
+    parser.add_argument("--sampler", choices=("random", "lhs"), default="random")
+    parser.add_argument("--eta", type=int, default=HALVING_ETA, help="fator de redução por nível (halving)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-frames", type=int, default=MAX_FRAMES, help="sem --corpus; 0 = vídeo inteiro")
+    args = parser.parse_args()
+    main(workers=args.workers, search=args.search, samples=args.samples, sampler=args.sampler, eta=args.eta,
+         seed=args.seed, max_frames=args.max_frames, corpus=args.corpus, rebuild_shards=args.rebuild_shards)
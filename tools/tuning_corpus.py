@@ -0,0 +1,236 @@
+"""Corpus de vídeos para o tuner: manifesto + um shard de features por vídeo.
+
+O manifesto é um JSON (lista, ou `{"videos": [...]}`) cujos itens são um
+caminho ou `{"path", "name"?, "max_frames"?}`; ou um `.txt` com um caminho por
+linha. Caminhos relativos são resolvidos a partir do diretório do manifesto.
+
+Cada vídeo vira um shard `.npz` em `SHARD_DIR`:
+
+    tuning-<sha256 do vídeo (16 hex)>-<hash da config do shard (16 hex)>.npz
+
+com as features por frame de cada jogador (`p1_<campo>`/`p2_<campo>`, como em
+`stack_state_features`) e os MADs de efeitos `(n, 2)` de cada variante de
+pré-processamento (`mads_<blur>_<bin>_<morph>`). As ROIs são as bboxes
+`(x1, y1, x2, y2)` do rastreamento de `main.run` (`VisionStages.track`, perfil
+padrão), então as features do shard são as mesmas que a análise vê; o
+detector em uso (`vision_config`) entra no hash. Os thresholds de estado e o
+`mean_diff_thresh` são aplicados na avaliação, então o shard é reaproveitado
+entre execuções enquanto o vídeo (hash), `max_frames` e as variantes não mudam.
+
+O shard é construído lendo o vídeo em blocos de `SHARD_CHUNK` frames, e a
+avaliação abre um shard por vez (`np.load` lê cada coluna sob demanda, e
+`FeatureShard.tables(start, stop)` lê só as linhas do trecho), então nem o
+vídeo nem o corpus precisam caber na memória.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import zipfile
+from dataclasses import fields
+
+import cv2
+import numpy as np
+
+from main import VisionStages, vision_config
+from video.video_utils import file_sha256
+from vision.effects_detection import EffectsSweep, hits_from_mads
+from vision.speed_profile import SpeedProfile
+from vision.state_detection import StateFeatures, compute_state_features, stack_state_features
+
+SHARD_VERSION = 2
+SHARD_DIR = "output/cache"
+# frames decodificados mantidos em memória ao construir um shard
+SHARD_CHUNK = 120
+
+FEATURE_NAMES = [f.name for f in fields(StateFeatures)]
+
+
+def load_manifest(path):
+    """Lista de `{"name", "path", "max_frames"}` a partir de um manifesto JSON ou texto."""
+
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            raw = json.load(f)
+            items = raw["videos"] if isinstance(raw, dict) else raw
+        else:
+            items = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+    entries = []
+    for item in items:
+        if isinstance(item, str):
+            item = {"path": item}
+        entries.append({
+            "name": item.get("name"),
+            "path": os.path.join(base, item["path"]),
+            "max_frames": item.get("max_frames"),
+        })
+    return _unique_names(entries)
+
+
+def single_video_corpus(video, max_frames=None):
+    return _unique_names([{"name": None, "path": video, "max_frames": max_frames}])
+
+
+def _unique_names(entries):
+    seen = {}
+    for e in entries:
+        name = e["name"] or os.path.splitext(os.path.basename(e["path"]))[0]
+        seen[name] = seen.get(name, 0) + 1
+        e["name"] = name if seen[name] == 1 else f"{name}#{seen[name]}"
+    return entries
+
+
+def variant_key(variant):
+    blur, bin_th, morph = variant
+    return f"mads_{blur}_{bin_th}_{morph}"
+
+
+def shard_key(video_sha256, max_frames, variants):
+    raw = json.dumps({"version": SHARD_VERSION, "detector": vision_config()["detector"], "max_frames": max_frames,
+                      "variants": [list(v) for v in variants]})
+    return f"{video_sha256[:16]}-{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]}"
+
+
+def build_shard(video, path, variants, max_frames=None, chunk=SHARD_CHUNK, metadata=None):
+    """Extrai features e MADs de `video` em blocos e grava o shard em `path` (atômico).
+
+    `variants` são tuplas `(blur, bin, morph)` do pré-processamento de efeitos.
+    Cada bloco repete o último frame do bloco anterior, para que os MADs do
+    primeiro frame do bloco tenham o frame anterior.
+    """
+
+    cap = cv2.VideoCapture(video)
+    if not cap.isOpened():
+        raise SystemExit(f"Cannot open video {video}")
+
+    feats = {"p1": [], "p2": []}
+    mads = {v: [] for v in variants}
+    buf_frames, buf_bboxes = [], []
+    carried = 0
+    stages = VisionStages(SpeedProfile())
+    prev_frame, prev_bboxes = None, (None, None)
+
+    def flush():
+        sweep = EffectsSweep(buf_frames, buf_bboxes)
+        sweep.prepare(variants)
+        for v in variants:
+            mads[v].append(sweep.mads(v[0], v[1], v[2])[carried:])
+
+    n = 0
+    try:
+        while not max_frames or n < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            _, _, pb1, pb2 = stages.track((n, frame))
+            bboxes = (pb1, pb2)
+            for k, player in enumerate(("p1", "p2")):
+                feats[player].append(compute_state_features(frame, bboxes[k], prev_frame, prev_bboxes[k]))
+            buf_frames.append(frame)
+            buf_bboxes.append(bboxes)
+            prev_frame, prev_bboxes = frame, bboxes
+            n += 1
+
+            if len(buf_frames) - carried >= chunk:
+                flush()
+                buf_frames, buf_bboxes, carried = buf_frames[-1:], buf_bboxes[-1:], 1
+        if len(buf_frames) > carried:
+            flush()
+    finally:
+        cap.release()
+
+    tables = {player: stack_state_features(rows) for player, rows in feats.items()}
+    mads = {v: np.concatenate(parts) if parts else np.zeros((0, 2)) for v, parts in mads.items()}
+    return write_shard(path, tables, mads, {**(metadata or {}), "max_frames": max_frames})
+
+
+def write_shard(path, tables, mads, metadata=None):
+    """Grava (atômico) um shard com as tabelas por jogador e os MADs `{variante: (n, 2)}`."""
+
+    arrays = {f"{player}_{name}": arr for player, table in tables.items() for name, arr in table.items()}
+    for v, arr in mads.items():
+        arrays[variant_key(v)] = arr
+
+    meta = {**(metadata or {}), "version": SHARD_VERSION, "n_frames": len(tables["p1"]["valid"]),
+            "variants": [list(v) for v in mads]}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, metadata=np.asarray(json.dumps(meta)), **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+def _read_rows(f, archive, member, start, stop):
+    """Linhas `[start:stop]` do array `member` de um `.npz` aberto como `archive` (arquivo `f`).
+
+    Membros gravados sem compressão (`np.savez`) são lidos direto do offset das
+    linhas; nos demais o array inteiro é carregado e fatiado.
+    """
+
+    info = archive.getinfo(f"{member}.npy")
+    if info.compress_type == zipfile.ZIP_STORED:
+        # dados do membro: depois do cabeçalho local (30 bytes + nome + extra)
+        f.seek(info.header_offset)
+        name_len, extra_len = struct.unpack("<HH", f.read(30)[26:30])
+        f.seek(info.header_offset + 30 + name_len + extra_len)
+        version = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(f)
+        if shape and not fortran_order and not dtype.hasobject:
+            stop = shape[0] if stop is None else min(stop, shape[0])
+            start = min(start, stop)
+            row = int(np.prod(shape[1:], dtype=np.int64))
+            f.seek(start * row * dtype.itemsize, os.SEEK_CUR)
+            data = bytearray(f.read((stop - start) * row * dtype.itemsize))
+            return np.frombuffer(data, dtype=dtype).reshape((stop - start,) + tuple(shape[1:]))
+    with archive.open(info) as m:
+        return np.lib.format.read_array(m)[start:stop]
+
+
+class FeatureShard:
+    """Um shard em disco; as colunas são lidas sob demanda e não ficam em memória."""
+
+    def __init__(self, path, name=None):
+        self.path = path
+        with np.load(path, allow_pickle=False) as data:
+            self.metadata = json.loads(str(data["metadata"]))
+        self.name = name or self.metadata.get("name") or os.path.basename(path)
+        self.n_frames = self.metadata["n_frames"]
+
+    def tables(self, start=0, stop=None):
+        """Tabelas de features `{"p1": {...}, "p2": {...}}` (formato de `stack_state_features`).
+
+        Com `start`/`stop`, só as linhas `[start:stop]` são lidas do disco.
+        """
+
+        with open(self.path, "rb") as f, zipfile.ZipFile(f) as archive:
+            return {player: {name: _read_rows(f, archive, f"{player}_{name}", start, stop) for name in FEATURE_NAMES}
+                    for player in ("p1", "p2")}
+
+    def mads(self, variant):
+        with np.load(self.path, allow_pickle=False) as data:
+            return data[variant_key(variant)]
+
+    def hits(self, mean_diff_thresh, variant):
+        """Frames com efeito para o threshold e a variante dados (como `EffectsSweep.hit_frames`)."""
+
+        return hits_from_mads(self.mads(variant), [mean_diff_thresh])[0]
+
+
+def open_corpus(entries, variants, shard_dir=SHARD_DIR, rebuild=False):
+    """Um `FeatureShard` por entrada do manifesto, construindo os shards ausentes."""
+
+    shards = []
+    for e in entries:
+        sha = file_sha256(e["path"])
+        path = os.path.join(shard_dir, f"tuning-{shard_key(sha, e['max_frames'], variants)}.npz")
+        if rebuild or not os.path.exists(path):
+            print(f"Building feature shard for {e['name']} ({e['path']})")
+            build_shard(e["path"], path, variants, max_frames=e["max_frames"],
+                        metadata={"name": e["name"], "source": e["path"], "sha256": sha})
+        shards.append(FeatureShard(path, name=e["name"]))
+    return shards
@@ -1,87 +1,274 @@
-"""Valida a configuração ajustada executando uma checagem rápida sobre o vídeo.
-Gera um resumo em `output/validate_report.json` contendo: total_frames, hits_count, coverage, attack_rate.
+"""Valida a configuração ajustada com k-fold e leave-one-video-out.
+
+Usa os mesmos shards de features do tuner (`tools/tuning_corpus.py`), cujas
+ROIs são as bboxes do rastreamento de `main.run`, e o mesmo efeito escolhido
+pela contagem de hits do corpus. O trabalho é dividido em unidades (um vídeo
+inteiro, ou um dos `k` trechos contíguos de um vídeo), avaliadas em paralelo
+num pool de processos que lê dos shards do cache só as linhas de cada
+unidade; cada unidade produz as contagens (hits cobertos, frames com ataque)
+da config ajustada e de cada config do grid do tuner. Como as contagens são aditivas,
+cada fold soma as unidades de treino e de teste sem reavaliar nada:
+
+- k-fold: o fold `i` testa o trecho `i` de todos os vídeos e treina no resto;
+- leave-one-video-out: cada fold testa um vídeo e treina nos demais.
+
+Por fold o relatório traz as métricas da config ajustada no trecho de teste,
+a config re-tunada no treino (melhor `score` do grid + config ajustada) com
+o `score` de treino e o de teste, e `cpu_seconds`, o tempo de CPU somado das
+unidades de teste (as unidades rodam em paralelo, então não é o tempo de
+relógio do fold; esse só existe para a validação inteira, em `seconds`).
+O resumo traz média, desvio e variância por métrica e a comparação com o
+`score` do topo de `output/tuning_report.json`.
+
+Gera `output/validate_report.json`; os campos `total_frames`, `hits_count`,
+`coverage` e `attack_rate` continuam presentes (config ajustada no corpus
+inteiro, nas mesmas bboxes que `main.run` usa).
+
+Uso: python tools/validate_tuned_config.py [--corpus corpus.json] [--folds K] [--workers N]
 """
+
+import argparse
 import json
+import multiprocessing
 import os
+import signal
 import sys
+import time
+
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
-from vision.effects_detection import detect_effects
-from vision.character_detection import detect_characters
-from vision.tuned_state_config import get_default_config
-from vision.state_detection import detect_state
-import cv2
+import numpy as np
+
+from tools.tune_state_detection import (
+    CONFIG_FIELDS,
+    EFFECT_VARIANTS,
+    REPORT as TUNING_REPORT,
+    TUNE_WORKERS,
+    choose_effect,
+    config_counts,
+    config_grid,
+    count_rates,
+    effect_candidates,
+    effect_hits,
+)
+from tools.tuning_corpus import SHARD_DIR, FeatureShard, load_manifest, open_corpus, single_video_corpus
+from vision.state_detection import load_state_config
 
 VIDEO = "Match.mp4"
 MAX_FRAMES = 600
+FOLDS = 5
+REPORT = "output/validate_report.json"
+METRICS = ("coverage", "attack_rate", "score")
+
+
+def tuned_config_dict(cfg=None):
+    """Config ajustada (`load_state_config`) no formato de chaves do relatório do tuner."""
+
+    cfg = cfg or load_state_config()
+    return {name: float(getattr(cfg, field)) for name, field in CONFIG_FIELDS.items()}
+
+
+def fold_units(shards, folds):
+    """Unidades de avaliação: `(id, shard_index, start, stop, tag)`.
+
+    `tag` é `("video", v)` para o vídeo inteiro ou `("segment", v, i)` para o
+    trecho `i` de `folds` trechos contíguos do vídeo `v`.
+    """
+
+    units = []
+    for v, shard in enumerate(shards):
+        units.append((v, 0, shard.n_frames, ("video", v)))
+        if folds > 1:
+            bounds = np.linspace(0, shard.n_frames, folds + 1).astype(int)
+            for i in range(folds):
+                units.append((v, int(bounds[i]), int(bounds[i + 1]), ("segment", v, i)))
+    return [(u, *unit) for u, unit in enumerate(units)]
+
+
+# estado de cada worker do pool (preenchido por `_init_worker`)
+_worker = {}
+
+
+def _load_worker(shard_paths, effect, configs):
+    _worker.update(shards=[FeatureShard(p) for p in shard_paths], effect=effect, configs=configs, hits={})
+
+
+def _init_worker(*args):
+    # Ctrl+C é tratado pelo processo pai, que encerra o pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _load_worker(*args)
+
+
+def _evaluate_unit(unit):
+    """Contagens de uma unidade para todas as configs; roda no worker (ou no processo pai)."""
+
+    u, v, start, stop, _tag = unit
+    t0 = time.process_time()
+    shard = _worker["shards"][v]
+    tables = shard.tables(start, stop)
+    if v not in _worker["hits"]:
+        # o efeito é o mesmo para todas as unidades: os hits do vídeo saem uma vez por worker
+        _worker["hits"][v] = effect_hits(shard, _worker["effect"])
+    hits = _worker["hits"][v]
+    # a janela de cobertura não atravessa o início do trecho
+    hits = hits[(hits >= start) & (hits < stop)] - start
+    covered, attack = config_counts(tables, hits, _worker["configs"])
+    return u, {"frames": stop - start, "hits": len(hits), "covered": covered, "attack": attack,
+               "cpu_seconds": time.process_time() - t0}
+
+
+def evaluate_units(shards, units, effect, configs, workers=TUNE_WORKERS):
+    """`{unit_id: contagens}` para todas as unidades, em paralelo quando `workers > 1`."""
+
+    initargs = ([s.path for s in shards], effect, configs)
+    workers = max(1, min(workers, len(units)))
+    if workers == 1:
+        _load_worker(*initargs)
+        return dict(_evaluate_unit(unit) for unit in units)
+
+    pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=initargs)
+    try:
+        # unidades maiores primeiro, para equilibrar a carga entre os workers
+        ordered = sorted(units, key=lambda unit: unit[2] - unit[3])
+        counts = dict(pool.imap_unordered(_evaluate_unit, ordered))
+        pool.close()
+        return counts
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def _sum_counts(parts):
+    return {
+        "frames": sum(p["frames"] for p in parts),
+        "hits": sum(p["hits"] for p in parts),
+        "covered": sum(p["covered"] for p in parts),
+        "attack": sum(p["attack"] for p in parts),
+        "cpu_seconds": sum(p["cpu_seconds"] for p in parts),
+    }
+
+
+def _metrics(counts, k):
+    coverage, attack_rate, score = count_rates(counts["covered"][k:k + 1], counts["hits"], counts["attack"][k:k + 1], counts["frames"])
+    return {"coverage": float(coverage[0]), "attack_rate": float(attack_rate[0]), "score": float(score[0])}
+
+
+def _fold(test_parts, train_parts, configs):
+    """Métricas de um fold a partir das contagens das unidades de teste e de treino."""
+
+    test = _sum_counts(test_parts)
+    fold = {"frames": test["frames"], "hits": test["hits"], "cpu_seconds": test["cpu_seconds"], "tuned": _metrics(test, 0)}
+    if train_parts:
+        train = _sum_counts(train_parts)
+        _, attack_rate, score = count_rates(train["covered"], train["hits"], train["attack"], train["frames"])
+        # mesmo critério do relatório do tuner: maior score, depois menor attack_rate
+        best = int(np.lexsort((attack_rate, -score))[0])
+        fold["retuned"] = {"config": configs[best], "train_score": float(score[best]), **_metrics(test, best)}
+    return fold
+
+
+def summarize(folds):
+    """Média, desvio padrão e variância de cada métrica entre os folds."""
+
+    summary = {}
+    for key in ("tuned", "retuned"):
+        rows = [f[key] for f in folds if key in f]
+        if not rows:
+            continue
+        summary[key] = {}
+        for metric in METRICS:
+            values = np.asarray([r[metric] for r in rows])
+            summary[key][metric] = {"mean": float(values.mean()), "std": float(values.std()), "var": float(values.var())}
+    return summary
+
+
+def validate(shards, config, folds=FOLDS, lovo=True, workers=TUNE_WORKERS, grid=None):
+    """Relatório de validação de `config` (dict com as chaves do tuner) sobre `shards`."""
+
+    t0 = time.perf_counter()
+    total_frames = sum(s.n_frames for s in shards)
+    effect = choose_effect(effect_candidates(shards), total_frames)
+    configs = [config] + (config_grid() if grid is None else grid)
+    units = fold_units(shards, folds)
+    counts = evaluate_units(shards, units, effect, configs, workers=workers)
+
+    whole = {unit[4][1]: counts[unit[0]] for unit in units if unit[4][0] == "video"}
+    full = _sum_counts(list(whole.values()))
+    report = {
+        "config": config,
+        "effect": {k: effect[k] for k in ("mean_diff_thresh", "blur", "morph", "bin")},
+        "total_frames": full["frames"],
+        "hits_count": full["hits"],
+        **_metrics(full, 0),
+    }
+
+    if folds > 1:
+        segments = {}
+        for unit in units:
+            if unit[4][0] == "segment":
+                segments.setdefault(unit[4][2], []).append(counts[unit[0]])
+        kfold = []
+        for i in range(folds):
+            train = [c for j, parts in segments.items() if j != i for c in parts]
+            kfold.append({"fold": i, **_fold(segments[i], train, configs)})
+        report["kfold"] = {"k": folds, "folds": kfold, "summary": summarize(kfold)}
+
+    if lovo and len(shards) > 1:
+        per_video = []
+        for v, shard in enumerate(shards):
+            train = [c for w, c in whole.items() if w != v]
+            per_video.append({"video": shard.name, **_fold([whole[v]], train, configs)})
+        report["lovo"] = {"folds": per_video, "summary": summarize(per_video)}
+
+    report["seconds"] = time.perf_counter() - t0
+    return report
+
+
+def tuning_score(path=TUNING_REPORT):
+    """`score` do topo do relatório do tuner, se existir."""
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            results = json.load(f).get("results") or []
+        return results[0].get("score") if results else None
+    except (OSError, ValueError):
+        return None
+
+
+def main(corpus=None, folds=FOLDS, lovo=True, workers=TUNE_WORKERS, max_frames=MAX_FRAMES):
+    entries = load_manifest(corpus) if corpus else single_video_corpus(VIDEO, max_frames or None)
+    shards = open_corpus(entries, EFFECT_VARIANTS, shard_dir=SHARD_DIR)
+
+    report = validate(shards, tuned_config_dict(), folds=folds, lovo=lovo, workers=workers)
+    report["tuning_score"] = tuning_score()
+    for key in ("kfold", "lovo"):
+        if key in report and report["tuning_score"] is not None:
+            held_out = report[key]["summary"]["tuned"]["score"]["mean"]
+            report[key]["summary"]["gap_vs_tuning"] = report["tuning_score"] - held_out
+
+    os.makedirs(os.path.dirname(REPORT), exist_ok=True)
+    with open(REPORT, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"frames={report['total_frames']} hits={report['hits_count']} coverage={report['coverage']:.3f} "
+          f"attack_rate={report['attack_rate']:.3f} score={report['score']:.4f} ({report['seconds']:.2f}s)")
+    for key in ("kfold", "lovo"):
+        if key in report:
+            s = report[key]["summary"]["tuned"]["score"]
+            print(f"{key}: {len(report[key]['folds'])} folds, held-out score {s['mean']:.4f} ± {s['std']:.4f}")
+    print(f"Report saved to {REPORT}")
+
 
-cfg = get_default_config()
-
-cap = cv2.VideoCapture(VIDEO)
-if not cap.isOpened():
-    raise SystemExit(f"Cannot open video {VIDEO}")
-
-frames = []
-for i in range(MAX_FRAMES):
-    ret, frame = cap.read()
-    if not ret:
-        break
-    frames.append(frame)
-cap.release()
-
-bboxes = []
-prev_b = None
-prev_fr = None
-for i, f in enumerate(frames):
-    pb1, pb2 = detect_characters(f, prev_fr, prev_b)
-    bboxes.append((pb1, pb2))
-    prev_fr = f
-    prev_b = (pb1, pb2)
-
-hits = []
-attack_frames = set()
-
-for i, frame in enumerate(frames):
-    p1_bbox, p2_bbox = bboxes[i]
-    prev_frame = frames[i-1] if i>0 else None
-    prev_p1 = bboxes[i-1][0] if i>0 else None
-    prev_p2 = bboxes[i-1][1] if i>0 else None
-
-    effs = detect_effects(frame, prev_frame, p1_bbox, p2_bbox, mean_diff_thresh=40.0, blur_ksize=5, morph_kernel=5, binary_thresh=30)
-    if effs:
-        for e in effs:
-            hits.append(i)
-
-    s1 = detect_state(frame, p1_bbox, prev_frame, prev_p1, config=cfg)
-    s2 = detect_state(frame, p2_bbox, prev_frame, prev_p2, config=cfg)
-    if s1 == "attack_active":
-        attack_frames.add(i)
-    if s2 == "attack_active":
-        attack_frames.add(i)
-
-if not hits:
-    coverage = 0.0
-else:
-    covered = 0
-    for h in hits:
-        window = range(max(0, h-6), h+1)
-        if any(f in attack_frames for f in window):
-            covered += 1
-    coverage = covered / len(hits)
-
-attack_rate = len(attack_frames) / len(frames) if frames else 0
-
-report = {
-    "total_frames": len(frames),
-    "hits_count": len(hits),
-    "coverage": coverage,
-    "attack_rate": attack_rate,
-}
-
-os.makedirs("output", exist_ok=True)
-with open("output/validate_report.json", "w", encoding="utf-8") as f:
-    json.dump(report, f, indent=2)
-
-print(json.dumps(report, indent=2))
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="manifesto de vídeos (.json ou .txt); padrão: VIDEO")
+    parser.add_argument("--folds", type=int, default=FOLDS, help="k do k-fold (1 desativa)")
+    parser.add_argument("--no-lovo", action="store_true", help="não roda leave-one-video-out")
+    parser.add_argument("--workers", type=int, default=TUNE_WORKERS)
+    parser.add_argument("--max-frames", type=int, default=MAX_FRAMES, help="sem --corpus; 0 = vídeo inteiro")
+    args = parser.parse_args()
+    main(corpus=args.corpus, folds=args.folds, lovo=not args.no_lovo, workers=args.workers, max_frames=args.max_frames)
@@ -0,0 +1,75 @@
+"""Arrays numpy compartilhados entre processos via `multiprocessing.shared_memory`.
+
+`SharedArrays.create` copia um dict de arrays para um único bloco de memória
+compartilhada; `spec()` devolve uma descrição pequena e picklable (nome do
+bloco + layout) que os workers usam em `SharedArrays.attach` para obter views
+somente-leitura sem copiar nem serializar os dados.
+
+Uso:
+  with SharedArrays.create({"a": a, "b": b}) as shared:
+      pool = Pool(initializer=init, initargs=(shared.spec(),))
+      ...
+  # no worker:
+  shared = SharedArrays.attach(spec)
+  shared.arrays["a"]
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# alinhamento de cada array dentro do bloco (linha de cache)
+_ALIGN = 64
+
+
+class SharedArrays:
+    def __init__(self, shm, layout, owner):
+        self._shm = shm
+        self.layout = layout
+        self.owner = owner
+        self.arrays = {}
+        for key, dtype, shape, offset in layout:
+            arr = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            if not owner:
+                arr.flags.writeable = False
+            self.arrays[key] = arr
+
+    @classmethod
+    def create(cls, arrays):
+        layout = []
+        offset = 0
+        for key, arr in arrays.items():
+            arr = np.asarray(arr)
+            layout.append((key, arr.dtype.str, arr.shape, offset))
+            offset += -(-arr.nbytes // _ALIGN) * _ALIGN
+        # SharedMemory não aceita tamanho 0
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        shared = cls(shm, layout, owner=True)
+        for key, arr in arrays.items():
+            shared.arrays[key][...] = arr
+        return shared
+
+    @classmethod
+    def attach(cls, spec):
+        name, layout = spec
+        return cls(shared_memory.SharedMemory(name=name), layout, owner=False)
+
+    def spec(self):
+        return self._shm.name, self.layout
+
+    def close(self):
+        """Libera as views e fecha o bloco; o dono também o remove (`unlink`)."""
+
+        if self._shm is None:
+            return
+        self.arrays = {}
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
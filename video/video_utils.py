@@ -28,3 +28,51 @@ def write_frame(path: str, frame: Any) -> None:
     except Exception:
         # Falha silenciosa no MVP; chamador decide como lidar com erros
         pass
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """Hash SHA-256 do arquivo inteiro (lido em blocos)."""
+
+    import hashlib
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+
+def video_metadata(video_path: str, cap: Any = None, default_fps: float = 60.0, sha256: Any = None) -> dict:
+    """Metadados do vídeo: fps, contagem de frames, resolução e hash da fonte.
+
+    Se `cap` (um `cv2.VideoCapture` já aberto) for informado, ele é reutilizado
+    em vez de abrir o vídeo de novo. `fps` cai para `default_fps` quando o
+    container não informa um valor válido. `sha256` evita recalcular o hash
+    quando ele já é conhecido.
+    """
+
+    import cv2
+
+    own_cap = cap is None
+    if own_cap:
+        cap = cv2.VideoCapture(video_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        meta = {
+            "source": os.path.basename(video_path),
+            "fps": float(fps) if fps > 0 else float(default_fps),
+            "frame_count": int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0),
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0),
+        }
+    finally:
+        if own_cap:
+            cap.release()
+
+    if sha256 is None and os.path.exists(video_path):
+        sha256 = file_sha256(video_path)
+    meta["sha256"] = sha256
+    return meta
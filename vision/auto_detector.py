@@ -2,7 +2,7 @@ import cv2
 import numpy as np
 from typing import Optional, Tuple, List
 
-from .tracker import get_manager
+from .tracker import TrackerManager, get_manager
 
 
 class AutoDetector:
@@ -12,14 +12,20 @@ class AutoDetector:
     - escolhe as duas maiores regiões como jogadores
     - inicializa `vision.tracker.TrackerManager` automaticamente
     - usa trackers para retornar bboxes confiáveis a cada frame
+
+    Com `tracker` (backend, ver `vision.tracker.tracker_factory`) o detector usa
+    um `TrackerManager` próprio em vez do singleton de `get_manager`. Com
+    `executor` (ver `vision.players`) os trackers de p1 e p2 são atualizados em
+    paralelo.
     """
 
-    def __init__(self, min_area: int = 800, reinit_interval: int = 30):
+    def __init__(self, min_area: int = 800, reinit_interval: int = 30, tracker: Optional[str] = None, executor=None):
         self.backsub = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=16, detectShadows=True)
         self.min_area = min_area
         self.reinit_interval = reinit_interval
         self.frame_count = 0
-        self.mgr = get_manager()
+        self.mgr = get_manager() if tracker is None else TrackerManager(tracker)
+        self.executor = executor
 
     def _detect_moving(self, frame: np.ndarray) -> List[Tuple[int, int, int, int]]:
         # apply background subtractor
@@ -51,6 +57,21 @@ class AutoDetector:
         boxes.sort(key=lambda b: (b[2] - b[0]) * (b[3] - b[1]), reverse=True)
         return boxes
 
+    def warm_start(self, frames, p1_bbox, p2_bbox):
+        """Retoma o rastreamento no meio do vídeo (ex.: a partir de um checkpoint).
+
+        Aquece o MOG2 com `frames` (pre-roll imediatamente anterior ao ponto de
+        retomada) e reinicializa os trackers no último deles com as bboxes salvas.
+        """
+
+        last = None
+        for frame in frames:
+            self.backsub.apply(frame)
+            self.frame_count += 1
+            last = frame
+        if last is not None:
+            self.mgr.initialize(last, p1_bbox, p2_bbox)
+
     def process(self, frame: np.ndarray) -> Tuple[Tuple[int, int, int, int], Tuple[int, int, int, int]]:
         """Processa um frame e retorna `(p1_bbox, p2_bbox)` em formato xyxy.
 
@@ -61,7 +82,7 @@ class AutoDetector:
         self.frame_count += 1
 
         # if trackers exist, prefer tracker update
-        tb1, tb2 = self.mgr.update(frame)
+        tb1, tb2 = self.mgr.update(frame, executor=self.executor)
         # If trackers are alive, return their boxes (mgr.update falls back to last known)
         if self.mgr.trackers.get("p1") is not None or self.mgr.trackers.get("p2") is not None:
             return tb1, tb2
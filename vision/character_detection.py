@@ -19,7 +19,7 @@ def detect_characters(frame: np.ndarray, prev_frame: Optional[np.ndarray] = None
       template-matching local (procura a melhor correspondência próxima ao bbox anterior).
     - Caso contrário, retorna bboxes aproximadas fixas baseado na resolução.
 
-    Retorna `(p1_bbox, p2_bbox)` como tuplas (x, y, w, h).
+    Retorna `(p1_bbox, p2_bbox)` como tuplas (x1, y1, x2, y2).
     """
 
     h, w = frame.shape[:2]
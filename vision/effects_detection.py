@@ -92,43 +92,70 @@ Retorno:
 """
 
 
-def detect_effects(cur_frame, prev_frame, p1_bbox, p2_bbox, mean_diff_thresh=10.0, blur_ksize=None, morph_kernel=None, binary_thresh=None):
-    """
-    Detecta alterações visuais entre `prev_frame` e `cur_frame` nas ROIs fornecidas.
+def _preprocess_gray(gray, blur_k, bin_th, morph_k):
+    """Aplica blur, thresh e morph (opcionais) a uma imagem em cinza."""
 
-    - Calcula a diferença absoluta média (MAD) por ROI.
-    - Aplica pré-processamento opcional para reduzir falsos positivos.
+    g = gray
+    if blur_k:
+        g = cv2.GaussianBlur(g, (blur_k, blur_k), 0)
+    if bin_th is not None:
+        _, g = cv2.threshold(g, bin_th, 255, cv2.THRESH_BINARY)
+    if morph_k:
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (morph_k, morph_k))
+        g = cv2.morphologyEx(g, cv2.MORPH_OPEN, kernel)
+    return g
 
-    Uso típico: passar os bboxes de ambos personagens; a função retorna o
-    primeiro efeito detectado (prioriza `p1_bbox`) ou `None`.
+
+def _preprocess(img, blur_k, bin_th, morph_k):
+    """Prepara o frame (grayscale, blur, thresh, morph)."""
+
+    return _preprocess_gray(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), blur_k, bin_th, morph_k)
+
+
+def _prepare(img, blur_ksize, morph_kernel, binary_thresh):
+    # sem parâmetros "verdadeiros" -> só cinza
+    if blur_ksize or binary_thresh or morph_kernel:
+        return _preprocess(img, blur_ksize, binary_thresh, morph_kernel)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+def _roi_crop(img, rect, pad, blur_ksize, morph_kernel, binary_thresh):
+    """ROI `rect` pré-processada a partir de um recorte com margem `pad` (não o frame inteiro)."""
+
+    x, y, w, h = rect
+    if x < 0 or y < 0:
+        # fatiamento com índice negativo: replica a semântica no frame inteiro
+        return _prepare(img, blur_ksize, morph_kernel, binary_thresh)[y:y+h, x:x+w]
+    H, W = img.shape[:2]
+    px0, py0 = max(0, x - pad), max(0, y - pad)
+    px1, py1 = min(W, x + w + pad), min(H, y + h + pad)
+    region = _prepare(img[py0:py1, px0:px1], blur_ksize, morph_kernel, binary_thresh)
+    return region[y - py0:y - py0 + h, x - px0:x - px0 + w]
+
+
+def effect_mads(cur_frame, prev_frame, p1_bbox, p2_bbox, blur_ksize=None, morph_kernel=None, binary_thresh=None, roi_pad=None):
     """
+    MAD bruto entre `prev_frame` e `cur_frame` na ROI de cada bbox.
 
-    # função helper: prepara ROI (grayscale, blur, thresh, morph)
-    def preprocess(img, blur_k, bin_th, morph_k):
-        g = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        if blur_k:
-            g = cv2.GaussianBlur(g, (blur_k, blur_k), 0)
-        if bin_th is not None:
-            _, g = cv2.threshold(g, bin_th, 255, cv2.THRESH_BINARY)
-        if morph_k:
-            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (morph_k, morph_k))
-            g = cv2.morphologyEx(g, cv2.MORPH_OPEN, kernel)
-        return g
+    Retorna `[mad_p1_roi, mad_p2_roi]` (None quando a ROI é vazia/inválida ou
+    falta um dos frames). Não aplica `mean_diff_thresh`: ver `effects_from_mads`.
+
+    Com `roi_pad`, só recortes das ROIs com essa margem são pré-processados. O
+    resultado é idêntico ao do frame inteiro quando a margem cobre o suporte dos
+    filtros (`blur // 2 + 2 * (morph // 2)`; qualquer margem sem pré-processamento).
+    """
 
     # segurança: precisa de ambos os frames para calcular diferença
     if cur_frame is None or prev_frame is None:
-        return []
+        return [None, None]
 
     # aplica pré-processamento se configurado
-    if blur_ksize or binary_thresh or morph_kernel:
-        cur_p = preprocess(cur_frame, blur_ksize, binary_thresh, morph_kernel)
-        prev_p = preprocess(prev_frame, blur_ksize, binary_thresh, morph_kernel)
-    else:
-        cur_p = cv2.cvtColor(cur_frame, cv2.COLOR_BGR2GRAY)
-        prev_p = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
+    if roi_pad is None:
+        cur_p = _prepare(cur_frame, blur_ksize, morph_kernel, binary_thresh)
+        prev_p = _prepare(prev_frame, blur_ksize, morph_kernel, binary_thresh)
 
     # calcula diff e média nas regiões dos personagens
-    results = []
+    mads = []
     for bbox in (p1_bbox, p2_bbox):
         try:
             # expect bbox as xyxy (x1,y1,x2,y2)
@@ -136,23 +163,190 @@ def detect_effects(cur_frame, prev_frame, p1_bbox, p2_bbox, mean_diff_thresh=10.
             x, y = x1, y1
             w = max(1, x2 - x1)
             h = max(1, y2 - y1)
-            roi_cur = cur_p[y:y+h, x:x+w]
-            roi_prev = prev_p[y:y+h, x:x+w]
+            if roi_pad is None:
+                roi_cur = cur_p[y:y+h, x:x+w]
+                roi_prev = prev_p[y:y+h, x:x+w]
+            else:
+                roi_cur = _roi_crop(cur_frame, (x, y, w, h), roi_pad, blur_ksize, morph_kernel, binary_thresh)
+                roi_prev = _roi_crop(prev_frame, (x, y, w, h), roi_pad, blur_ksize, morph_kernel, binary_thresh)
             if roi_cur.size == 0 or roi_prev.size == 0:
-                results.append(None)
+                mads.append(None)
                 continue
-            mad = float(np.mean(np.abs(roi_cur.astype(float) - roi_prev.astype(float))))
-            if mad > mean_diff_thresh:
-                results.append({"conf": mad})
-            else:
-                results.append(None)
+            mads.append(float(np.mean(np.abs(roi_cur.astype(float) - roi_prev.astype(float)))))
         except Exception:
-            results.append(None)
+            mads.append(None)
+    return mads
+
 
-    # Converte os resultados em uma lista uniforme de efeitos compatível com o pipeline
+def effects_from_mads(mads, mean_diff_thresh=10.0):
+    """Converte os MADs de `effect_mads` na lista de efeitos do pipeline."""
+
+    # mudança forte na ROI do P1 indica hit no P2 (e vice-versa)
     out = []
-    if results[0]:
-        out.append({"type": "hitspark", "target": "p2", "confidence": results[0].get("conf")})
-    if results[1]:
-        out.append({"type": "hitspark", "target": "p1", "confidence": results[1].get("conf")})
+    if mads[0] is not None and mads[0] > mean_diff_thresh:
+        out.append({"type": "hitspark", "target": "p2", "confidence": mads[0]})
+    if mads[1] is not None and mads[1] > mean_diff_thresh:
+        out.append({"type": "hitspark", "target": "p1", "confidence": mads[1]})
     return out
+
+
+def detect_effects(cur_frame, prev_frame, p1_bbox, p2_bbox, mean_diff_thresh=10.0, blur_ksize=None, morph_kernel=None, binary_thresh=None):
+    """
+    Detecta alterações visuais entre `prev_frame` e `cur_frame` nas ROIs fornecidas.
+
+    - Calcula a diferença absoluta média (MAD) por ROI.
+    - Aplica pré-processamento opcional para reduzir falsos positivos.
+
+    Uso típico: passar os bboxes de ambos personagens; a função retorna o
+    primeiro efeito detectado (prioriza `p1_bbox`) ou `None`.
+
+    Equivale a `effects_from_mads(effect_mads(...), mean_diff_thresh)`.
+    """
+
+    mads = effect_mads(cur_frame, prev_frame, p1_bbox, p2_bbox, blur_ksize, morph_kernel, binary_thresh)
+    return effects_from_mads(mads, mean_diff_thresh)
+
+
+def hits_from_mads(mads, mean_diff_threshs):
+    """Para cada threshold, índices das linhas de `mads` (n, 2; NaN = sem ROI) com efeito."""
+
+    thr = np.asarray(mean_diff_threshs, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        hits = (np.asarray(mads)[:, :, None] > thr[None, None, :]).any(axis=1)  # (n, T)
+    return [np.flatnonzero(hits[:, t]) for t in range(len(thr))]
+
+
+def _roi_rect(bbox):
+    """Retângulo `(x, y, w, h)` usado por `effect_mads` para um bbox xyxy."""
+
+    x1, y1, x2, y2 = map(int, bbox)
+    return x1, y1, max(1, x2 - x1), max(1, y2 - y1)
+
+
+class EffectsSweep:
+    """
+    Varredura de parâmetros de `detect_effects` com intermediários compartilhados.
+
+    Para um conjunto fixo de frames e bboxes (ex.: a amostra do tuner):
+
+    - cada frame é convertido para cinza uma única vez;
+    - cada variante de pré-processamento (blur, binary_thresh, morph) é aplicada
+      só a recortes das ROIs, com margem suficiente para o suporte dos filtros,
+      reaproveitando prefixos (cinza -> blur -> threshold -> morph);
+    - os MADs por frame e jogador ficam memoizados por variante;
+    - todos os `mean_diff_thresh` são avaliados de uma vez com numpy.
+
+    O resultado é idêntico a chamar `detect_effects(frames[i], frames[i - 1],
+    *bboxes[i], ...)` para cada frame `i >= 1`.
+    """
+
+    def __init__(self, frames, bboxes):
+        self.frames = frames
+        self.bboxes = bboxes
+        self._gray = {}
+        self._mads = {}  # (blur, bin, morph) -> array (n, 2), NaN == sem ROI
+
+    @staticmethod
+    def _variant(blur_ksize, binary_thresh, morph_kernel):
+        # mesma regra de `effect_mads`: sem parâmetros "verdadeiros" -> só cinza
+        if not (blur_ksize or binary_thresh or morph_kernel):
+            return (None, None, None)
+        return (blur_ksize or None, binary_thresh, morph_kernel or None)
+
+    def _gray_frame(self, j):
+        g = self._gray.get(j)
+        if g is None:
+            g = self._gray[j] = cv2.cvtColor(self.frames[j], cv2.COLOR_BGR2GRAY)
+        return g
+
+    def _crops(self, j, rect, variants):
+        """Recortes pré-processados de `rect` no frame `j`, um por variante."""
+
+        gray = self._gray_frame(j)
+        x, y, w, h = rect
+        H, W = gray.shape[:2]
+        if x < 0 or y < 0:
+            # fatiamento com índice negativo: replica a semântica no frame inteiro
+            return {v: _preprocess_gray(gray, *v)[y:y+h, x:x+w] for v in variants}
+
+        pad = max(((v[0] or 0) // 2) + 2 * ((v[2] or 0) // 2) for v in variants) + 1
+        px0, py0 = max(0, x - pad), max(0, y - pad)
+        px1, py1 = min(W, x + w + pad), min(H, y + h + pad)
+        region = gray[py0:py1, px0:px1]
+        inner = (slice(y - py0, y - py0 + h), slice(x - px0, x - px0 + w))
+
+        out = {}
+        blurred, thresholded = {}, {}
+        for blur, bin_th, morph in variants:
+            if blur not in blurred:
+                blurred[blur] = cv2.GaussianBlur(region, (blur, blur), 0) if blur else region
+            key = (blur, bin_th)
+            if key not in thresholded:
+                thresholded[key] = cv2.threshold(blurred[blur], bin_th, 255, cv2.THRESH_BINARY)[1] if bin_th is not None else blurred[blur]
+            g = thresholded[key]
+            if morph:
+                kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (morph, morph))
+                g = cv2.morphologyEx(g, cv2.MORPH_OPEN, kernel)
+            out[(blur, bin_th, morph)] = g[inner]
+        return out
+
+    def prepare(self, variants):
+        """Calcula (uma passada pelos frames) os MADs das variantes ainda não memoizadas."""
+
+        variants = [v for v in dict.fromkeys(self._variant(*v) for v in variants) if v not in self._mads]
+        if not variants:
+            return
+
+        n = len(self.frames)
+        mads = {v: np.full((n, 2), np.nan) for v in variants}
+        for i in range(1, n):
+            for k, bbox in enumerate(self.bboxes[i][:2]):
+                try:
+                    rect = _roi_rect(bbox)
+                except Exception:
+                    continue
+                cur = self._crops(i, rect, variants)
+                prev = self._crops(i - 1, rect, variants)
+                for v in variants:
+                    roi_cur, roi_prev = cur[v], prev[v]
+                    if roi_cur.size == 0 or roi_prev.size == 0:
+                        continue
+                    mads[v][i, k] = float(np.mean(np.abs(roi_cur.astype(float) - roi_prev.astype(float))))
+            # o frame i - 1 não é mais usado como "anterior"
+            self._gray.pop(i - 1, None)
+        self._gray.clear()
+        self._mads.update(mads)
+
+    def mads(self, blur_ksize=None, binary_thresh=None, morph_kernel=None):
+        """MADs `(n, 2)` (colunas: ROI de P1, ROI de P2) da variante; NaN sem ROI/no frame 0."""
+
+        v = self._variant(blur_ksize, binary_thresh, morph_kernel)
+        self.prepare([v])
+        return self._mads[v]
+
+    def hit_frames(self, mean_diff_threshs, blur_ksize=None, binary_thresh=None, morph_kernel=None):
+        """Para cada threshold, índices dos frames em que `detect_effects` retornaria efeitos."""
+
+        mads = self.mads(blur_ksize, binary_thresh, morph_kernel)
+        return [h.tolist() for h in hits_from_mads(mads, mean_diff_threshs)]
+
+    def sweep(self, mean_diff_threshs, blur_ksizes, morph_kernels, binary_thresholds):
+        """Candidatos na ordem de `itertools.product(thresh, blur, morph, bin)`.
+
+        Cada candidato: `{"mean_diff_thresh", "blur", "morph", "bin", "hits_count", "hits"}`.
+        """
+
+        variants = [(b, t, m) for b in blur_ksizes for t in binary_thresholds for m in morph_kernels]
+        self.prepare(variants)
+        by_variant = {v: self.hit_frames(mean_diff_threshs, *v) for v in variants}
+
+        candidates = []
+        for ti, thresh in enumerate(mean_diff_threshs):
+            for blur in blur_ksizes:
+                for morph in morph_kernels:
+                    for bin_th in binary_thresholds:
+                        hits = by_variant[(blur, bin_th, morph)][ti]
+                        candidates.append({"mean_diff_thresh": thresh, "blur": blur, "morph": morph, "bin": bin_th,
+                                           "hits_count": len(hits), "hits": hits})
+        return candidates
+
@@ -0,0 +1,181 @@
+"""Medições de visão por frame em processos, com os frames num anel de shared memory.
+
+As medições de um frame (features das ROIs, MADs de efeitos, sinais de jogo)
+não têm estado: dependem só do frame, do frame anterior e das bboxes. Boa
+parte delas é glue Python/NumPy que segura o GIL, então threads não escalam;
+`MeasurePool` roda `measure_frame` num pool de processos
+(`concurrent.futures.ProcessPoolExecutor`).
+
+Os frames não são serializados: o processo principal copia cada frame para um
+slot de `FrameRing` (`video.shared_memory.SharedArrays`) e a mensagem para o
+worker é só `(slot, slot anterior, bboxes, bboxes anteriores, sinais?)`. O
+worker lê views somente-leitura dos dois slots e devolve os resultados
+compactos (`StateFeatures`, MADs, sinais).
+
+Um slot só é reescrito `slots` frames depois; quem chama garante que nunca há
+mais de `slots - 2` frames enviados e ainda não coletados (o anel também guarda
+o frame anterior do mais antigo). No pipeline de `main.run`, com `submit` e
+`collect` em estágios consecutivos, isso vale com `slots >= maxsize + 3`.
+
+Os workers vêm de um contexto `forkserver` (`spawn` onde não existe): quem
+cria o pool normalmente já tem threads rodando (OpenCV, `vision.players`,
+estágios do pipeline), e um `fork` desse processo pode deixar locks presos nos
+filhos. Mesmo assim, `main.run` inicia o pool (`start`) antes das threads do
+pipeline, para o custo de subir os workers não cair dentro do estágio.
+
+Se um worker morre (OOM, segfault no OpenCV), o executor fica quebrado e
+`result()` de cada medição pendente levanta `BrokenProcessPool` em vez de
+esperar para sempre (um `multiprocessing.Pool` troca o worker em silêncio e
+descarta a tarefa dele); no `main.run` isso derruba o estágio e segue o
+caminho de abort.
+
+Uso:
+  pool = MeasurePool(workers, slots, effects, roi_pad)
+  pool.start(first_frame)  # opcional: senão, no primeiro `submit`/`prime`
+  pending = pool.submit(frame, bboxes, prev_bboxes, game_signals=True)
+  p1_features, p2_features, mads, signals = pending.result()
+  pool.close()
+"""
+
+import multiprocessing
+import signal
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import numpy as np
+
+from video.shared_memory import SharedArrays
+from vision.effects_detection import effect_mads
+from vision.game_state import game_state_signals
+from vision.players import per_player
+from vision.state_detection import compute_state_features
+
+# contexto dos processos do pool (ver docstring do módulo)
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def measure_frame(frame, prev_frame, bboxes, prev_bboxes, game_signals, effects, roi_pad=None, executor=None):
+    """`(p1_features, p2_features, effect_mads, sinais de jogo)` de um frame.
+
+    Os sinais de jogo só são calculados com `game_signals=True` (None caso
+    contrário). `executor` paraleliza as features de p1/p2 (`vision.players`).
+    """
+
+    signals = game_state_signals(frame, prev_frame) if game_signals else None
+    # estatísticas de ROI usando histórico (jump/drive/movimento), um jogador por thread
+    p1_features, p2_features = per_player(
+        compute_state_features, [(frame, bboxes[0], prev_frame, prev_bboxes[0]), (frame, bboxes[1], prev_frame, prev_bboxes[1])],
+        executor)
+    # diferença entre frames nas ROIs (hitsparks)
+    mads = effect_mads(frame, prev_frame, bboxes[0], bboxes[1], **effects, roi_pad=roi_pad)
+    return p1_features, p2_features, mads, signals
+
+
+class FrameRing:
+    """Anel de `slots` frames de mesmo formato em shared memory (escrito só pelo dono)."""
+
+    def __init__(self, slots, shape, dtype=np.uint8):
+        self.slots = slots
+        self.shared = SharedArrays.create({"frames": np.zeros((slots,) + tuple(shape), dtype=dtype)})
+        self.frames = self.shared.arrays["frames"]
+        self._next = 0
+
+    def put(self, frame):
+        """Copia `frame` para o próximo slot; retorna o índice do slot."""
+
+        if frame.shape != self.frames.shape[1:] or frame.dtype != self.frames.dtype:
+            raise ValueError(f"frame {frame.shape}/{frame.dtype} does not fit ring of {self.frames.shape[1:]}/{self.frames.dtype}")
+        slot = self._next
+        self.frames[slot] = frame
+        self._next = (slot + 1) % self.slots
+        return slot
+
+    def spec(self):
+        return self.shared.spec()
+
+    def close(self):
+        self.frames = None
+        self.shared.close()
+
+
+# estado de cada worker do pool (preenchido por `_init_worker`)
+_worker = {}
+
+
+def _init_worker(spec, effects, roi_pad):
+    # Ctrl+C é tratado pelo processo pai, que encerra o pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    shared = SharedArrays.attach(spec)
+    _worker.update(shared=shared, frames=shared.arrays["frames"], effects=effects, roi_pad=roi_pad)
+
+
+def _ready():
+    return True
+
+
+def _measure_slot(msg):
+    slot, prev_slot, bboxes, prev_bboxes, game_signals = msg
+    frames = _worker["frames"]
+    prev_frame = frames[prev_slot] if prev_slot is not None else None
+    return measure_frame(frames[slot], prev_frame, bboxes, prev_bboxes, game_signals, _worker["effects"], _worker["roi_pad"])
+
+
+class MeasurePool:
+    """
+    `measure_frame` em `workers` processos, frames via `FrameRing`.
+
+    O anel e o pool são criados em `start` (o formato vem do frame) ou, no
+    máximo, no primeiro frame enviado. `submit` devolve um `Future`; os
+    resultados de `result()` são os mesmos de `measure_frame` no processo
+    principal.
+    """
+
+    def __init__(self, workers, slots, effects, roi_pad=None):
+        if slots < 3:
+            raise ValueError("the frame ring needs at least 3 slots")
+        self.workers = workers
+        self.slots = slots
+        self.effects = dict(effects)
+        self.roi_pad = roi_pad
+        self._ring = None
+        self._pool = None
+        self._prev_slot = None
+
+    def start(self, frame):
+        """Cria o anel (formato de `frame`) e sobe os workers; não faz nada se já iniciado."""
+
+        if self._ring is not None:
+            return
+        self._ring = FrameRing(self.slots, frame.shape, frame.dtype)
+        self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(START_METHOD),
+                                         initializer=_init_worker, initargs=(self._ring.spec(), self.effects, self.roi_pad))
+        # o executor sobe os processos sob demanda: uma tarefa vazia por worker os sobe já
+        wait([self._pool.submit(_ready) for _ in range(self.workers)])
+
+    def prime(self, frame):
+        """Grava `frame` como frame anterior do próximo `submit` (ex.: último frame do pre-roll)."""
+
+        self.start(frame)
+        self._prev_slot = self._ring.put(frame)
+
+    def submit(self, frame, bboxes, prev_bboxes, game_signals):
+        self.start(frame)
+        slot = self._ring.put(frame)
+        pending = self._pool.submit(_measure_slot, (slot, self._prev_slot, tuple(bboxes), tuple(prev_bboxes), game_signals))
+        self._prev_slot = slot
+        return pending
+
+    def close(self, abort=False):
+        """Encerra o pool (`abort=True` descarta o que estiver pendente) e remove o anel."""
+
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=abort)
+            self._pool = None
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(abort=exc_type is not None)
@@ -0,0 +1,58 @@
+"""Trabalho de visão por jogador (p1/p2) em paralelo.
+
+Dentro de um frame, o trabalho de cada jogador (update do tracker e
+recuperação por template, features da ROI) não depende do outro jogador. As
+chamadas do OpenCV/NumPy liberam o GIL, então os dois lados podem rodar ao
+mesmo tempo: `per_player` executa o primeiro item na thread de quem chamou e
+os demais no pool de `get_player_pool`.
+
+Os resultados voltam sempre na ordem dos itens (determinístico, igual à versão
+sequencial). Com `on_error`, a exceção de um item vira `on_error(índice, exc)`
+só para aquele item; sem ele, a primeira exceção (na ordem dos itens) é
+relançada.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# threads do pool; o primeiro jogador roda na thread de quem chamou, então uma
+# thread por estágio que usa o pool (rastreamento e medição) basta; < 1 desliga
+# o pool. Lido na criação do pool (primeira chamada de `get_player_pool`).
+PLAYER_WORKERS = 2
+
+_POOL = None
+
+
+def get_player_pool():
+    """Pool compartilhado para `per_player`; None com `PLAYER_WORKERS < 1` (tudo sequencial)."""
+
+    global _POOL
+    if PLAYER_WORKERS < 1:
+        return None
+    if _POOL is None:
+        _POOL = ThreadPoolExecutor(max_workers=PLAYER_WORKERS, thread_name_prefix="player")
+    return _POOL
+
+
+def per_player(fn, items, executor=None, on_error=None):
+    """`[fn(*args) for args in items]`, com os itens após o primeiro em `executor` (se houver)."""
+
+    def call(i, args):
+        try:
+            return fn(*args)
+        except Exception as exc:
+            if on_error is None:
+                raise
+            return on_error(i, exc)
+
+    items = list(items)
+    if executor is None or len(items) < 2:
+        return [call(i, args) for i, args in enumerate(items)]
+
+    futures = [executor.submit(call, i, args) for i, args in enumerate(items[1:], start=1)]
+    try:
+        first = call(0, items[0])
+    except BaseException:
+        # não deixa trabalho do frame rodando em segundo plano
+        wait(futures)
+        raise
+    return [first] + [f.result() for f in futures]
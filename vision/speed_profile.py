@@ -0,0 +1,86 @@
+"""Perfis de velocidade do estágio de visão.
+
+Um `SpeedProfile` reúne os knobs que trocam qualidade por throughput:
+
+- `scale`: fator de redução do frame entregue ao detector/tracker (as bboxes
+  voltam para a resolução original; features, efeitos e sinais de jogo são
+  medidos no frame inteiro)
+- `tracker`: backend do `TrackerManager` ("csrt", "kcf", "mosse", "mil" ou
+  "none" = só detecção por movimento)
+- `track_every`: cadência do detector/tracker; nos frames intermediários as
+  bboxes do último frame rastreado são repetidas
+- `game_state_every`: cadência de `game_state_signals`; nos frames
+  intermediários os sinais anteriores são repetidos
+- `effects_roi_pad`: None pré-processa o frame inteiro em `effect_mads`; um
+  inteiro pré-processa só recortes das ROIs com essa margem (igual ao frame
+  inteiro quando a margem cobre o suporte dos filtros)
+
+O perfil padrão reproduz o pipeline de qualidade máxima. Perfis nomeados ficam
+em `PROFILE_DIR/<nome>.json` (ver `tools/autotune_speed.py`) e são carregados
+por `main.run(profile=...)`.
+"""
+
+import json
+import os
+from dataclasses import asdict, dataclass, fields
+
+PROFILE_DIR = "output/profiles"
+
+TRACKER_BACKENDS = ("csrt", "kcf", "mosse", "mil", "none")
+
+
+@dataclass
+class SpeedProfile:
+    name: str = "full"
+    scale: float = 1.0
+    tracker: str = "csrt"
+    track_every: int = 1
+    game_state_every: int = 1
+    effects_roi_pad: int = None
+
+    def __post_init__(self):
+        if self.tracker not in TRACKER_BACKENDS:
+            raise ValueError(f"unknown tracker backend {self.tracker!r} (expected one of {TRACKER_BACKENDS})")
+        if not 0 < self.scale <= 1:
+            raise ValueError(f"scale must be in (0, 1], got {self.scale}")
+        if self.track_every < 1 or self.game_state_every < 1:
+            raise ValueError("track_every and game_state_every must be >= 1")
+
+    def knobs(self):
+        """Knobs sem o nome: o que altera as saídas de visão (entra na chave do cache)."""
+
+        return {k: v for k, v in asdict(self).items() if k != "name"}
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, d):
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in d.items() if k in names})
+
+
+def profile_path(name, directory=PROFILE_DIR):
+    return os.path.join(directory, f"{name}.json")
+
+
+def save_speed_profile(profile, directory=PROFILE_DIR, extra=None):
+    """Grava `<directory>/<nome>.json`; `extra` (ex.: medições do autotuner) vai junto no arquivo."""
+
+    path = profile_path(profile.name, directory)
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({**profile.to_dict(), **(extra or {})}, f, indent=2)
+    return path
+
+
+def load_speed_profile(profile, directory=PROFILE_DIR):
+    """`SpeedProfile` a partir de um perfil, um caminho `.json` ou um nome em `directory` (None = padrão)."""
+
+    if profile is None:
+        return SpeedProfile()
+    if isinstance(profile, SpeedProfile):
+        return profile
+    path = profile if profile.endswith(".json") else profile_path(profile, directory)
+    with open(path, "r", encoding="utf-8") as f:
+        return SpeedProfile.from_dict(json.load(f))
@@ -13,7 +13,7 @@ etapa de análise que agrupa janelas de ataque e gera eventos.
 import json
 import os
 import numpy as np
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from typing import Optional
 
 
@@ -29,106 +29,198 @@ class StateDetectorConfig:
     motion_thresh: float = 5.0  # mean absolute diff threshold within bbox to consider motion
 
 
-def detect_state(frame, bbox, prev_frame=None, prev_bbox=None, config: Optional[StateDetectorConfig] = None):
+@dataclass
+class StateFeatures:
     """
-    Determina o estado do personagem em um frame.
-
-    Parâmetros
-    - frame: frame atual (imagem BGR numpy)
-    - bbox: tupla (x1,y1,x2,y2) definindo a região do personagem
-    - prev_frame: frame anterior (opcional), usado para calcular movimento
-    - prev_bbox: bbox anterior (opcional), usado para detectar mudanças de posição
-    - config: instância de `StateDetectorConfig` com thresholds de leitura
-
-    Retorna
-    - string representando o estado: 'neutral', 'attack_active', 'jump', 'drive', 'block'
+    Estatísticas brutas da ROI de um personagem (independentes de thresholds).
+
+    - `valid`: False quando a ROI é vazia (estado vira 'neutral')
+    - `h`, `w`, `area`: dimensões do bbox atual
+    - `mean_color`: média dos pixels da ROI
+    - `dcy`: `prev_cy - cur_cy` (positivo = subiu); NaN sem bbox anterior
+    - `dcx`: `cur_cx - prev_cx`; NaN sem bbox anterior
+    - `mad`: diferença absoluta média da ROI contra o frame anterior (0.0 sem histórico)
+    - `has_prev_frame`: havia frame anterior
     """
 
-    if config is None:
-        # prefer a persisted tuned config if available
-        try:
-            from vision import tuned_state_config
-
-            config = tuned_state_config.get_default_config()
-        except Exception:
-            # fallback to reading the tuning report at runtime
-            cfg_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "output", "tuning_report.json")
-            try:
-                with open(cfg_path, "r") as f:
-                    data = json.load(f)
-                top = data.get("results", [])[0] if data.get("results") else None
-                if top and "config" in top:
-                    c = top["config"]
-                    config = StateDetectorConfig(
-                        area_attack_threshold=c.get("area_t", StateDetectorConfig.area_attack_threshold),
-                        area_attack_fallback=c.get("area_fb", StateDetectorConfig.area_attack_fallback),
-                        mean_color_block_threshold=c.get("mean_c", StateDetectorConfig.mean_color_block_threshold),
-                        jump_cy_delta=c.get("jump_delta", StateDetectorConfig.jump_cy_delta),
-                        drive_cx_delta_factor=c.get("drive_factor", StateDetectorConfig.drive_cx_delta_factor),
-                    )
-                else:
-                    config = StateDetectorConfig()
-            except Exception:
-                config = StateDetectorConfig()
+    valid: bool = False
+    h: int = 0
+    w: int = 0
+    area: int = 0
+    mean_color: float = 0.0
+    dcy: float = float("nan")
+    dcx: float = float("nan")
+    mad: float = 0.0
+    has_prev_frame: bool = False
+
+
+def load_state_config() -> StateDetectorConfig:
+    """Config padrão: `tuned_state_config`, senão o topo de `output/tuning_report.json`."""
+
+    # prefer a persisted tuned config if available
+    try:
+        from vision import tuned_state_config
+
+        return tuned_state_config.get_default_config()
+    except Exception:
+        pass
+
+    # fallback to reading the tuning report at runtime
+    cfg_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "output", "tuning_report.json")
+    try:
+        with open(cfg_path, "r") as f:
+            data = json.load(f)
+        top = data.get("results", [])[0] if data.get("results") else None
+        if top and "config" in top:
+            c = top["config"]
+            return StateDetectorConfig(
+                area_attack_threshold=c.get("area_t", StateDetectorConfig.area_attack_threshold),
+                area_attack_fallback=c.get("area_fb", StateDetectorConfig.area_attack_fallback),
+                mean_color_block_threshold=c.get("mean_c", StateDetectorConfig.mean_color_block_threshold),
+                jump_cy_delta=c.get("jump_delta", StateDetectorConfig.jump_cy_delta),
+                drive_cx_delta_factor=c.get("drive_factor", StateDetectorConfig.drive_cx_delta_factor),
+            )
+    except Exception:
+        pass
+    return StateDetectorConfig()
+
+
+def compute_state_features(frame, bbox, prev_frame=None, prev_bbox=None) -> StateFeatures:
+    """Extrai as estatísticas da ROI usadas por `classify_state`."""
 
     x1, y1, x2, y2 = bbox
     roi = frame[y1:y2, x1:x2]  # Região do personagem
 
-    # Safety: se ROI inválida/ vazia, retorna neutral
+    # Safety: se ROI inválida/ vazia, retorna features inválidas (neutral)
     if roi.size == 0:
-        return "neutral"
+        return StateFeatures(has_prev_frame=prev_frame is not None)
 
     h = y2 - y1
     w = x2 - x1
-    area = h * w
-    mean_color = float(np.mean(roi))
+    feats = StateFeatures(
+        valid=True,
+        h=h,
+        w=w,
+        area=h * w,
+        mean_color=float(np.mean(roi)),
+        has_prev_frame=prev_frame is not None,
+    )
 
-    # Detect jump via comparação de posição vertical do bbox com o anterior
     if prev_bbox is not None:
-        _, py1, _, py2 = prev_bbox
-        prev_cy = (py1 + py2) / 2
-        cur_cy = (y1 + y2) / 2
-        if prev_cy - cur_cy > max(config.jump_cy_min, config.jump_cy_delta * h):
-            return "jump"
+        px1, py1, px2, py2 = prev_bbox
+        feats.dcy = (py1 + py2) / 2 - (y1 + y2) / 2
+        feats.dcx = (x1 + x2) / 2 - (px1 + px2) / 2
+
+    # movimento local (diferença em relação ao prev_frame)
+    if prev_frame is not None and prev_bbox is not None:
+        try:
+            # compute mean absolute diff in ROI
+            prev_x1, prev_y1, prev_x2, prev_y2 = prev_bbox
+            prev_roi = prev_frame[prev_y1:prev_y2, prev_x1:prev_x2]
+            # align sizes (in case bbox changed slightly)
+            if prev_roi.shape == roi.shape:
+                feats.mad = float(np.mean(np.abs(roi.astype(float) - prev_roi.astype(float))))
+            else:
+                feats.mad = float(np.mean(np.abs(roi.astype(float) - np.mean(prev_roi, axis=(0, 1)))))
+        except Exception:
+            feats.mad = 0.0
+
+    return feats
+
+
+def classify_state(feats: StateFeatures, config: StateDetectorConfig) -> str:
+    """Aplica os thresholds de `config` às features (mesma ordem de `detect_state`)."""
+
+    if not feats.valid:
+        return "neutral"
+
+    # Detect jump via comparação de posição vertical do bbox com o anterior
+    # (comparações com NaN são falsas: sem bbox anterior não há jump/drive)
+    if feats.dcy > max(config.jump_cy_min, config.jump_cy_delta * feats.h):
+        return "jump"
 
     # Heurísticas simples (ordenadas por sinal claro)
-    # Requer movimento local (diferença em relação ao prev_frame) para reduzir falsos positivos
-    if area > config.area_attack_threshold:
-        if prev_frame is not None and prev_bbox is not None:
-            try:
-                # compute mean absolute diff in ROI
-                prev_x1, prev_y1, prev_x2, prev_y2 = prev_bbox
-                prev_roi = prev_frame[prev_y1:prev_y2, prev_x1:prev_x2]
-                # align sizes (in case bbox changed slightly)
-                if prev_roi.shape == roi.shape:
-                    mad = float(np.mean(np.abs(roi.astype(float) - prev_roi.astype(float))))
-                else:
-                    mad = float(np.mean(np.abs(roi.astype(float) - np.mean(prev_roi, axis=(0, 1)))))
-            except Exception:
-                mad = 0.0
-        else:
-            mad = 0.0
-
-        if mad > config.motion_thresh:
-            return "attack_active"
-
-    if mean_color < config.mean_color_block_threshold:
+    # Requer movimento local para reduzir falsos positivos
+    if feats.area > config.area_attack_threshold and feats.mad > config.motion_thresh:
+        return "attack_active"
+
+    if feats.mean_color < config.mean_color_block_threshold:
         return "block"
 
     # Heurística simples para 'drive' (movimento horizontal brusco)
-    if prev_bbox is not None:
-        px1, _, px2, _ = prev_bbox
-        prev_cx = (px1 + px2) / 2
-        cur_cx = (x1 + x2) / 2
-        if abs(cur_cx - prev_cx) > max(config.drive_cx_min, config.drive_cx_delta_factor * w):
-            return "drive"
+    if abs(feats.dcx) > max(config.drive_cx_min, config.drive_cx_delta_factor * feats.w):
+        return "drive"
 
     # DEBUG fallback: força ataque para validar pipeline (use com cuidado)
-    if area > config.area_attack_fallback and prev_frame is None:
+    if feats.area > config.area_attack_fallback and not feats.has_prev_frame:
         return "attack_active"
 
     return "neutral"
 
 
+# códigos de estado de `classify_state_batch` (mesmos de `models.timeline.STATE_NAMES`)
+STATE_NEUTRAL, STATE_ATTACK, STATE_JUMP, STATE_DRIVE, STATE_BLOCK = range(5)
+
+
+def stack_state_features(feats_list):
+    """Empilha uma sequência de `StateFeatures` em um dict de arrays numpy (1 linha por frame)."""
+
+    return {
+        f.name: np.asarray([getattr(ft, f.name) for ft in feats_list], dtype=f.type)
+        for f in fields(StateFeatures)
+    }
+
+
+def classify_state_batch(table, config: StateDetectorConfig):
+    """
+    Versão vetorizada de `classify_state` sobre uma tabela de features.
+
+    - table: dict de arrays (n,) como o de `stack_state_features`
+    - config: `StateDetectorConfig`; cada campo pode ser escalar ou array
+      (ex.: formato (k, 1) para avaliar k configs de uma vez)
+
+    Retorna códigos int8 (`STATE_*`) com o formato do broadcast entre
+    features e config, aplicando as regras na mesma ordem de `classify_state`.
+    """
+
+    valid = table["valid"]
+    h, w, area = table["h"], table["w"], table["area"]
+    with np.errstate(invalid="ignore"):
+        jump = table["dcy"] > np.maximum(config.jump_cy_min, config.jump_cy_delta * h)
+        attack = (area > config.area_attack_threshold) & (table["mad"] > config.motion_thresh)
+        block = table["mean_color"] < config.mean_color_block_threshold
+        drive = np.abs(table["dcx"]) > np.maximum(config.drive_cx_min, config.drive_cx_delta_factor * w)
+    fallback = (area > config.area_attack_fallback) & ~table["has_prev_frame"]
+
+    # np.select escolhe a primeira condição verdadeira -> mesma precedência
+    conditions = [~valid, jump, attack, block, drive, fallback]
+    choices = [STATE_NEUTRAL, STATE_JUMP, STATE_ATTACK, STATE_BLOCK, STATE_DRIVE, STATE_ATTACK]
+    shape = np.broadcast_shapes(*(np.shape(c) for c in conditions))
+    conditions = [np.broadcast_to(c, shape) for c in conditions]
+    return np.select(conditions, choices, default=STATE_NEUTRAL).astype(np.int8)
+
+
+def detect_state(frame, bbox, prev_frame=None, prev_bbox=None, config: Optional[StateDetectorConfig] = None):
+    """
+    Determina o estado do personagem em um frame.
+
+    Parâmetros
+    - frame: frame atual (imagem BGR numpy)
+    - bbox: tupla (x1,y1,x2,y2) definindo a região do personagem
+    - prev_frame: frame anterior (opcional), usado para calcular movimento
+    - prev_bbox: bbox anterior (opcional), usado para detectar mudanças de posição
+    - config: instância de `StateDetectorConfig` com thresholds de leitura
+
+    Retorna
+    - string representando o estado: 'neutral', 'attack_active', 'jump', 'drive', 'block'
+
+    Equivale a `classify_state(compute_state_features(...), config)`.
+    """
+
+    if config is None:
+        config = load_state_config()
+    return classify_state(compute_state_features(frame, bbox, prev_frame, prev_bbox), config)
+
+
 def can_act(state):
     return state == "neutral"
@@ -1,4 +1,4 @@
-"""Gerencia trackers por jogador usando OpenCV CSRT quando disponível.
+"""Gerencia trackers por jogador usando OpenCV CSRT (ou outro backend) quando disponível.
 
 Fornece inicialização e atualização simples para obter bboxes estáveis entre frames.
 Se o CSRT não estiver disponível ou o tracker falhar, o manager retorna None
@@ -7,9 +7,33 @@ para aquela bbox e o chamador pode aplicar fallback (ex.: template-matching).
 from typing import Tuple, Optional
 import cv2
 
+from .players import per_player
+
+
+# backend -> nome da factory no OpenCV (`cv2` ou `cv2.legacy`)
+_FACTORIES = {
+    "csrt": "TrackerCSRT_create",
+    "kcf": "TrackerKCF_create",
+    "mosse": "TrackerMOSSE_create",
+    "mil": "TrackerMIL_create",
+}
+
+
+def tracker_factory(backend="csrt"):
+    """Factory do tracker `backend` (ver `vision.speed_profile.TRACKER_BACKENDS`); None se indisponível."""
+
+    name = _FACTORIES.get(backend)
+    if name is None:
+        return None
+    for module in (cv2, getattr(cv2, "legacy", None)):
+        create = getattr(module, name, None)
+        if create is not None:
+            return create
+    return None
+
 
 class TrackerManager:
-    def __init__(self):
+    def __init__(self, backend="csrt"):
         # trackers por jogador: 'p1', 'p2'
         self.trackers = {"p1": None, "p2": None}
         self.last_bboxes = {"p1": None, "p2": None}
@@ -19,15 +43,14 @@ class TrackerManager:
         # store last frame for template-based recovery
         self._last_frame = None
 
-        # criar factory de tracker com fallback
-        try:
-            self._create = cv2.TrackerCSRT_create
-            # note: algumas builds usam cv2.legacy.TrackerCSRT_create
-        except Exception:
-            try:
-                self._create = cv2.legacy.TrackerCSRT_create  # type: ignore[attr-defined]
-            except Exception:
-                self._create = None
+        # criar factory de tracker com fallback (algumas builds só têm cv2.legacy)
+        self.backend = backend
+        self._create = tracker_factory(backend)
+
+    @property
+    def available(self):
+        """True se o OpenCV tem o backend; senão só há o fallback por template."""
+        return self._create is not None
 
     def initialize(self, frame, p1_bbox, p2_bbox):
         """Inicializa trackers para ambos os jogadores com as bboxes (x,y,w,h)."""
@@ -68,69 +91,15 @@ class TrackerManager:
             self.trackers = {"p1": None, "p2": None}
             self.last_bboxes = {"p1": p1_bbox, "p2": p2_bbox}
 
-    def update(self, frame) -> Tuple[Optional[Tuple[int, int, int, int]], Optional[Tuple[int, int, int, int]]]:
-        """Atualiza ambos os trackers; retorna bboxes (x,y,w,h) ou None para cada jogador."""
-        out1 = None
-        out2 = None
-        try:
-            t1 = self.trackers.get("p1")
-            t2 = self.trackers.get("p2")
-            if t1 is not None:
-                ok, box = t1.update(frame)
-                if ok:
-                    # box is (x,y,w,h) from tracker -> convert to xyxy
-                    bx, by, bw, bh = map(int, box)
-                    out1 = (bx, by, bx + bw, by + bh)
-                    self.last_bboxes["p1"] = out1
-                    self._fail_counts["p1"] = 0
-                else:
-                    self._fail_counts["p1"] += 1
-                    if self._fail_counts["p1"] >= self._max_fail:
-                        # mark tracker as dead
-                        self.trackers["p1"] = None
-                    else:
-                        # quick recovery attempt using template-match from last_frame
-                        recovered = self._attempt_recover("p1", frame)
-                        if recovered is not None:
-                            out1 = recovered
-                            self.last_bboxes["p1"] = out1
-                            self._fail_counts["p1"] = 0
-                            try:
-                                # re-init tracker with recovered bbox
-                                if self._create is not None:
-                                    tnew = self._create()
-                                    x1, y1, x2, y2 = map(int, out1)
-                                    tnew.init(frame, (x1, y1, x2 - x1, y2 - y1))
-                                    self.trackers["p1"] = tnew
-                            except Exception:
-                                pass
-            if t2 is not None:
-                ok2, box2 = t2.update(frame)
-                if ok2:
-                    bx2, by2, bw2, bh2 = map(int, box2)
-                    out2 = (bx2, by2, bx2 + bw2, by2 + bh2)
-                    self.last_bboxes["p2"] = out2
-                    self._fail_counts["p2"] = 0
-                else:
-                    self._fail_counts["p2"] += 1
-                    if self._fail_counts["p2"] >= self._max_fail:
-                        self.trackers["p2"] = None
-                    else:
-                        recovered2 = self._attempt_recover("p2", frame)
-                        if recovered2 is not None:
-                            out2 = recovered2
-                            self.last_bboxes["p2"] = out2
-                            self._fail_counts["p2"] = 0
-                            try:
-                                if self._create is not None:
-                                    tnew2 = self._create()
-                                    x1, y1, x2, y2 = map(int, out2)
-                                    tnew2.init(frame, (x1, y1, x2 - x1, y2 - y1))
-                                    self.trackers["p2"] = tnew2
-                            except Exception:
-                                pass
-        except Exception:
-            return self.last_bboxes.get("p1"), self.last_bboxes.get("p2")
+    def update(self, frame, executor=None) -> Tuple[Optional[Tuple[int, int, int, int]], Optional[Tuple[int, int, int, int]]]:
+        """Atualiza ambos os trackers; retorna bboxes (x,y,w,h) ou None para cada jogador.
+
+        Os jogadores são independentes: com `executor` (ver `vision.players`) os
+        dois lados rodam em paralelo, e uma exceção em um lado só faz aquele
+        lado voltar para a última bbox conhecida.
+        """
+        out1, out2 = per_player(self._update_side, [("p1", frame), ("p2", frame)], executor,
+                                on_error=lambda i, exc: None)
 
         # detect and correct large sudden jumps (smooth positions)
         def smooth(prev_box, new_box):
@@ -180,6 +149,45 @@ class TrackerManager:
 
         return out1, out2
 
+    def _update_side(self, side: str, frame):
+        """Update do tracker de `side` (com recuperação por template); None se falhou.
+
+        Só lê/escreve o estado de `side` (e lê `_last_frame`), então p1 e p2
+        podem rodar ao mesmo tempo.
+        """
+        tracker = self.trackers.get(side)
+        if tracker is None:
+            return None
+        ok, box = tracker.update(frame)
+        if ok:
+            # box is (x,y,w,h) from tracker -> convert to xyxy
+            bx, by, bw, bh = map(int, box)
+            out = (bx, by, bx + bw, by + bh)
+            self.last_bboxes[side] = out
+            self._fail_counts[side] = 0
+            return out
+
+        self._fail_counts[side] += 1
+        if self._fail_counts[side] >= self._max_fail:
+            # mark tracker as dead
+            self.trackers[side] = None
+            return None
+        # quick recovery attempt using template-match from last_frame
+        recovered = self._attempt_recover(side, frame)
+        if recovered is not None:
+            self.last_bboxes[side] = recovered
+            self._fail_counts[side] = 0
+            try:
+                # re-init tracker with recovered bbox
+                if self._create is not None:
+                    tnew = self._create()
+                    x1, y1, x2, y2 = map(int, recovered)
+                    tnew.init(frame, (x1, y1, x2 - x1, y2 - y1))
+                    self.trackers[side] = tnew
+            except Exception:
+                pass
+        return recovered
+
     def _attempt_recover(self, side: str, frame):
         """Attempt to find the last bbox in the current frame via template matching.
 
@@ -0,0 +1,156 @@
+"""Cache das saídas do estágio de visão (`VisionRecord`) em disco.
+
+Decodificar, rastrear e medir as ROIs é a parte cara do pipeline; a análise
+(estados, eventos, frame-data, insights) só precisa das estatísticas brutas
+por frame. Este módulo grava essas estatísticas em um `.npz` por vídeo,
+identificado por:
+
+    vision-<sha256 do vídeo (16 hex)>-<hash da config de visão (16 hex)>.npz
+
+A config de visão inclui apenas o que altera as saídas brutas (detector de
+personagens, pré-processamento de efeitos, versão do formato). Thresholds de
+estado/efeitos são aplicados na análise, então mudá-los reaproveita o cache.
+
+Colunas (n = frames):
+- `frame_id` int32, `p1_bbox`/`p2_bbox` int32 (n, 4)
+- `p1_<campo>`/`p2_<campo>` para cada campo de `StateFeatures`
+- `effect_mads` float64 (n, 2), NaN == None
+- `overlay_ratio` float64 (NaN == None), `changed_pixels` int64 (-1 == None), `pixels` int64
+- `metadata`: JSON com os metadados do vídeo (fps, resolução, ...)
+"""
+
+import hashlib
+import json
+import math
+import os
+from dataclasses import fields
+
+import numpy as np
+
+from models.structures import VisionRecord
+from vision.game_state import GameStateSignals
+from vision.state_detection import StateFeatures
+
+VISION_CACHE_VERSION = 1
+
+_FEATURE_DTYPES = {bool: np.bool_, int: np.int32, float: np.float64}
+FEATURE_FIELDS = [(f.name, _FEATURE_DTYPES[f.type]) for f in fields(StateFeatures)]
+
+
+def vision_config_hash(vision_config):
+    raw = json.dumps({"version": VISION_CACHE_VERSION, **vision_config}, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def vision_cache_key(video_sha256, vision_config):
+    return f"{video_sha256[:16]}-{vision_config_hash(vision_config)}"
+
+
+class VisionRecordColumns:
+    """Acumula `VisionRecord`s em listas por coluna para gravação em `.npz`."""
+
+    def __init__(self):
+        self._cols = {"frame_id": [], "p1_bbox": [], "p2_bbox": [], "effect_mads": [],
+                      "overlay_ratio": [], "changed_pixels": [], "pixels": []}
+        for player in ("p1", "p2"):
+            for name, _ in FEATURE_FIELDS:
+                self._cols[f"{player}_{name}"] = []
+
+    def __len__(self):
+        return len(self._cols["frame_id"])
+
+    def append(self, rec: VisionRecord):
+        c = self._cols
+        c["frame_id"].append(rec.frame_id)
+        c["p1_bbox"].append(rec.p1_bbox)
+        c["p2_bbox"].append(rec.p2_bbox)
+        for player, feats in (("p1", rec.p1_features), ("p2", rec.p2_features)):
+            for name, _ in FEATURE_FIELDS:
+                c[f"{player}_{name}"].append(getattr(feats, name))
+        c["effect_mads"].append([math.nan if m is None else m for m in rec.effect_mads])
+        sig = rec.game_signals or GameStateSignals()
+        c["overlay_ratio"].append(math.nan if sig.overlay_ratio is None else sig.overlay_ratio)
+        c["changed_pixels"].append(-1 if sig.changed_pixels is None else sig.changed_pixels)
+        c["pixels"].append(sig.pixels)
+
+    def arrays(self):
+        n = len(self)
+        out = {
+            "frame_id": np.asarray(self._cols["frame_id"], dtype=np.int32),
+            "p1_bbox": np.asarray(self._cols["p1_bbox"], dtype=np.int32).reshape(n, 4),
+            "p2_bbox": np.asarray(self._cols["p2_bbox"], dtype=np.int32).reshape(n, 4),
+            "effect_mads": np.asarray(self._cols["effect_mads"], dtype=np.float64).reshape(n, 2),
+            "overlay_ratio": np.asarray(self._cols["overlay_ratio"], dtype=np.float64),
+            "changed_pixels": np.asarray(self._cols["changed_pixels"], dtype=np.int64),
+            "pixels": np.asarray(self._cols["pixels"], dtype=np.int64),
+        }
+        for player in ("p1", "p2"):
+            for name, dtype in FEATURE_FIELDS:
+                key = f"{player}_{name}"
+                out[key] = np.asarray(self._cols[key], dtype=dtype)
+        return out
+
+
+def iter_vision_records(arrays):
+    """Reconstrói os `VisionRecord`s a partir das colunas do `.npz`."""
+
+    n = len(arrays["frame_id"])
+    cols = {k: v.tolist() for k, v in arrays.items() if k != "metadata"}
+    for i in range(n):
+        feats = {}
+        for player in ("p1", "p2"):
+            feats[player] = StateFeatures(**{name: cols[f"{player}_{name}"][i] for name, _ in FEATURE_FIELDS})
+        overlay = cols["overlay_ratio"][i]
+        changed = cols["changed_pixels"][i]
+        yield VisionRecord(
+            frame_id=cols["frame_id"][i],
+            p1_bbox=tuple(cols["p1_bbox"][i]),
+            p2_bbox=tuple(cols["p2_bbox"][i]),
+            p1_features=feats["p1"],
+            p2_features=feats["p2"],
+            effect_mads=[None if math.isnan(m) else m for m in cols["effect_mads"][i]],
+            game_signals=GameStateSignals(
+                overlay_ratio=None if math.isnan(overlay) else overlay,
+                changed_pixels=None if changed < 0 else changed,
+                pixels=cols["pixels"][i],
+            ),
+        )
+
+
+class VisionCache:
+    """Diretório de caches de visão (um `.npz` por chave).
+
+    Uso:
+      cache = VisionCache("output/cache")
+      key = vision_cache_key(sha256, vision_config)
+      hit = cache.load(key)          # (metadata, iterador de VisionRecord) ou None
+      cache.save(key, columns, metadata)
+    """
+
+    def __init__(self, directory="output/cache"):
+        self.directory = directory
+
+    def path(self, key):
+        return os.path.join(self.directory, f"vision-{key}.npz")
+
+    def load(self, key):
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {k: data[k] for k in data.files}
+        except Exception:
+            # cache corrompido/incompleto: trata como miss
+            return None
+        metadata = json.loads(str(arrays.pop("metadata")))
+        return metadata, iter_vision_records(arrays)
+
+    def save(self, key, columns: VisionRecordColumns, metadata):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, metadata=np.asarray(json.dumps(metadata)), **columns.arrays())
+        os.replace(tmp, path)
+        return path